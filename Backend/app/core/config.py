@@ -34,6 +34,64 @@ class Settings(BaseModel):
     smtp_port: int = int(os.getenv("SMTP_PORT", "587"))
     smtp_user: str = os.getenv("SMTP_USER", "")
     smtp_password: str = os.getenv("SMTP_PASSWORD", "")
+    smtp_starttls: bool = os.getenv("SMTP_STARTTLS", "True").lower() == "true"
+    smtp_timeout: float = float(os.getenv("SMTP_TIMEOUT", "30"))
+    
+    # Email outbox worker
+    email_outbox_concurrency: int = int(os.getenv("EMAIL_OUTBOX_CONCURRENCY", "2"))
+    email_outbox_batch_size: int = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))
+    email_outbox_max_attempts: int = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+    email_outbox_backoff_seconds: float = float(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "30"))
+    email_outbox_poll_seconds: float = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "5"))
+    
+    # Sale return emails: "immediate" (one email per verified claim) or "digest"
+    # (one multi-claim CSV every SALE_RETURN_DIGEST_MINUTES, e.g. 15 or 1440 for nightly)
+    sale_return_mode: str = os.getenv("SALE_RETURN_MODE", "immediate").lower()
+    sale_return_digest_minutes: float = float(os.getenv("SALE_RETURN_DIGEST_MINUTES", "15"))
+    
+    # Claim ID allocation (values leased per worker from the counters collection)
+    claim_id_block_size: int = int(os.getenv("CLAIM_ID_BLOCK_SIZE", "1"))
+    
+    # Claim statistics cache (per worker; cleared on this worker's claim writes)
+    claim_stats_cache_seconds: float = float(os.getenv("CLAIM_STATS_CACHE_SECONDS", "30"))
+    
+    # Largest number of claims accepted by one POST /api/claims/bulk
+    claim_import_max_claims: int = int(os.getenv("CLAIM_IMPORT_MAX_CLAIMS", "5000"))
+    
+    # Largest number of claims accepted by one bulk bilty/approve/verify request
+    claim_bulk_max_transitions: int = int(os.getenv("CLAIM_BULK_MAX_TRANSITIONS", "1000"))
+    
+    # Claim event stream (/api/claims/events); change streams need a replica set,
+    # otherwise each worker only streams its own writes
+    claim_events_change_stream: bool = os.getenv("CLAIM_EVENTS_CHANGE_STREAM", "True").lower() == "true"
+    claim_events_keepalive_seconds: float = float(os.getenv("CLAIM_EVENTS_KEEPALIVE_SECONDS", "15"))
+    
+    # Delta sync (?updated_since=): how long deletion tombstones are kept, and how far
+    # each sync reaches back to catch writes that were in flight at the previous one
+    sync_tombstone_days: int = int(os.getenv("SYNC_TOMBSTONE_DAYS", "30"))
+    sync_overlap_seconds: float = float(os.getenv("SYNC_OVERLAP_SECONDS", "5"))
+    
+    # Claim archival (python maintenance.py archive-claims): Approved/Rejected claims
+    # untouched for this many days move to claims_archive, in throttled batches
+    claim_archive_after_days: int = int(os.getenv("CLAIM_ARCHIVE_AFTER_DAYS", "180"))
+    claim_archive_batch_size: int = int(os.getenv("CLAIM_ARCHIVE_BATCH_SIZE", "500"))
+    claim_archive_pause_seconds: float = float(os.getenv("CLAIM_ARCHIVE_PAUSE_SECONDS", "0.5"))
+    
+    # How long a factory operator keeps a claim checked out from the work queue
+    claim_lease_seconds: int = int(os.getenv("CLAIM_LEASE_SECONDS", "600"))
+    
+    # Per-worker LRU cache of barcode scans (normalized batch code -> batch); the TTL
+    # bounds how long edits made through other workers can go unseen
+    batch_barcode_cache_size: int = int(os.getenv("BATCH_BARCODE_CACHE_SIZE", "4096"))
+    batch_barcode_cache_seconds: float = float(os.getenv("BATCH_BARCODE_CACHE_SECONDS", "300"))
+    
+    # Most candidate batches a search ranks; narrower queries stay well below it
+    batch_search_max_candidates: int = int(os.getenv("BATCH_SEARCH_MAX_CANDIDATES", "1000"))
+    
+    # Batch import (POST /api/batches/import): rows per insert_many, and how many
+    # problem rows are listed in the response (all are counted)
+    batch_import_chunk_size: int = int(os.getenv("BATCH_IMPORT_CHUNK_SIZE", "1000"))
+    batch_import_max_results: int = int(os.getenv("BATCH_IMPORT_MAX_RESULTS", "1000"))
 
 
 settings = Settings()
\ No newline at end of file
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional, Any
+from typing import Optional, Any, List
 from pydantic import BaseModel, Field
 from pydantic_core import core_schema
 from bson import ObjectId
@@ -100,3 +100,13 @@ class BatchUpdate(BaseModel):
 
     class Config:
         arbitrary_types_allowed = True
+
+
+class BatchResolve(BaseModel):
+    """Barcodes scanned in one go (e.g. a carton) to resolve together"""
+    codes: List[str] = Field(..., min_items=1, max_items=500)
+
+
+class BatchWarrantyCheck(BaseModel):
+    """Batches to check the warranty of in one request"""
+    batch_ids: List[str] = Field(..., min_items=1, max_items=500)
@@ -14,6 +14,32 @@ class ClaimStatus(str, Enum):
     REJECTED = "Rejected"
 
 
+# Allowed status changes. Every target has exactly one source status, so a
+# conditional write on the source identifies the prior state; Approved and
+# Rejected are terminal.
+CLAIM_TRANSITIONS = {
+    ClaimStatus.BILTY_PENDING: (ClaimStatus.APPROVAL_PENDING,),
+    ClaimStatus.APPROVAL_PENDING: (ClaimStatus.APPROVED, ClaimStatus.REJECTED),
+    ClaimStatus.APPROVED: (),
+    ClaimStatus.REJECTED: (),
+}
+CLAIM_TRANSITION_SOURCES = {
+    target: source for source, targets in CLAIM_TRANSITIONS.items() for target in targets
+}
+CLAIM_TERMINAL_STATUSES = tuple(status for status, targets in CLAIM_TRANSITIONS.items() if not targets)
+
+
+class StatusHistoryEntry(BaseModel):
+    """One entry of a claim's status_history"""
+    from_status: Optional[ClaimStatus] = Field(None, alias="from")
+    status: ClaimStatus
+    at: datetime
+    by: Optional[PyObjectId] = None
+
+    class Config:
+        populate_by_name = True
+
+
 class ClaimItem(BaseModel):
     """Batch within a claim"""
     batch_id: PyObjectId
@@ -37,6 +63,7 @@ class Claim(BaseModel):
     verified_by: Optional[PyObjectId] = None
     verified_at: Optional[datetime] = None
     notes: Optional[str] = Field(default="", max_length=500)
+    status_history: List[StatusHistoryEntry] = Field(default_factory=list)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -70,14 +97,17 @@ class ClaimCreate(BaseModel):
     notes: Optional[str] = Field(default="", max_length=500)
 
 
+class ClaimImport(ClaimCreate):
+    """One claim in a bulk import (e.g. collected offline)"""
+    client_ref: Optional[str] = Field(default=None, min_length=1, max_length=100)  # Client key; replays are skipped
+    date: Optional[datetime] = None  # When the claim was collected (defaults to import time)
+
+
 class ClaimUpdate(BaseModel):
     """Claim update model"""
     items: Optional[List[ClaimItem]] = Field(None, min_items=1)
-    status: Optional[ClaimStatus] = None
+    status: Optional[ClaimStatus] = None  # Approval goes through /verify or /approve instead
     bilty_number: Optional[str] = Field(None, max_length=100)
-    verified: Optional[bool] = None
-    verified_by: Optional[PyObjectId] = None
-    verified_at: Optional[datetime] = None
     notes: Optional[str] = Field(None, max_length=500)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
@@ -105,4 +135,34 @@ class ClaimVerify(BaseModel):
     """Claim verification model"""
     verified_by: PyObjectId
     notes: Optional[str] = Field(default="", max_length=500)
-    item_results: Optional[List[ItemVerificationResult]] = None
\ No newline at end of file
+    item_results: Optional[List[ItemVerificationResult]] = None
+
+class BulkBiltyEntry(BaseModel):
+    """Bilty number for one claim in a bulk update"""
+    id: str
+    bilty_number: str = Field(..., min_length=1, max_length=100)
+
+
+class ClaimBulkBilty(BaseModel):
+    """Bulk bilty update model"""
+    claims: List[BulkBiltyEntry] = Field(..., min_items=1)
+
+
+class ClaimBulkApprove(BaseModel):
+    """Bulk approval model"""
+    claim_ids: List[str] = Field(..., min_items=1)
+    verified_by: PyObjectId
+    notes: Optional[str] = Field(default="", max_length=500)
+
+
+class BulkVerifyEntry(BaseModel):
+    """Per-item results for one claim in a bulk verification"""
+    id: str
+    item_results: Optional[List[ItemVerificationResult]] = None
+
+
+class ClaimBulkVerify(BaseModel):
+    """Bulk verification model"""
+    verified_by: PyObjectId
+    notes: Optional[str] = Field(default="", max_length=500)
+    claims: List[BulkVerifyEntry] = Field(..., min_items=1)
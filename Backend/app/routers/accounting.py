@@ -1,20 +1,56 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from datetime import date, datetime, time
+from typing import Optional
+from fastapi import APIRouter, HTTPException, status, Depends, Query
 from fastapi.responses import StreamingResponse
 import io
-from ..utils.accounting import generate_sale_return_csv
+from ..models.claim import ClaimStatus
+from ..utils.accounting import generate_sale_return_csv, stream_sale_return_csv
 from ..utils.crud_claim import claim_crud
 from ..utils.dependencies import get_current_user, require_admin_or_factory, require_admin_or_warehouse
 
 router = APIRouter()
 
 
+@router.get("/sale-returns.csv")
+async def export_sale_returns_csv(
+    from_date: Optional[date] = Query(None, alias="from"),
+    to_date: Optional[date] = Query(None, alias="to"),
+    claim_status: ClaimStatus = Query(ClaimStatus.APPROVED, alias="status"),
+    include_archived: bool = Query(False, description="Also export archived claims"),
+    current_user=Depends(require_admin_or_warehouse)
+):
+    """Stream sale return rows for claims verified between `from` and `to` (inclusive dates)"""
+    if from_date and to_date and from_date > to_date:
+        raise HTTPException(status_code=400, detail="'from' must not be after 'to'")
+    
+    filter_dict = {"status": claim_status.value}
+    verified_range = {}
+    if from_date:
+        verified_range["$gte"] = datetime.combine(from_date, time.min)
+    if to_date:
+        verified_range["$lte"] = datetime.combine(to_date, time.max)
+    if verified_range:
+        filter_dict["verified_at"] = verified_range
+    
+    filename = f"sale_returns_{from_date or 'start'}_{to_date or datetime.utcnow().date()}.csv"
+    return StreamingResponse(
+        stream_sale_return_csv(
+            filter_dict,
+            collections=(claim_crud.archive_collection_name, claim_crud.collection_name) if include_archived
+            else (claim_crud.collection_name,)
+        ),
+        media_type="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
+
+
 @router.get("/sale-return/{claim_id}/csv")
 async def download_sale_return_csv(
     claim_id: str,
     current_user=Depends(require_admin_or_warehouse)
 ):
-    """Download sale return CSV for a verified claim"""
-    claim = await claim_crud.get_claim(claim_id)
+    """Download sale return CSV for a verified claim (archived claims included)"""
+    claim = await claim_crud.get_claim(claim_id, include_archived=True)
     if not claim:
         raise HTTPException(status_code=404, detail="Claim not found")
     
@@ -82,6 +82,7 @@ async def simple_login(name: str, type: str):
             }
             result = await db.users.insert_one(new_user)
             new_user["_id"] = result.inserted_id
+            await user_crud.bump_version()
             user = new_user
         
         # Create access token
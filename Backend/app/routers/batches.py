@@ -1,11 +1,13 @@
 from typing import List, Optional
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from pydantic import BaseModel
 from bson import ObjectId
-from ..models.batch import BatchCreate, BatchUpdate
-from ..utils.crud_batch import batch_crud
+from ..models.batch import BatchCreate, BatchUpdate, BatchResolve, BatchWarrantyCheck
+from ..utils.crud_batch import batch_crud, batch_rows_from_csv, batch_rows_from_xlsx, warranty_check
 from ..utils.dependencies import require_admin, get_current_active_user
+from ..utils.pagination import TOTAL_PATTERN, set_page_headers
+from ..utils.etags import check_etag, document_etag, list_etag
 from ..core.database import get_database
 
 
@@ -18,21 +20,65 @@ async def create_batch(batch: BatchCreate):
     return await batch_crud.create_batch(batch)
 
 
+XLSX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+@router.post("/import", response_model=dict, dependencies=[Depends(require_admin)])
+async def import_batches(request: Request):
+    """
+    Import batches from a multipart upload with a CSV or XLSX `file` field (Admin only).
+    Columns are the batch fields; model, supplier and supervisor may be given by name
+    (supervisor also by email) or as model_id/supplier_id/supervisor_id. Rows are
+    streamed and written in chunks; rows that were not created are listed with
+    their line number. If the file cannot be read part way, the 400 detail holds
+    the message and the summary of the rows imported before that point.
+    """
+    form = await request.form()
+    upload = form.get("file")
+    if upload is None or isinstance(upload, str):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Upload the CSV or XLSX as a 'file' field"
+        )
+    if (upload.filename or "").lower().endswith(".xlsx") or upload.content_type == XLSX_CONTENT_TYPE:
+        rows = batch_rows_from_xlsx(upload.file)
+    else:
+        rows = batch_rows_from_csv(upload.file)
+    return await batch_crud.import_batches(rows)
+
+
 @router.get("/", response_model=List[dict])
 async def read_batches(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     model_id: Optional[str] = Query(None),
     batch_code: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    total: Optional[str] = Query(None, pattern=TOTAL_PATTERN),
+    updated_since: Optional[str] = Query(None),
+    in_warranty: Optional[bool] = Query(None, description="Only batches still in (true) or out of (false) warranty"),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get batches with optional filters"""
-    return await batch_crud.get_batches(
+    # in_warranty results change as time passes, not only on writes, so they get no ETag
+    if in_warranty is None:
+        not_modified = check_etag(request, response, await list_etag(request, batch_crud))
+        if not_modified:
+            return not_modified
+    page = await batch_crud.get_batches(
         skip=skip,
         limit=limit,
         model_id=model_id,
-        batch_code=batch_code
+        batch_code=batch_code,
+        cursor=cursor,
+        total=total,
+        updated_since=updated_since,
+        in_warranty=in_warranty
     )
+    set_page_headers(request, response, page)
+    return page["items"]
 
 
 @router.get("/barcode/{batch_code:path}", response_model=dict)
@@ -50,18 +96,37 @@ async def read_batch_by_barcode(
     return batch
 
 
+@router.post("/resolve", response_model=dict)
+async def resolve_barcodes(
+    resolve_in: BatchResolve,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Resolve many scanned barcodes in one request; returns {"batches": {code: batch}, "unknown": [code]}"""
+    return await batch_crud.resolve_barcodes(resolve_in)
+
+
 @router.get("/search/{search_term}", response_model=List[dict])
 async def search_batches(
     search_term: str,
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    model_id: Optional[str] = Query(None),
+    supplier_id: Optional[str] = Query(None),
     current_user: dict = Depends(get_current_active_user)
 ):
-    """Search batches by batch_code, colour, supplier, or contractor"""
-    return await batch_crud.search_batches(search_term)
+    """Search batches by batch_code, contractor or colour word prefixes, best matches first"""
+    page = await batch_crud.search_batches(search_term, skip, limit, model_id, supplier_id)
+    set_page_headers(request, response, page)
+    return page["items"]
 
 
 @router.get("/{batch_id}", response_model=dict)
 async def read_batch(
     batch_id: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get batch by ID"""
@@ -71,6 +136,9 @@ async def read_batch(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Batch not found"
         )
+    not_modified = check_etag(request, response, document_etag(batch_crud, batch))
+    if not_modified:
+        return not_modified
     return batch
 
 
@@ -81,11 +149,21 @@ class WarrantyCheckResponse(BaseModel):
     production_date: str
     warranty_period: int
     age_months: int
+    warranty_expires_at: str
     is_expired: bool
     requires_confirmation: bool
     message: str
 
 
+@router.post("/check-warranty", response_model=dict)
+async def check_batch_warranties(
+    check_in: BatchWarrantyCheck,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Check the warranty of many batches at once; unknown IDs are listed under not_found"""
+    return await batch_crud.check_warranties(check_in.batch_ids)
+
+
 @router.get("/{batch_id}/check-warranty", response_model=WarrantyCheckResponse)
 async def check_batch_warranty(
     batch_id: str,
@@ -99,44 +177,19 @@ async def check_batch_warranty(
             detail="Batch not found"
         )
     
-    production_date = batch.get("production_date")
-    warranty_period = batch.get("warranty_period", 12)
-    
-    if not production_date:
+    if not batch.get("production_date"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Batch has no production date"
         )
     
-    if isinstance(production_date, str):
-        try:
-            production_date = datetime.fromisoformat(production_date.replace('Z', '+00:00'))
-        except (ValueError, AttributeError):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid production date format"
-            )
-    
-    age_days = (datetime.utcnow() - production_date).days
-    age_months = int(age_days / 30)
-    is_expired = age_months > warranty_period
-    
-    if is_expired:
-        message = f"Batch '{batch.get('batch_code')}' warranty has expired ({age_months} months old, warranty: {warranty_period} months)"
-    else:
-        remaining = warranty_period - age_months
-        message = f"Batch '{batch.get('batch_code')}' is within warranty ({age_months} months old, {remaining} months remaining)"
-    
-    return WarrantyCheckResponse(
-        batch_id=str(batch.get("_id")),
-        batch_code=batch.get("batch_code", ""),
-        production_date=production_date.isoformat() if hasattr(production_date, 'isoformat') else str(production_date),
-        warranty_period=warranty_period,
-        age_months=age_months,
-        is_expired=is_expired,
-        requires_confirmation=is_expired,
-        message=message
-    )
+    check = warranty_check(batch, datetime.utcnow())
+    if check is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid production date format"
+        )
+    return WarrantyCheckResponse(**check)
 
 
 @router.put("/{batch_id}", response_model=dict, dependencies=[Depends(require_admin)])
@@ -1,12 +1,24 @@
+import csv
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from ..models.claim import ClaimCreate, ClaimUpdate, ClaimVerify, ClaimBiltyUpdate, ClaimApprove
-from ..utils.crud_claim import claim_crud
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from ..core.config import settings
+from ..models.claim import (
+    ClaimCreate, ClaimUpdate, ClaimVerify, ClaimBiltyUpdate, ClaimApprove, ClaimStatus,
+    ClaimBulkBilty, ClaimBulkApprove, ClaimBulkVerify
+)
+from ..utils.crud_claim import claim_crud, claims_from_csv
 from ..utils.dependencies import (
     require_admin_or_rep, 
     require_admin_or_factory, 
-    get_current_active_user
+    require_admin_or_warehouse,
+    get_current_active_user,
+    get_stream_user
 )
+from ..utils.pagination import TOTAL_PATTERN, set_page_headers
+from ..utils.etags import check_etag, document_etag, list_etag
+from ..utils.rollups import ROLLUP_DIMENSIONS, claim_rollups
+from ..utils.events import claim_events, claim_event_stream
 
 
 router = APIRouter()
@@ -18,25 +30,200 @@ async def create_claim(claim: ClaimCreate):
     return await claim_crud.create_claim(claim)
 
 
+@router.post("/bulk", response_model=dict, dependencies=[Depends(require_admin_or_rep)])
+async def import_claims(request: Request):
+    """
+    Import many claims at once (Admin or Rep). Send a JSON list (or {"claims": [...]})
+    of claims, a text/csv body, or a multipart upload with a CSV `file` field.
+    """
+    content_type = request.headers.get("content-type", "")
+    lines = None
+    try:
+        if content_type.startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if upload is None or isinstance(upload, str):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Upload the CSV as a 'file' field"
+                )
+            rows, lines = claims_from_csv((await upload.read()).decode("utf-8-sig"))
+        elif content_type.startswith("text/csv"):
+            rows, lines = claims_from_csv((await request.body()).decode("utf-8-sig"))
+        else:
+            body = await request.json()
+            rows = body.get("claims") if isinstance(body, dict) else body
+    except (ValueError, csv.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Could not read the import; send JSON or UTF-8 CSV"
+        )
+    if not isinstance(rows, list):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Expected a list of claims"
+        )
+    
+    result = await claim_crud.import_claims(rows)
+    if lines is not None:
+        for row_result in result["results"]:
+            row_result["lines"] = lines[row_result["index"]]
+    return result
+
+
+@router.put("/bulk/bilty", response_model=dict, dependencies=[Depends(require_admin_or_rep)])
+async def bulk_update_bilty(
+    bulk_data: ClaimBulkBilty,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Add bilty numbers to many claims at once; reports a result per claim (Admin or Rep)"""
+    return await claim_crud.bulk_update_bilty(bulk_data, by=current_user["_id"])
+
+
+@router.put("/bulk/approve", response_model=dict, dependencies=[Depends(require_admin_or_factory)])
+async def bulk_approve_claims(bulk_data: ClaimBulkApprove):
+    """Approve many claims at once; reports a result per claim (Admin or Factory)"""
+    return await claim_crud.bulk_approve(bulk_data)
+
+
+@router.put("/bulk/verify", response_model=dict, dependencies=[Depends(require_admin_or_factory)])
+async def bulk_verify_claims(bulk_data: ClaimBulkVerify):
+    """Verify many claims at once; reports a result per claim (Admin or Factory)"""
+    return await claim_crud.bulk_verify(bulk_data)
+
+
 @router.get("/", response_model=List[dict])
 async def read_claims(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     rep_id: Optional[str] = Query(None),
     merchant_id: Optional[str] = Query(None),
     verified: Optional[bool] = Query(None),
+    cursor: Optional[str] = Query(None),
+    total: Optional[str] = Query(None, pattern=TOTAL_PATTERN),
+    updated_since: Optional[str] = Query(None),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get claims with optional filters"""
-    return await claim_crud.get_claims(
+    not_modified = check_etag(request, response, await list_etag(request, claim_crud))
+    if not_modified:
+        return not_modified
+    page = await claim_crud.get_claims(
         skip=skip,
         limit=limit,
         rep_id=rep_id,
         merchant_id=merchant_id,
-        verified=verified
+        verified=verified,
+        cursor=cursor,
+        total=total,
+        updated_since=updated_since
+    )
+    set_page_headers(request, response, page)
+    return page["items"]
+
+
+@router.get("/stats", response_model=dict, dependencies=[Depends(require_admin_or_warehouse)])
+async def read_claim_stats(include_archived: bool = Query(False)):
+    """Get claim counts and quantities by status, rep, merchant, model, product type, supplier and month (Admin or Warehouse)"""
+    return await claim_crud.get_claim_stats(include_archived)
+
+
+@router.get("/rollups", response_model=List[dict], dependencies=[Depends(require_admin_or_warehouse)])
+async def read_claim_rollups(
+    dimension: str = Query("total", pattern=f"^({'|'.join(ROLLUP_DIMENSIONS)})$"),
+    key: Optional[List[str]] = Query(None)
+):
+    """Get maintained claim counters for one dimension, optionally for specific keys (Admin or Warehouse)"""
+    return await claim_rollups.get_rollups(dimension, key)
+
+
+@router.get("/events")
+async def claim_events_stream(
+    request: Request,
+    current_user: dict = Depends(get_stream_user)
+):
+    """
+    Server-Sent Events stream of claim created/updated/transition/deleted events.
+    Reps receive events for their own claims only. A `resync` event means events
+    were missed and the client should reload.
+    """
+    return StreamingResponse(
+        claim_event_stream(
+            claim_events, current_user, request.is_disconnected,
+            keepalive_seconds=settings.claim_events_keepalive_seconds
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
     )
 
 
+@router.get("/search", response_model=List[dict])
+async def search_claims(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    include_archived: bool = Query(False),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Search claims by claim_id prefix, exact bilty number or merchant name; best matches first"""
+    return await claim_crud.search_claims(q, limit, include_archived)
+
+
+@router.get("/queue", response_model=List[dict])
+async def read_work_queue(
+    limit: int = Query(50, ge=1, le=200),
+    available: bool = Query(False, description="Leave out claims checked out by other operators"),
+    current_user: dict = Depends(require_admin_or_factory)
+):
+    """Claims waiting for verification, oldest first (Admin or Factory)"""
+    return await claim_crud.get_work_queue(current_user["_id"], limit, available)
+
+
+@router.post("/queue/checkout", response_model=dict)
+async def checkout_next_claim(
+    lease_seconds: Optional[int] = Query(None, ge=30, le=3600),
+    current_user: dict = Depends(require_admin_or_factory)
+):
+    """Check out the oldest claim nobody else is working on (Admin or Factory)"""
+    claim = await claim_crud.checkout_claim(current_user["_id"], lease_seconds=lease_seconds)
+    if claim is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No claims are waiting for verification"
+        )
+    return claim
+
+
+@router.get("/view", response_model=List[dict])
+async def read_claim_view(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=1000),
+    rep_id: Optional[str] = Query(None),
+    merchant_id: Optional[str] = Query(None),
+    verified: Optional[bool] = Query(None),
+    claim_status: Optional[ClaimStatus] = Query(None, alias="status"),
+    fields: Optional[str] = Query(None),
+    cursor: Optional[str] = Query(None),
+    total: Optional[str] = Query(None, pattern=TOTAL_PATTERN),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Get claims with merchant, rep, batch, model and product type names resolved"""
+    page = await claim_crud.get_claim_view(
+        limit=limit,
+        rep_id=rep_id,
+        merchant_id=merchant_id,
+        verified=verified,
+        claim_status=claim_status,
+        fields=[f.strip() for f in fields.split(",") if f.strip()] if fields else None,
+        cursor=cursor,
+        total=total
+    )
+    set_page_headers(request, response, page)
+    return page["items"]
+
+
 @router.get("/unverified", response_model=List[dict], dependencies=[Depends(require_admin_or_factory)])
 async def read_unverified_claims():
     """Get all unverified claims (Admin or Factory)"""
@@ -55,37 +242,53 @@ async def read_claims_by_rep(
 @router.get("/claim-id/{claim_id}", response_model=dict)
 async def read_claim_by_claim_id(
     claim_id: str,
+    request: Request,
+    response: Response,
+    include_archived: bool = Query(False),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get claim by unique claim_id (e.g., CLM-20241210-0001)"""
-    claim = await claim_crud.get_claim_by_claim_id(claim_id)
+    claim = await claim_crud.get_claim_by_claim_id(claim_id, include_archived)
     if claim is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Claim with claim_id '{claim_id}' not found"
         )
+    not_modified = check_etag(request, response, document_etag(claim_crud, claim))
+    if not_modified:
+        return not_modified
     return claim
 
 
 @router.get("/{claim_id}", response_model=dict)
 async def read_claim(
     claim_id: str,
+    request: Request,
+    response: Response,
+    include_archived: bool = Query(False),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get claim by ID"""
-    claim = await claim_crud.get_claim(claim_id)
+    claim = await claim_crud.get_claim(claim_id, include_archived)
     if claim is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Claim not found"
         )
+    not_modified = check_etag(request, response, document_etag(claim_crud, claim))
+    if not_modified:
+        return not_modified
     return claim
 
 
 @router.put("/{claim_id}", response_model=dict, dependencies=[Depends(require_admin_or_rep)])
-async def update_claim(claim_id: str, claim: ClaimUpdate):
-    """Update claim (Admin or Rep)"""
-    updated_claim = await claim_crud.update_claim(claim_id, claim)
+async def update_claim(
+    claim_id: str,
+    claim: ClaimUpdate,
+    current_user: dict = Depends(get_current_active_user)
+):
+    """Update claim (Admin or Rep); status changes must follow the claim workflow"""
+    updated_claim = await claim_crud.update_claim(claim_id, claim, by=current_user["_id"])
     if updated_claim is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -107,9 +310,15 @@ async def verify_claim(claim_id: str, verify_data: ClaimVerify):
 
 
 @router.put("/{claim_id}/bilty", response_model=dict, dependencies=[Depends(require_admin_or_rep)])
-async def update_bilty_number(claim_id: str, bilty_data: ClaimBiltyUpdate):
+async def update_bilty_number(
+    claim_id: str,
+    bilty_data: ClaimBiltyUpdate,
+    current_user: dict = Depends(get_current_active_user)
+):
     """Update bilty number and change status to Approval Pending (Admin or Rep)"""
-    updated_claim = await claim_crud.update_bilty_number(claim_id, bilty_data.bilty_number)
+    updated_claim = await claim_crud.update_bilty_number(
+        claim_id, bilty_data.bilty_number, by=current_user["_id"]
+    )
     if updated_claim is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -130,6 +339,36 @@ async def approve_claim(claim_id: str, approve_data: ClaimApprove):
     return approved_claim
 
 
+@router.put("/{claim_id}/lease", response_model=dict)
+async def checkout_claim(
+    claim_id: str,
+    lease_seconds: Optional[int] = Query(None, ge=30, le=3600),
+    current_user: dict = Depends(require_admin_or_factory)
+):
+    """Check out a claim for verification, or renew your lease on it (Admin or Factory)"""
+    claim = await claim_crud.checkout_claim(current_user["_id"], claim_id, lease_seconds)
+    if claim is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Claim not found"
+        )
+    return claim
+
+
+@router.delete("/{claim_id}/lease")
+async def release_claim(
+    claim_id: str,
+    current_user: dict = Depends(require_admin_or_factory)
+):
+    """Give back a checked-out claim (Admin or Factory)"""
+    if not await claim_crud.release_claim(claim_id, current_user["_id"]):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="You do not have this claim checked out"
+        )
+    return {"message": "Claim released"}
+
+
 @router.delete("/{claim_id}", dependencies=[Depends(require_admin_or_rep)])
 async def delete_claim(claim_id: str):
     """Delete claim (Admin or Rep)"""
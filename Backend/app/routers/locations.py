@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response
 from typing import Optional
 from ..models.location import LocationCreate, LocationUpdate
 from ..utils.crud_location import location_crud
 from ..utils.dependencies import get_current_user, require_admin, require_admin_or_rep
+from ..utils.pagination import TOTAL_PATTERN, set_page_headers
+from ..utils.etags import check_etag, document_etag, list_etag
 from ..core.database import get_database
 
 router = APIRouter()
@@ -19,13 +21,26 @@ async def create_location(
 
 @router.get("/")
 async def get_locations(
+    request: Request,
+    response: Response,
     skip: int = 0,
     limit: int = 1000,
     province: Optional[str] = None,
+    cursor: Optional[str] = None,
+    total: Optional[str] = Query(None, pattern=TOTAL_PATTERN),
+    updated_since: Optional[str] = None,
     current_user=Depends(get_current_user)
 ):
     """Get all locations"""
-    return await location_crud.get_locations(skip=skip, limit=limit, province=province, is_active=True)
+    not_modified = check_etag(request, response, await list_etag(request, location_crud))
+    if not_modified:
+        return not_modified
+    page = await location_crud.get_locations(
+        skip=skip, limit=limit, province=province, is_active=True, cursor=cursor, total=total,
+        updated_since=updated_since
+    )
+    set_page_headers(request, response, page)
+    return page["items"]
 
 
 @router.get("/search/{search_term}")
@@ -40,12 +55,17 @@ async def search_locations(
 @router.get("/{location_id}")
 async def get_location(
     location_id: str,
+    request: Request,
+    response: Response,
     current_user=Depends(get_current_user)
 ):
     """Get location by ID"""
     location = await location_crud.get_location(location_id)
     if not location:
         raise HTTPException(status_code=404, detail="Location not found")
+    not_modified = check_etag(request, response, document_etag(location_crud, location))
+    if not_modified:
+        return not_modified
     return location
 
 
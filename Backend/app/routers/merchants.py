@@ -1,9 +1,11 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from bson import ObjectId
 from ..models.merchant import MerchantCreate, MerchantUpdate
 from ..utils.crud_merchant import merchant_crud
 from ..utils.dependencies import require_merchant_managers, get_current_active_user
+from ..utils.pagination import TOTAL_PATTERN, set_page_headers
+from ..utils.etags import check_etag, document_etag, list_etag
 from ..core.database import get_database
 
 
@@ -18,22 +20,37 @@ async def create_merchant(merchant: MerchantCreate):
 
 @router.get("/", response_model=List[dict])
 async def read_merchants(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     is_active: Optional[bool] = Query(None),
+    cursor: Optional[str] = Query(None),
+    total: Optional[str] = Query(None, pattern=TOTAL_PATTERN),
+    updated_since: Optional[str] = Query(None),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get merchants with optional filters"""
-    return await merchant_crud.get_merchants(
+    not_modified = check_etag(request, response, await list_etag(request, merchant_crud))
+    if not_modified:
+        return not_modified
+    page = await merchant_crud.get_merchants(
         skip=skip,
         limit=limit,
-        is_active=is_active
+        is_active=is_active,
+        cursor=cursor,
+        total=total,
+        updated_since=updated_since
     )
+    set_page_headers(request, response, page)
+    return page["items"]
 
 
 @router.get("/{merchant_id}", response_model=dict)
 async def read_merchant(
     merchant_id: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get merchant by ID"""
@@ -43,6 +60,9 @@ async def read_merchant(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Merchant not found"
         )
+    not_modified = check_etag(request, response, document_etag(merchant_crud, merchant))
+    if not_modified:
+        return not_modified
     return merchant
 
 
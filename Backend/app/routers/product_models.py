@@ -1,9 +1,11 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from bson import ObjectId
 from ..models.product_model import ProductModelCreate, ProductModelUpdate
 from ..utils.crud_product_model import product_model_crud
 from ..utils.dependencies import require_admin, get_current_active_user
+from ..utils.pagination import TOTAL_PATTERN, set_page_headers
+from ..utils.etags import check_etag, document_etag, list_etag
 from ..core.database import get_database
 
 
@@ -18,24 +20,39 @@ async def create_product_model(product_model: ProductModelCreate):
 
 @router.get("/", response_model=List[dict])
 async def read_product_models(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     product_type_id: Optional[str] = Query(None),
     is_active: Optional[bool] = Query(None),
+    cursor: Optional[str] = Query(None),
+    total: Optional[str] = Query(None, pattern=TOTAL_PATTERN),
+    updated_since: Optional[str] = Query(None),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get product models with optional filters"""
-    return await product_model_crud.get_product_models(
+    not_modified = check_etag(request, response, await list_etag(request, product_model_crud))
+    if not_modified:
+        return not_modified
+    page = await product_model_crud.get_product_models(
         skip=skip,
         limit=limit,
         product_type_id=product_type_id,
-        is_active=is_active
+        is_active=is_active,
+        cursor=cursor,
+        total=total,
+        updated_since=updated_since
     )
+    set_page_headers(request, response, page)
+    return page["items"]
 
 
 @router.get("/{model_id}", response_model=dict)
 async def read_product_model(
     model_id: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get product model by ID"""
@@ -45,6 +62,9 @@ async def read_product_model(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product model not found"
         )
+    not_modified = check_etag(request, response, document_etag(product_model_crud, pm))
+    if not_modified:
+        return not_modified
     return pm
 
 
@@ -1,9 +1,11 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from bson import ObjectId
 from ..models.product_type import ProductTypeCreate, ProductTypeUpdate
 from ..utils.crud_product_type import product_type_crud
 from ..utils.dependencies import require_admin, get_current_active_user
+from ..utils.pagination import TOTAL_PATTERN, set_page_headers
+from ..utils.etags import check_etag, document_etag, list_etag
 from ..core.database import get_database
 
 
@@ -18,22 +20,37 @@ async def create_product_type(product_type: ProductTypeCreate):
 
 @router.get("/", response_model=List[dict])
 async def read_product_types(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     is_active: Optional[bool] = Query(None),
+    cursor: Optional[str] = Query(None),
+    total: Optional[str] = Query(None, pattern=TOTAL_PATTERN),
+    updated_since: Optional[str] = Query(None),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get product types with optional filters"""
-    return await product_type_crud.get_product_types(
+    not_modified = check_etag(request, response, await list_etag(request, product_type_crud))
+    if not_modified:
+        return not_modified
+    page = await product_type_crud.get_product_types(
         skip=skip,
         limit=limit,
-        is_active=is_active
+        is_active=is_active,
+        cursor=cursor,
+        total=total,
+        updated_since=updated_since
     )
+    set_page_headers(request, response, page)
+    return page["items"]
 
 
 @router.get("/{product_type_id}", response_model=dict)
 async def read_product_type(
     product_type_id: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get product type by ID"""
@@ -43,6 +60,9 @@ async def read_product_type(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product type not found"
         )
+    not_modified = check_etag(request, response, document_etag(product_type_crud, pt))
+    if not_modified:
+        return not_modified
     return pt
 
 
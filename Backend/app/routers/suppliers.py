@@ -1,9 +1,11 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from bson import ObjectId
 from ..models.supplier import SupplierCreate, SupplierUpdate
 from ..utils.crud_supplier import supplier_crud
 from ..utils.dependencies import require_admin, get_current_active_user
+from ..utils.pagination import TOTAL_PATTERN, set_page_headers
+from ..utils.etags import check_etag, document_etag, list_etag
 from ..core.database import get_database
 
 
@@ -18,22 +20,37 @@ async def create_supplier(supplier: SupplierCreate):
 
 @router.get("/", response_model=List[dict])
 async def read_suppliers(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     is_active: Optional[bool] = Query(None),
+    cursor: Optional[str] = Query(None),
+    total: Optional[str] = Query(None, pattern=TOTAL_PATTERN),
+    updated_since: Optional[str] = Query(None),
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get suppliers with optional filters"""
-    return await supplier_crud.get_suppliers(
+    not_modified = check_etag(request, response, await list_etag(request, supplier_crud))
+    if not_modified:
+        return not_modified
+    page = await supplier_crud.get_suppliers(
         skip=skip,
         limit=limit,
-        is_active=is_active
+        is_active=is_active,
+        cursor=cursor,
+        total=total,
+        updated_since=updated_since
     )
+    set_page_headers(request, response, page)
+    return page["items"]
 
 
 @router.get("/{supplier_id}", response_model=dict)
 async def read_supplier(
     supplier_id: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_active_user)
 ):
     """Get supplier by ID"""
@@ -43,6 +60,9 @@ async def read_supplier(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Supplier not found"
         )
+    not_modified = check_etag(request, response, document_etag(supplier_crud, supplier))
+    if not_modified:
+        return not_modified
     return supplier
 
 
@@ -1,9 +1,11 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from bson import ObjectId
 from ..models.user import UserCreate, UserUpdate, UserResponse, UserType
 from ..utils.crud_user import user_crud
 from ..utils.dependencies import require_admin, require_admin_or_warehouse, get_current_active_user
+from ..utils.pagination import TOTAL_PATTERN, set_page_headers
+from ..utils.etags import check_etag, document_etag, list_etag
 from ..core.database import get_database
 
 
@@ -26,18 +28,31 @@ async def create_user(user: UserCreate):
 
 @router.get("/", response_model=List[dict], dependencies=[Depends(require_admin_or_warehouse)])
 async def read_users(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     user_type: Optional[UserType] = Query(None),
-    is_active: Optional[bool] = Query(None)
+    is_active: Optional[bool] = Query(None),
+    cursor: Optional[str] = Query(None),
+    total: Optional[str] = Query(None, pattern=TOTAL_PATTERN),
+    updated_since: Optional[str] = Query(None)
 ):
     """Get users with optional filters (Admin only)"""
-    return await user_crud.get_users(
+    not_modified = check_etag(request, response, await list_etag(request, user_crud))
+    if not_modified:
+        return not_modified
+    page = await user_crud.get_users(
         skip=skip,
         limit=limit,
         user_type=user_type,
-        is_active=is_active
+        is_active=is_active,
+        cursor=cursor,
+        total=total,
+        updated_since=updated_since
     )
+    set_page_headers(request, response, page)
+    return page["items"]
 
 
 @router.get("/me", response_model=dict)
@@ -49,7 +64,7 @@ async def read_user_me(current_user: dict = Depends(get_current_active_user)):
 
 
 @router.get("/{user_id}", response_model=dict, dependencies=[Depends(require_admin_or_warehouse)])
-async def read_user(user_id: str):
+async def read_user(user_id: str, request: Request, response: Response):
     """Get user by ID (Admin only)"""
     user = await user_crud.get_user(user_id)
     if user is None:
@@ -59,6 +74,9 @@ async def read_user(user_id: str):
         )
     # Remove password hash
     user_response = {k: v for k, v in user.items() if k != "password_hash"}
+    not_modified = check_etag(request, response, document_etag(user_crud, user_response))
+    if not_modified:
+        return not_modified
     return user_response
 
 
@@ -1,87 +1,321 @@
 import csv
 import io
-import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email.mime.text import MIMEText
 from email import encoders
-from datetime import datetime
-from typing import Dict, Any, List, Optional
+import asyncio
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Dict, Any, List, Optional, Sequence, Union
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from ..core.config import settings
 from ..core.database import get_database
+from .crud_base import fetch_by_ids
+from .email_outbox import email_outbox, PermanentEmailError
 
 
-async def generate_sale_return_csv(claim: Dict[str, Any]) -> str:
-    """Generate CSV content for a verified claim's sale return"""
-    db = get_database()
+SALE_RETURN_FIELDS = ["MerchantName", "ModelName", "VerifiedQty", "BiltyNumber", "ClaimID", "VerifiedDate"]
+
+# Digest checkpoint document and how long to wait for in-flight verifications to land
+DIGEST_CHECKPOINT_ID = "sale_return_digest"
+DIGEST_SETTLE_SECONDS = 60
+
+
+async def load_sale_return_refs(claims: List[Dict[str, Any]]) -> Dict[str, Dict[ObjectId, Dict[str, Any]]]:
+    """
+    Load the merchants, batches and models referenced by `claims` into maps.
+    Costs three queries however many claims and items there are.
+    """
+    merchant_ids, batch_ids = set(), set()
+    for claim in claims:
+        if claim.get("merchant_id"):
+            merchant_ids.add(ObjectId(str(claim["merchant_id"])))
+        for item in claim.get("items", []):
+            if item.get("batch_id"):
+                batch_ids.add(ObjectId(str(item["batch_id"])))
     
-    rows = []
-    merchant = None
-    if claim.get("merchant_id"):
-        merchant = await db["merchants"].find_one({"_id": ObjectId(str(claim["merchant_id"]))})
+    merchants, batches = await asyncio.gather(
+        fetch_by_ids("merchants", merchant_ids, {"name": 1}),
+        fetch_by_ids("batches", batch_ids, {"model_id": 1})
+    )
+    model_ids = {ObjectId(str(b["model_id"])) for b in batches.values() if b.get("model_id")}
+    models = await fetch_by_ids("models", model_ids, {"name": 1, "wattage": 1})
+    return {"merchants": merchants, "batches": batches, "models": models}
+
+
+def sale_return_rows(claim: Dict[str, Any], refs: Dict[str, Dict[ObjectId, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Build the sale return CSV rows for one claim from preloaded references"""
+    merchant = refs["merchants"].get(ObjectId(str(claim["merchant_id"]))) if claim.get("merchant_id") else None
     merchant_name = merchant["name"] if merchant else "Unknown"
+    verified_at = claim.get("verified_at")
+    if isinstance(verified_at, str):
+        # Serialized claims carry ISO strings
+        try:
+            verified_at = datetime.fromisoformat(verified_at)
+        except ValueError:
+            pass
+    verified_date = verified_at.strftime("%Y-%m-%d") if isinstance(verified_at, datetime) else str(verified_at or "")
     
+    rows = []
     for item in claim.get("items", []):
         batch_id = item.get("batch_id")
-        batch = await db["batches"].find_one({"_id": ObjectId(str(batch_id))}) if batch_id else None
+        batch = refs["batches"].get(ObjectId(str(batch_id))) if batch_id else None
         
         model_name = "Unknown"
         if batch and batch.get("model_id"):
-            model = await db["models"].find_one({"_id": ObjectId(str(batch["model_id"]))})
+            model = refs["models"].get(ObjectId(str(batch["model_id"])))
             if model:
                 model_name = f"{model.get('name', '')} {model.get('wattage', '')}W"
         
-        verified_qty = item.get("scanned_quantity", item.get("quantity", 0))
-        
         rows.append({
             "MerchantName": merchant_name,
             "ModelName": model_name,
-            "VerifiedQty": verified_qty,
+            "VerifiedQty": item.get("scanned_quantity", item.get("quantity", 0)),
             "BiltyNumber": claim.get("bilty_number", ""),
             "ClaimID": claim.get("claim_id", ""),
-            "VerifiedDate": claim.get("verified_at", datetime.utcnow()).strftime("%Y-%m-%d") if isinstance(claim.get("verified_at"), datetime) else str(claim.get("verified_at", ""))
+            "VerifiedDate": verified_date
         })
-    
+    return rows
+
+
+def _write_csv(rows: List[Dict[str, Any]], header: bool = True) -> str:
     output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=["MerchantName", "ModelName", "VerifiedQty", "BiltyNumber", "ClaimID", "VerifiedDate"])
-    writer.writeheader()
+    writer = csv.DictWriter(output, fieldnames=SALE_RETURN_FIELDS)
+    if header:
+        writer.writeheader()
     writer.writerows(rows)
     return output.getvalue()
 
 
-async def send_sale_return_email(claim: Dict[str, Any]) -> bool:
-    """Send sale return CSV via email to accounts"""
+async def generate_sale_return_csv(claims: Union[Dict[str, Any], List[Dict[str, Any]]]) -> str:
+    """Generate sale return CSV content for one verified claim or a list of them"""
+    if isinstance(claims, dict):
+        claims = [claims]
+    refs = await load_sale_return_refs(claims)
+    rows = []
+    for claim in claims:
+        rows.extend(sale_return_rows(claim, refs))
+    return _write_csv(rows)
+
+
+async def stream_sale_return_csv(
+    filter_dict: Dict[str, Any],
+    chunk_size: int = 500,
+    collections: Sequence[str] = ("claims",)
+) -> AsyncIterator[str]:
+    """
+    Stream sale return CSV text for every claim matching `filter_dict`.
+    Claims are read from a cursor and resolved `chunk_size` at a time with
+    bulk reference lookups, so memory stays flat however many claims match.
+    Each of `collections` is read in turn, in verified_at order within it.
+    """
+    db = get_database()
+    projection = {"claim_id": 1, "merchant_id": 1, "items": 1, "bilty_number": 1, "verified_at": 1}
+    
+    yield _write_csv([])
+    chunk: List[Dict[str, Any]] = []
+    for collection in collections:
+        cursor = db[collection].find(filter_dict, projection=projection).sort("verified_at", 1).batch_size(chunk_size)
+        async for claim in cursor:
+            chunk.append(claim)
+            if len(chunk) >= chunk_size:
+                refs = await load_sale_return_refs(chunk)
+                yield _write_csv([row for c in chunk for row in sale_return_rows(c, refs)], header=False)
+                chunk = []
+    if chunk:
+        refs = await load_sale_return_refs(chunk)
+        yield _write_csv([row for c in chunk for row in sale_return_rows(c, refs)], header=False)
+
+
+def _build_sale_return_message(subject: str, body: str, filename: str, csv_content: str) -> MIMEMultipart:
+    """Assemble an email to accounts with the CSV attached"""
+    msg = MIMEMultipart()
+    msg["From"] = settings.smtp_user
+    msg["To"] = settings.accounts_email
+    msg["Subject"] = subject
+    msg.attach(MIMEText(body, "plain"))
+    
+    attachment = MIMEBase("application", "octet-stream")
+    attachment.set_payload(csv_content.encode("utf-8"))
+    encoders.encode_base64(attachment)
+    attachment.add_header("Content-Disposition", f"attachment; filename={filename}")
+    msg.attach(attachment)
+    return msg
+
+
+@email_outbox.renderer("sale_return")
+async def render_sale_return_email(payload: Dict[str, Any]) -> MIMEMultipart:
+    """Build the sale return email for a queued claim"""
+    db = get_database()
+    claim = await db["claims"].find_one({"_id": ObjectId(payload["claim_id"])})
+    if claim is None:
+        raise PermanentEmailError(f"Claim {payload['claim_id']} no longer exists")
+    
+    csv_content = await generate_sale_return_csv(claim)
+    claim_id = claim.get("claim_id", "unknown")
+    today = datetime.utcnow()
+    return _build_sale_return_message(
+        subject=f"Sale Return - Claim #{claim_id} - {today.strftime('%Y-%m-%d')}",
+        body=f"Please find attached the sale return details for Claim #{claim_id}.\n\nThis is an automated message from FactorClaim.",
+        filename=f"sale_return_{claim_id}_{today.strftime('%Y%m%d')}.csv",
+        csv_content=csv_content
+    )
+
+
+@email_outbox.renderer("sale_return_batch")
+async def render_sale_return_batch_email(payload: Dict[str, Any]) -> MIMEMultipart:
+    """Build one sale return email for claims verified together in a bulk request"""
+    db = get_database()
+    ids = [ObjectId(claim_id) for claim_id in payload["claim_ids"]]
+    claims = await db["claims"].find({"_id": {"$in": ids}}).sort("claim_seq", 1).to_list(length=None)
+    if not claims:
+        raise PermanentEmailError("None of the batch's claims exist any more")
+    
+    csv_content = await generate_sale_return_csv(claims)
+    today = datetime.utcnow()
+    return _build_sale_return_message(
+        subject=f"Sale Return - {len(claims)} claim(s) - {today.strftime('%Y-%m-%d')}",
+        body=f"Please find attached the sale return details for {len(claims)} claim(s).\n\nThis is an automated message from FactorClaim.",
+        filename=f"sale_return_batch_{today.strftime('%Y%m%d%H%M%S')}.csv",
+        csv_content=csv_content
+    )
+
+
+def _verified_between(start: datetime, end: datetime) -> Dict[str, Any]:
+    return {"verified": True, "verified_at": {"$gte": start, "$lt": end}}
+
+
+@email_outbox.renderer("sale_return_digest")
+async def render_sale_return_digest_email(payload: Dict[str, Any]) -> MIMEMultipart:
+    """Build one sale return email covering every claim verified in the window"""
+    db = get_database()
+    start, end = payload["from"], payload["to"]
+    claims = await db["claims"].find(_verified_between(start, end)).sort("verified_at", 1).to_list(length=None)
+    
+    csv_content = await generate_sale_return_csv(claims)
+    window = f"{start.strftime('%Y-%m-%d %H:%M')} - {end.strftime('%Y-%m-%d %H:%M')} UTC"
+    return _build_sale_return_message(
+        subject=f"Sale Return Digest - {len(claims)} claim(s) - {window}",
+        body=f"Please find attached the sale return details for {len(claims)} claim(s) verified between {window}.\n\nThis is an automated message from FactorClaim.",
+        filename=f"sale_return_digest_{start.strftime('%Y%m%d%H%M')}_{end.strftime('%Y%m%d%H%M')}.csv",
+        csv_content=csv_content
+    )
+
+
+async def queue_sale_return_email(claim: Dict[str, Any]) -> bool:
+    """Queue the sale return CSV email to accounts; delivery happens in the outbox worker.
+    In digest mode nothing is queued here - the claim goes out with the next digest."""
     if not settings.accounts_email or not settings.smtp_host:
         return False
+    if settings.sale_return_mode == "digest":
+        return False
     
     try:
-        csv_content = await generate_sale_return_csv(claim)
-        claim_id = claim.get("claim_id", "unknown")
-        
-        msg = MIMEMultipart()
-        msg["From"] = settings.smtp_user
-        msg["To"] = settings.accounts_email
-        msg["Subject"] = f"Sale Return - Claim #{claim_id} - {datetime.utcnow().strftime('%Y-%m-%d')}"
-        
-        body = f"Please find attached the sale return details for Claim #{claim_id}.\n\nThis is an automated message from FactorClaim."
-        msg.attach(MIMEText(body, "plain"))
-        
-        attachment = MIMEBase("application", "octet-stream")
-        attachment.set_payload(csv_content.encode("utf-8"))
-        encoders.encode_base64(attachment)
-        attachment.add_header(
-            "Content-Disposition",
-            f"attachment; filename=sale_return_{claim_id}_{datetime.utcnow().strftime('%Y%m%d')}.csv"
-        )
-        msg.attach(attachment)
-        
-        with smtplib.SMTP(settings.smtp_host, settings.smtp_port) as server:
-            server.starttls()
-            server.login(settings.smtp_user, settings.smtp_password)
-            server.send_message(msg)
-        
+        await email_outbox.enqueue("sale_return", {"claim_id": str(claim["_id"])})
         return True
     except Exception as e:
-        print(f"Failed to send sale return email: {e}")
+        print(f"Failed to queue sale return email: {e}")
         return False
+
+
+async def queue_sale_return_batch_email(claims: List[Dict[str, Any]]) -> bool:
+    """Queue one sale return email covering several claims verified together.
+    A single claim is sent exactly like queue_sale_return_email; digest mode queues nothing."""
+    if len(claims) == 1:
+        return await queue_sale_return_email(claims[0])
+    if not claims or not settings.accounts_email or not settings.smtp_host:
+        return False
+    if settings.sale_return_mode == "digest":
+        return False
+    
+    try:
+        await email_outbox.enqueue("sale_return_batch", {"claim_ids": [str(claim["_id"]) for claim in claims]})
+        return True
+    except Exception as e:
+        print(f"Failed to queue sale return email: {e}")
+        return False
+
+
+async def init_sale_return_digest_checkpoint() -> None:
+    """Start the digest window now if no checkpoint exists yet"""
+    db = get_database()
+    await db["checkpoints"].update_one(
+        {"_id": DIGEST_CHECKPOINT_ID},
+        {"$setOnInsert": {"until": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+async def queue_sale_return_digest(now: Optional[datetime] = None) -> Optional[str]:
+    """
+    Queue a digest email for claims verified since the checkpoint and advance it.
+
+    The outbox job ID is derived from the window start, so concurrent schedulers
+    (or a retry after a crash between the two writes) can never queue the same
+    window twice. The checkpoint only moves forward with a compare-and-set.
+    Returns the outbox job ID, or None if nothing was queued.
+    """
+    db = get_database()
+    checkpoint = await db["checkpoints"].find_one({"_id": DIGEST_CHECKPOINT_ID})
+    if checkpoint is None:
+        await init_sale_return_digest_checkpoint()
+        return None
+    
+    start = checkpoint["until"]
+    end = (now or datetime.utcnow()) - timedelta(seconds=DIGEST_SETTLE_SECONDS)
+    if end <= start:
+        return None
+    
+    job_id = f"{DIGEST_CHECKPOINT_ID}:{start.isoformat()}"
+    queued = None
+    existing = await db[email_outbox.collection_name].find_one({"_id": job_id})
+    if existing is not None:
+        # Previous run queued this window but did not advance the checkpoint
+        end = existing["payload"]["to"]
+    elif await db["claims"].count_documents(_verified_between(start, end), limit=1):
+        try:
+            queued = await email_outbox.enqueue("sale_return_digest", {"from": start, "to": end}, job_id=job_id)
+        except DuplicateKeyError:
+            existing = await db[email_outbox.collection_name].find_one({"_id": job_id})
+            end = existing["payload"]["to"]
+    
+    await db["checkpoints"].update_one(
+        {"_id": DIGEST_CHECKPOINT_ID, "until": start},
+        {"$set": {"until": end}}
+    )
+    return queued
+
+
+class SaleReturnDigestScheduler:
+    """Periodically queues sale return digests while digest mode is enabled"""
+    
+    def __init__(self, interval_minutes: float):
+        self.interval_minutes = interval_minutes
+        self._task: Optional[asyncio.Task] = None
+    
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_minutes * 60)
+            try:
+                await queue_sale_return_digest()
+            except Exception as e:
+                print(f"Sale return digest failed: {e}")
+    
+    async def start(self) -> None:
+        await init_sale_return_digest_checkpoint()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+# Create instance
+digest_scheduler = SaleReturnDigestScheduler(settings.sale_return_digest_minutes)
@@ -1,7 +1,30 @@
-from typing import Any, Dict, List, Optional, Union
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Union
 from bson import ObjectId
+from fastapi import HTTPException, status
 from motor.motor_asyncio import AsyncIOMotorCollection
+from ..core.config import settings
 from ..core.database import get_database
+from .pagination import cursor_started_at, decode_cursor, decode_sync_cursor, encode_cursor, encode_sync_cursor
+
+
+# Tombstone log of deleted documents, read by ?updated_since= listings
+DELETIONS_COLLECTION = "deletions"
+
+# Per-collection write counters; list ETags are derived from them
+VERSIONS_COLLECTION = "collection_versions"
+
+
+async def fetch_by_ids(
+    collection: str, ids: Iterable[ObjectId], projection: Dict[str, int]
+) -> Dict[ObjectId, Dict[str, Any]]:
+    """Load the documents of `collection` with the given IDs into a map, with a single $in query"""
+    ids = list(ids)
+    if not ids:
+        return {}
+    db = get_database()
+    cursor = db[collection].find({"_id": {"$in": ids}}, projection=projection)
+    return {doc["_id"]: doc async for doc in cursor}
 
 
 class CRUDBase:
@@ -45,15 +68,19 @@ class CRUDBase:
         # Make sure we don't modify the original doc in-place
         return _convert(doc)
     
-    @staticmethod
-    def serialize_docs(docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    @classmethod
+    def serialize_docs(cls, docs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Convert ObjectId to string in list of documents"""
-        return [CRUDBase.serialize_doc(doc) for doc in docs]
+        return [cls.serialize_doc(doc) for doc in docs]
     
     async def create(self, obj_in: Dict[str, Any]) -> Dict[str, Any]:
         """Create a new document"""
+        now = datetime.utcnow()
+        obj_in.setdefault("created_at", now)
+        obj_in.setdefault("updated_at", now)
         result = await self.collection.insert_one(obj_in)
         obj_in["_id"] = result.inserted_id
+        await self.bump_version()
         return self.serialize_doc(obj_in)
     
     async def get(self, id: Union[str, ObjectId]) -> Optional[Dict[str, Any]]:
@@ -71,10 +98,126 @@ class CRUDBase:
     ) -> List[Dict[str, Any]]:
         """Get multiple documents"""
         filter_dict = filter_dict or {}
-        cursor = self.collection.find(filter_dict).skip(skip).limit(limit)
+        cursor = self.collection.find(filter_dict).sort("_id", 1).skip(skip).limit(limit)
         docs = await cursor.to_list(length=limit)
         return self.serialize_docs(docs)
     
+    async def get_page(
+        self,
+        limit: int = 100,
+        filter_dict: Optional[Dict[str, Any]] = None,
+        cursor: Optional[str] = None,
+        skip: int = 0,
+        total: Optional[str] = None,
+        updated_since: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get one page of documents ordered by _id using keyset pagination.
+        `cursor` is the opaque token from a previous page's next_cursor; each page
+        costs an index range scan regardless of depth. `total` may be "exact"
+        (count_documents on the filter) or "estimated" (collection metadata).
+        `updated_since` (a previous sync_cursor) limits the page to documents
+        changed since then; the first page also carries tombstones for documents
+        deleted since then. Returns {"items", "next_cursor", "total", "sync_cursor"}.
+        """
+        started_at = (cursor_started_at(cursor) if cursor else None) or datetime.utcnow()
+        filter_dict = filter_dict or {}
+        since = None
+        if updated_since:
+            since = self._sync_since(updated_since)
+            filter_dict = {**filter_dict, "updated_at": {"$gte": since}}
+        query = self._keyset_filter(filter_dict, cursor)
+        
+        # Fetch one extra document to learn whether another page exists
+        docs = await self.collection.find(query).sort("_id", 1).skip(skip).limit(limit + 1).to_list(length=limit + 1)
+        has_more = len(docs) > limit
+        docs = docs[:limit]
+        
+        items = self.serialize_docs(docs)
+        if since is not None and not cursor:
+            items.extend(await self.get_deletions(since))
+        return {
+            "items": items,
+            "next_cursor": encode_cursor(docs[-1]["_id"], started_at) if has_more else None,
+            "total": await self.count_total(filter_dict, total),
+            "sync_cursor": encode_sync_cursor(started_at)
+        }
+    
+    @staticmethod
+    def _sync_since(updated_since: str) -> datetime:
+        """
+        Lower bound for a delta sync. Reaches back settings.sync_overlap_seconds so
+        writes stamped just before the previous sync but committed after it are
+        not missed; clients merge by _id, so the overlap is harmless. Raises 410
+        once tombstones for the period may have expired.
+        """
+        since = decode_sync_cursor(updated_since)
+        if since < datetime.utcnow() - timedelta(days=settings.sync_tombstone_days):
+            raise HTTPException(
+                status_code=status.HTTP_410_GONE,
+                detail="Sync cursor has expired; reload the full list"
+            )
+        return since - timedelta(seconds=settings.sync_overlap_seconds)
+    
+    async def get_deletions(self, since: datetime) -> List[Dict[str, Any]]:
+        """Tombstones ({"_id", "deleted": True, "deleted_at"}) for documents deleted since `since`"""
+        db = get_database()
+        cursor = db[DELETIONS_COLLECTION].find(
+            {"collection": self.collection_name, "deleted_at": {"$gte": since}}
+        ).sort("deleted_at", 1)
+        return [
+            {"_id": str(doc["doc_id"]), "deleted": True, "deleted_at": doc["deleted_at"].isoformat()}
+            async for doc in cursor
+        ]
+    
+    async def get_version(self) -> int:
+        """Write counter of this collection; changes whenever a document is created, updated or deleted"""
+        db = get_database()
+        doc = await db[VERSIONS_COLLECTION].find_one({"_id": self.collection_name})
+        return doc["version"] if doc else 0
+    
+    async def bump_version(self) -> None:
+        """Invalidate list ETags of this collection after a write"""
+        db = get_database()
+        await db[VERSIONS_COLLECTION].update_one(
+            {"_id": self.collection_name}, {"$inc": {"version": 1}}, upsert=True
+        )
+    
+    async def record_deletion(self, id: ObjectId) -> None:
+        """Write the tombstone for a deleted document"""
+        await self.record_deletions([id])
+    
+    async def record_deletions(self, ids: List[ObjectId]) -> None:
+        """Write tombstones for several deleted documents with one insert"""
+        if not ids:
+            return
+        db = get_database()
+        now = datetime.utcnow()
+        await db[DELETIONS_COLLECTION].insert_many([
+            {"collection": self.collection_name, "doc_id": id, "deleted_at": now} for id in ids
+        ])
+    
+    async def clear_deletions(self, id: ObjectId) -> None:
+        """Drop the tombstones of a document that exists again (e.g. restored), so sync does not delete it"""
+        db = get_database()
+        await db[DELETIONS_COLLECTION].delete_many({"collection": self.collection_name, "doc_id": id})
+    
+    @staticmethod
+    def _keyset_filter(filter_dict: Dict[str, Any], cursor: Optional[str]) -> Dict[str, Any]:
+        """Restrict a filter to documents after the page `cursor` points at"""
+        if not cursor:
+            return filter_dict
+        after = {"_id": {"$gt": decode_cursor(cursor)}}
+        return {"$and": [filter_dict, after]} if filter_dict else after
+    
+    async def count_total(self, filter_dict: Dict[str, Any], total: Optional[str]) -> Optional[int]:
+        """Count for X-Total-Count: "exact", "estimated" or None to skip counting"""
+        if total == "exact":
+            return await self.collection.count_documents(filter_dict)
+        if total == "estimated":
+            return await self.collection.estimated_document_count()
+        return None
+    
     async def update(
         self, 
         id: Union[str, ObjectId], 
@@ -91,12 +234,14 @@ class CRUDBase:
             updated_doc = await self.get(id)
             return updated_doc
         
+        update_data["updated_at"] = datetime.utcnow()
         result = await self.collection.update_one(
             {"_id": id}, 
             {"$set": update_data}
         )
         
-        if result.modified_count:
+        if result.matched_count:
+            await self.bump_version()
             updated_doc = await self.collection.find_one({"_id": id})
             return self.serialize_doc(updated_doc)
         return None
@@ -107,6 +252,9 @@ class CRUDBase:
             id = ObjectId(id)
         
         result = await self.collection.delete_one({"_id": id})
+        if result.deleted_count:
+            await self.record_deletion(id)
+            await self.bump_version()
         return result.deleted_count > 0
     
     async def count(self, filter_dict: Optional[Dict[str, Any]] = None) -> int:
@@ -1,7 +1,208 @@
-from typing import Any, Dict, List, Optional
+import csv
+import io
+import re
+import zipfile
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from bson import ObjectId
+from fastapi import HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from ..core.database import get_database
+from ..core.config import settings
+from ..utils.cache import LRUCache
 from ..utils.crud_base import CRUDBase
-from ..models.batch import BatchCreate, BatchUpdate
+from ..models.batch import BatchCreate, BatchUpdate, BatchResolve
+
+
+def normalize_batch_code(batch_code: str) -> str:
+    """Form of a batch code that scans are matched on (trimmed, upper case)"""
+    return batch_code.strip().upper()
+
+
+# Fields search_batches matches, with their ranking weights
+SEARCH_FIELDS = (("batch_code", 10), ("contractor", 3), ("colour", 2))
+# Words are indexed by every prefix up to this length
+SEARCH_PREFIX_MAX = 20
+_SEARCH_WORD = re.compile(r"[0-9a-z]+")
+
+# Fields warranty_expires_at is derived from
+WARRANTY_FIELDS = ("production_date", "warranty_period")
+
+
+def search_words(text: Optional[str]) -> List[str]:
+    """Lower-case alphanumeric words of a field or query ("B-24/01" -> ["b", "24", "01"])"""
+    return _SEARCH_WORD.findall((text or "").lower())
+
+
+def search_tokens(batch: Dict[str, Any]) -> List[str]:
+    """Prefixes of every word in the searched fields, stored in `search_tokens`"""
+    tokens: Set[str] = set()
+    for field, _ in SEARCH_FIELDS:
+        for word in search_words(batch.get(field)):
+            tokens.update(word[:n] for n in range(1, min(len(word), SEARCH_PREFIX_MAX) + 1))
+    return sorted(tokens)
+
+
+def search_score(batch: Dict[str, Any], terms: Iterable[str]) -> int:
+    """
+    Rank of a batch for a query: per term, the weight of the best field with a word
+    starting with it (doubled for a whole-word match); an exact batch code wins outright
+    """
+    fields = [(search_words(batch.get(field)), weight) for field, weight in SEARCH_FIELDS]
+    score = 0
+    for term in terms:
+        score += max(
+            (weight * (2 if term in words else 1)
+             for words, weight in fields if any(word.startswith(term) for word in words)),
+            default=0
+        )
+    return score
+
+
+def _as_datetime(value: Any) -> Optional[datetime]:
+    """Naive UTC datetime from a stored datetime or ISO string (None if neither)"""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+        except ValueError:
+            return None
+    return value if isinstance(value, datetime) else None
+
+
+def warranty_expires_at(production_date: Any, warranty_period: Optional[int]) -> Optional[datetime]:
+    """
+    When a batch leaves warranty. Age is counted in whole 30-day months and a batch
+    is expired once that age exceeds warranty_period, i.e. from production_date +
+    30 * (warranty_period + 1) days.
+    """
+    production_date = _as_datetime(production_date)
+    if production_date is None:
+        return None
+    return production_date + timedelta(days=30 * ((warranty_period or 12) + 1))
+
+
+def batch_warranty(batch: Dict[str, Any], now: datetime) -> Optional[Dict[str, Any]]:
+    """Warranty status of a batch from production_date + warranty_period (None without a date)"""
+    production_date = _as_datetime(batch.get("production_date"))
+    if production_date is None:
+        return None
+    warranty_period = batch.get("warranty_period", 12)
+    expires_at = _as_datetime(batch.get("warranty_expires_at")) or warranty_expires_at(production_date, warranty_period)
+    age_months = int((now - production_date).days / 30)
+    is_expired = now >= expires_at
+    return {
+        "warranty_period": warranty_period,
+        "age_months": age_months,
+        "warranty_expires_at": expires_at.isoformat(),
+        "is_expired": is_expired,
+        "requires_confirmation": is_expired
+    }
+
+
+def warranty_check(batch: Dict[str, Any], now: datetime) -> Optional[Dict[str, Any]]:
+    """batch_warranty plus the batch's identity and a message for the operator"""
+    warranty = batch_warranty(batch, now)
+    if warranty is None:
+        return None
+    code, age_months, period = batch.get("batch_code", ""), warranty["age_months"], warranty["warranty_period"]
+    if warranty["is_expired"]:
+        message = f"Batch '{code}' warranty has expired ({age_months} months old, warranty: {period} months)"
+    else:
+        message = f"Batch '{code}' is within warranty ({age_months} months old, {period - age_months} months remaining)"
+    return {
+        "batch_id": str(batch["_id"]),
+        "batch_code": code,
+        "production_date": _as_datetime(batch["production_date"]).isoformat(),
+        **warranty,
+        "message": message
+    }
+
+
+# Import columns naming a referenced document, with the collection and the
+# fields its name may match; "<column>_id" columns take the ID directly
+BATCH_IMPORT_REFERENCES = {
+    "model": ("models", ("name",)),
+    "supplier": ("suppliers", ("name",)),
+    "supervisor": ("users", ("name", "email")),
+}
+
+ImportRow = Tuple[int, Dict[str, Any]]
+
+
+def _import_row(header: List[str], values: Iterable[Any]) -> Dict[str, Any]:
+    """Map a row's cells to lower-case column names, leaving blank cells out"""
+    row = {}
+    for column, value in zip(header, values):
+        if isinstance(value, float) and value.is_integer():
+            value = int(value)
+        if value is None or isinstance(value, datetime):
+            cell = value
+        else:
+            cell = str(value).strip()
+        if column and cell not in (None, ""):
+            row[column] = cell
+    return row
+
+
+def batch_rows_from_csv(file: BinaryIO) -> Iterator[ImportRow]:
+    """Yield (line number, row) from a UTF-8 CSV file one row at a time"""
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text)
+        header = [column.strip().lower() for column in next(reader, [])]
+        for values in reader:
+            row = _import_row(header, values)
+            if row:
+                yield reader.line_num, row
+    finally:
+        # Leave the upload open for its owner to close
+        text.detach()
+
+
+def batch_rows_from_xlsx(file: BinaryIO) -> Iterator[ImportRow]:
+    """Yield (row number, row) from the first sheet of an XLSX workbook, streamed with openpyxl"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="XLSX import needs the openpyxl package; upload CSV instead"
+        )
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError, OSError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Could not read the XLSX workbook"
+        )
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(column or "").strip().lower() for column in next(rows, ())]
+        for number, values in enumerate(rows, start=2):
+            row = _import_row(header, values)
+            if row:
+                yield number, row
+    finally:
+        workbook.close()
+
+
+def _read_import_rows(rows: Iterator[ImportRow], size: int) -> Tuple[List[ImportRow], Optional[Exception]]:
+    """
+    Read up to `size` rows (blocking; run it in the threadpool). Returns the rows and
+    the decode/parse error that stopped reading, if any.
+    """
+    parsed: List[ImportRow] = []
+    try:
+        for row in rows:
+            parsed.append(row)
+            if len(parsed) >= size:
+                break
+    except (ValueError, csv.Error) as e:
+        return parsed, e
+    return parsed, None
 
 
 class CRUDBatch(CRUDBase):
@@ -9,17 +210,175 @@ class CRUDBatch(CRUDBase):
     
     def __init__(self):
         super().__init__("batches")
+        self.barcode_cache = LRUCache(settings.batch_barcode_cache_size, settings.batch_barcode_cache_seconds)
     
-    async def create_batch(self, batch_in: BatchCreate) -> Dict[str, Any]:
-        """Create a new batch"""
+    # Internal index fields, never part of a batch response
+    HIDDEN_FIELDS = ("search_tokens",)
+    
+    @staticmethod
+    def serialize_doc(doc: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """CRUDBase.serialize_doc without HIDDEN_FIELDS"""
+        doc = CRUDBase.serialize_doc(doc)
+        if doc is not None:
+            for field in CRUDBatch.HIDDEN_FIELDS:
+                doc.pop(field, None)
+        return doc
+    
+    @staticmethod
+    def _new_batch_document(batch_in: BatchCreate) -> Dict[str, Any]:
+        """Batch document with its derived fields (normalized code, search tokens, expiry)"""
         batch_data = batch_in.dict()
+        batch_data["batch_code_norm"] = normalize_batch_code(batch_data["batch_code"])
+        batch_data["search_tokens"] = search_tokens(batch_data)
+        batch_data["warranty_expires_at"] = warranty_expires_at(
+            batch_data["production_date"], batch_data["warranty_period"]
+        )
         if "model_id" in batch_data:
             batch_data["model_id"] = ObjectId(batch_data["model_id"])
         if "supplier_id" in batch_data and batch_data["supplier_id"]:
             batch_data["supplier_id"] = ObjectId(batch_data["supplier_id"])
         if "supervisor_id" in batch_data and batch_data["supervisor_id"]:
             batch_data["supervisor_id"] = ObjectId(batch_data["supervisor_id"])
-        return await self.create(batch_data)
+        return batch_data
+    
+    async def create_batch(self, batch_in: BatchCreate) -> Dict[str, Any]:
+        """Create a new batch"""
+        batch_data = self._new_batch_document(batch_in)
+        try:
+            return await self.create(batch_data)
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Batch code '{batch_data['batch_code']}' already exists"
+            )
+    
+    @staticmethod
+    async def _import_references() -> Dict[str, Dict[str, Any]]:
+        """
+        Preload name -> _id maps for BATCH_IMPORT_REFERENCES (names are matched
+        case-insensitively; a name shared by several documents maps to None).
+        Also holds the set of valid IDs under "<column>_ids".
+        """
+        db = get_database()
+        refs: Dict[str, Any] = {}
+        for column, (collection, fields) in BATCH_IMPORT_REFERENCES.items():
+            names: Dict[str, Optional[ObjectId]] = {}
+            ids: Set[ObjectId] = set()
+            async for doc in db[collection].find({}, {field: 1 for field in fields}):
+                ids.add(doc["_id"])
+                for field in fields:
+                    if doc.get(field):
+                        key = str(doc[field]).strip().lower()
+                        names[key] = None if key in names and names[key] != doc["_id"] else doc["_id"]
+            refs[column] = names
+            refs[f"{column}_ids"] = ids
+        return refs
+    
+    @staticmethod
+    def _resolve_import_row(row: Dict[str, Any], refs: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+        """Replace reference names (or ID strings) in an import row with ObjectIds"""
+        data = {k: v for k, v in row.items() if k not in BATCH_IMPORT_REFERENCES}
+        if "production_date" in data:
+            # Spreadsheets usually hold plain dates, which pydantic rejects as datetimes
+            data["production_date"] = _as_datetime(data["production_date"]) or data["production_date"]
+        errors = []
+        for column in BATCH_IMPORT_REFERENCES:
+            id_column = f"{column}_id"
+            if id_column in row:
+                value = row[id_column]
+                if not ObjectId.is_valid(value) or ObjectId(value) not in refs[f"{column}_ids"]:
+                    errors.append({"field": id_column, "message": f"Unknown {column} ID '{value}'"})
+                    continue
+                data[id_column] = ObjectId(value)
+            elif column in row:
+                key = row[column].lower()
+                if key not in refs[column]:
+                    errors.append({"field": column, "message": f"Unknown {column} '{row[column]}'"})
+                elif refs[column][key] is None:
+                    errors.append({"field": column, "message": f"{column.title()} '{row[column]}' is ambiguous; use {id_column}"})
+                else:
+                    data[id_column] = refs[column][key]
+        return data, errors
+    
+    async def import_batches(self, rows: Iterator[ImportRow]) -> Dict[str, Any]:
+        """
+        Create batches from a stream of (line, row) pairs, e.g. batch_rows_from_csv;
+        the stream is read in the threadpool. If it turns out to be unreadable part
+        way, the rows before that point are still imported and the 400 carries the
+        summary of them.
+        Model, supplier and supervisor names are resolved against maps loaded once;
+        valid rows are written settings.batch_import_chunk_size at a time with
+        insert_many(ordered=False), so memory does not grow with the file. Codes that
+        already exist (per the unique batch_code_norm index) are reported as
+        duplicates. Only rows that were not created are listed in "results", up to
+        settings.batch_import_max_results; "counts" covers every row.
+        """
+        refs = await self._import_references()
+        counts: Dict[str, int] = {}
+        results: List[Dict[str, Any]] = []
+        total = 0
+        
+        def report(line: int, row: Dict[str, Any], result_status: str, errors: List[Dict[str, str]]) -> None:
+            counts[result_status] = counts.get(result_status, 0) + 1
+            if result_status != "created" and len(results) < settings.batch_import_max_results:
+                results.append({"line": line, "batch_code": row.get("batch_code"), "status": result_status, "errors": errors})
+        
+        async def flush(chunk: List[Tuple[int, Dict[str, Any], Dict[str, Any]]]) -> None:
+            write_errors = {}
+            try:
+                await self.collection.insert_many([doc for _, _, doc in chunk], ordered=False)
+            except BulkWriteError as e:
+                write_errors = {error["index"]: error for error in e.details.get("writeErrors", [])}
+            for position, (line, row, _) in enumerate(chunk):
+                error = write_errors.get(position)
+                if error is None:
+                    report(line, row, "created", [])
+                elif error.get("code") == 11000:
+                    report(line, row, "duplicate", [{"field": "batch_code", "message": "Batch code already exists"}])
+                else:
+                    report(line, row, "failed", [{"field": "", "message": error.get("errmsg", "Write failed")}])
+        
+        chunk: List[Tuple[int, Dict[str, Any], Dict[str, Any]]] = []
+        line = 1
+        read_error = None
+        while read_error is None:
+            # Decoding and parsing block, so they run in the threadpool a chunk at a time
+            parsed, read_error = await run_in_threadpool(_read_import_rows, rows, settings.batch_import_chunk_size)
+            if not parsed:
+                break
+            for line, row in parsed:
+                total += 1
+                data, errors = self._resolve_import_row(row, refs)
+                if errors:
+                    report(line, row, "invalid", errors)
+                    continue
+                try:
+                    batch_in = BatchCreate(**data)
+                except ValidationError as e:
+                    report(line, row, "invalid", [
+                        {"field": ".".join(str(part) for part in error["loc"]), "message": error["msg"]}
+                        for error in e.errors()
+                    ])
+                    continue
+                now = datetime.utcnow()
+                doc = {**self._new_batch_document(batch_in), "_id": ObjectId(), "created_at": now, "updated_at": now}
+                chunk.append((line, row, doc))
+                if len(chunk) >= settings.batch_import_chunk_size:
+                    await flush(chunk)
+                    chunk = []
+        if chunk:
+            await flush(chunk)
+        
+        if counts.get("created"):
+            await self.bump_version()
+        summary = {"total": total, "counts": counts, "results": results}
+        if read_error is not None:
+            # Rows before the unreadable part were imported; say which
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={"message": f"Could not read the import after line {line}: {read_error}", **summary}
+            )
+        return summary
     
     async def get_batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
         """Get batch by ID"""
@@ -30,34 +389,169 @@ class CRUDBatch(CRUDBase):
         return await self.collection.find_one({"batch_code": batch_code})
     
     async def search_by_barcode(self, barcode: str) -> Optional[Dict[str, Any]]:
-        """Search batch by barcode - batch code search with exact and case-insensitive matching"""
-        barcode = barcode.strip()
+        """
+        Resolve a scanned barcode to its batch, ignoring case and surrounding spaces.
+        Hits come from the in-process LRU cache; a miss is one read on the unique
+        batch_code_norm index (or on batch_code for batches not yet backfilled).
+        """
+        norm = normalize_batch_code(barcode)
+        if not norm:
+            return None
+        cached = self.barcode_cache.get(norm)
+        if cached is not None:
+            return dict(cached)
         
-        # Try exact batch_code match first
-        batch = await self.collection.find_one({"batch_code": barcode})
-        if batch:
-            return self.serialize_doc(batch)
+        batch = await self.collection.find_one({"batch_code_norm": norm})
+        if batch is None:
+            batch = await self.collection.find_one({"batch_code": barcode.strip()})
+        if batch is None:
+            return None
+        batch = self.serialize_doc(batch)
+        self.barcode_cache.set(norm, batch)
+        return dict(batch)
+    
+    async def resolve_barcodes(self, resolve_in: BatchResolve) -> Dict[str, Any]:
+        """
+        Resolve many scanned codes at once: cache hits first, then a single $in over
+        the normalized codes of the rest (plus one over batch_code for batches not yet
+        backfilled). Returns {"batches": {code: batch with "warranty"}, "unknown": [code]},
+        keyed by the codes as scanned.
+        """
+        codes = list(dict.fromkeys(resolve_in.codes))
+        norms = {code: normalize_batch_code(code) for code in codes}
+        found: Dict[str, Dict[str, Any]] = {}
+        for norm in set(norms.values()):
+            cached = self.barcode_cache.get(norm) if norm else None
+            if cached is not None:
+                found[norm] = cached
+        
+        missing = {norm for norm in norms.values() if norm and norm not in found}
+        if missing:
+            async for batch in self.collection.find({"batch_code_norm": {"$in": list(missing)}}):
+                found[batch["batch_code_norm"]] = self.serialize_doc(batch)
+            legacy = {code.strip() for code, norm in norms.items() if norm in missing and norm not in found}
+            if legacy:
+                async for batch in self.collection.find({"batch_code": {"$in": list(legacy)}}):
+                    found[normalize_batch_code(batch["batch_code"])] = self.serialize_doc(batch)
+            for norm in missing:
+                if norm in found:
+                    self.barcode_cache.set(norm, found[norm])
         
-        # Try case-insensitive match
-        batch = await self.collection.find_one({
-            "batch_code": {"$regex": f"^{barcode}$", "$options": "i"}
-        })
-        return self.serialize_doc(batch) if batch else None
+        now = datetime.utcnow()
+        batches, unknown = {}, []
+        for code, norm in norms.items():
+            batch = found.get(norm)
+            if batch is None:
+                unknown.append(code)
+            else:
+                batches[code] = {**batch, "warranty": batch_warranty(batch, now)}
+        return {"batches": batches, "unknown": unknown}
+    
+    async def check_warranties(self, batch_ids: List[str]) -> Dict[str, Any]:
+        """
+        Warranty checks for many batches with one $in query. Returns {"results": [...]}
+        in request order plus the IDs that are "not_found" and those whose
+        production date is missing or unreadable ("invalid").
+        """
+        ids = list(dict.fromkeys(batch_ids))
+        oids = [ObjectId(i) for i in ids if ObjectId.is_valid(i)]
+        projection = {"batch_code": 1, "warranty_expires_at": 1, **{field: 1 for field in WARRANTY_FIELDS}}
+        batches = {
+            str(batch["_id"]): batch
+            async for batch in self.collection.find({"_id": {"$in": oids}}, projection)
+        }
+        now = datetime.utcnow()
+        results, not_found, invalid = [], [], []
+        for batch_id in ids:
+            batch = batches.get(batch_id)
+            if batch is None:
+                not_found.append(batch_id)
+                continue
+            check = warranty_check(batch, now)
+            if check is None:
+                invalid.append(batch_id)
+            else:
+                results.append(check)
+        return {"results": results, "not_found": not_found, "invalid": invalid}
+    
+    async def backfill_warranty_expiry(self, chunk_size: int = 500) -> Dict[str, int]:
+        """Set warranty_expires_at on every batch from its production_date and warranty_period"""
+        projection = {field: 1 for field in WARRANTY_FIELDS}
+        operations, updated, skipped = [], 0, 0
+        now = datetime.utcnow()
+        async for batch in self.collection.find({}, projection):
+            expires_at = warranty_expires_at(batch.get("production_date"), batch.get("warranty_period"))
+            if expires_at is None:
+                skipped += 1
+                continue
+            operations.append(UpdateOne({"_id": batch["_id"]}, {"$set": {"warranty_expires_at": expires_at, "updated_at": now}}))
+            if len(operations) >= chunk_size:
+                await self.collection.bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+            updated += len(operations)
+        self.barcode_cache.clear()
+        if updated:
+            await self.bump_version()
+        return {"updated": updated, "skipped": skipped}
+    
+    async def _barcode_key(self, batch_id: str) -> Optional[str]:
+        """Cache key of a batch's current code, read before it is changed or deleted"""
+        batch = await self.collection.find_one({"_id": ObjectId(batch_id)}, {"batch_code": 1})
+        return normalize_batch_code(batch["batch_code"]) if batch and batch.get("batch_code") else None
+    
+    async def backfill_batch_code_norm(self) -> Dict[str, Any]:
+        """
+        Set batch_code_norm on batches created before it existed. Codes that only
+        differ by case cannot share the unique index, so all but the first of them
+        are left without it and reported in "conflicts".
+        """
+        taken = {
+            doc["batch_code_norm"]
+            async for doc in self.collection.find({"batch_code_norm": {"$type": "string"}}, {"batch_code_norm": 1})
+        }
+        operations, conflicts = [], []
+        now = datetime.utcnow()
+        cursor = self.collection.find({"batch_code_norm": {"$exists": False}}, {"batch_code": 1}).sort("_id", 1)
+        async for batch in cursor:
+            norm = normalize_batch_code(batch.get("batch_code") or "")
+            if not norm or norm in taken:
+                conflicts.append(batch.get("batch_code"))
+                continue
+            taken.add(norm)
+            operations.append(UpdateOne({"_id": batch["_id"]}, {"$set": {"batch_code_norm": norm, "updated_at": now}}))
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+            await self.bump_version()
+        self.barcode_cache.clear()
+        return {"updated": len(operations), "conflicts": conflicts}
     
     async def get_batches(
         self,
         skip: int = 0,
         limit: int = 100,
         model_id: Optional[str] = None,
-        batch_code: Optional[str] = None
-    ) -> List[Dict[str, Any]]:
-        """Get batches with optional filters"""
-        filter_dict = {}
+        batch_code: Optional[str] = None,
+        cursor: Optional[str] = None,
+        total: Optional[str] = None,
+        updated_since: Optional[str] = None,
+        in_warranty: Optional[bool] = None
+    ) -> Dict[str, Any]:
+        """Get a page of batches with optional filters (in_warranty is a range on warranty_expires_at)"""
+        filter_dict: Dict[str, Any] = {}
         if model_id:
             filter_dict["model_id"] = ObjectId(model_id)
         if batch_code:
             filter_dict["batch_code"] = batch_code
-        return await self.get_multi(skip=skip, limit=limit, filter_dict=filter_dict)
+        if in_warranty is not None:
+            now = datetime.utcnow()
+            filter_dict["warranty_expires_at"] = {"$gt": now} if in_warranty else {"$lte": now}
+        return await self.get_page(
+            limit=limit, filter_dict=filter_dict, cursor=cursor, skip=skip, total=total,
+            updated_since=updated_since
+        )
     
     async def update_batch(
         self, 
@@ -72,22 +566,103 @@ class CRUDBatch(CRUDBase):
             batch_data["supplier_id"] = ObjectId(batch_data["supplier_id"])
         if "supervisor_id" in batch_data and batch_data["supervisor_id"]:
             batch_data["supervisor_id"] = ObjectId(batch_data["supervisor_id"])
-        return await self.update(batch_id, batch_data)
+        if batch_data.get("batch_code"):
+            batch_data["batch_code_norm"] = normalize_batch_code(batch_data["batch_code"])
+        # Derived fields are recomputed from the stored batch merged with the changes
+        searched = any(batch_data.get(field) is not None for field, _ in SEARCH_FIELDS)
+        dated = any(batch_data.get(field) is not None for field in WARRANTY_FIELDS)
+        if searched or dated:
+            projection = {field: 1 for field in [f for f, _ in SEARCH_FIELDS] + list(WARRANTY_FIELDS)}
+            current = await self.collection.find_one({"_id": ObjectId(batch_id)}, projection) or {}
+            merged = {**current, **{k: v for k, v in batch_data.items() if v is not None}}
+            if searched:
+                batch_data["search_tokens"] = search_tokens(merged)
+            if dated:
+                batch_data["warranty_expires_at"] = warranty_expires_at(
+                    merged.get("production_date"), merged.get("warranty_period")
+                )
+        key = await self._barcode_key(batch_id)
+        try:
+            return await self.update(batch_id, batch_data)
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Batch code '{batch_data['batch_code']}' already exists"
+            )
+        finally:
+            # After the write, so a scan racing it cannot re-cache the old batch
+            self.barcode_cache.pop(key)
     
     async def delete_batch(self, batch_id: str) -> bool:
         """Delete batch"""
-        return await self.delete(batch_id)
-    
-    async def search_batches(self, search_term: str) -> List[Dict[str, Any]]:
-        """Search batches by batch_code, colour, or contractor"""
-        filter_dict = {
-            "$or": [
-                {"batch_code": {"$regex": search_term, "$options": "i"}},
-                {"colour": {"$regex": search_term, "$options": "i"}},
-                {"contractor": {"$regex": search_term, "$options": "i"}}
-            ]
-        }
-        return await self.get_multi(filter_dict=filter_dict)
+        key = await self._barcode_key(batch_id)
+        deleted = await self.delete(batch_id)
+        self.barcode_cache.pop(key)
+        return deleted
+    
+    async def search_batches(
+        self,
+        q: str,
+        skip: int = 0,
+        limit: int = 20,
+        model_id: Optional[str] = None,
+        supplier_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Ranked search over batch_code, contractor and colour. Every query word must
+        prefix a word of one of those fields; candidates come from the multikey
+        `search_tokens` index (at most settings.batch_search_max_candidates), are ranked
+        with search_score and then paged with skip/limit. A batch whose code equals the
+        query is looked up on its own index and always ranks first, even when the
+        candidates are capped. Returns {"items", "total"}; total counts the ranked
+        candidates, so it never promises pages past the cap.
+        """
+        terms = list(dict.fromkeys(word[:SEARCH_PREFIX_MAX] for word in search_words(q)))
+        if not terms:
+            return {"items": [], "total": 0}
+        filter_dict: Dict[str, Any] = {"search_tokens": {"$all": terms}}
+        if model_id:
+            filter_dict["model_id"] = ObjectId(model_id)
+        if supplier_id:
+            filter_dict["supplier_id"] = ObjectId(supplier_id)
+        
+        norm = normalize_batch_code(q)
+        exact_filter = {key: value for key, value in filter_dict.items() if key != "search_tokens"}
+        exact = await self.collection.find_one({**exact_filter, "batch_code_norm": norm}, {"search_tokens": 0})
+        
+        max_candidates = settings.batch_search_max_candidates
+        candidates = await self.collection.find(filter_dict, {"search_tokens": 0}).limit(max_candidates).to_list(
+            length=max_candidates
+        )
+        if exact is not None:
+            candidates = [exact] + [batch for batch in candidates if batch["_id"] != exact["_id"]]
+        
+        def rank(batch: Dict[str, Any]) -> Any:
+            is_exact = batch.get("batch_code_norm", normalize_batch_code(batch.get("batch_code") or "")) == norm
+            return (not is_exact, -search_score(batch, terms), batch.get("batch_code") or "")
+        
+        candidates.sort(key=rank)
+        return {"items": self.serialize_docs(candidates[skip:skip + limit]), "total": len(candidates)}
+    
+    async def reindex_search_tokens(self, chunk_size: int = 500) -> int:
+        """Recompute search_tokens on every batch (after a backfill or tokenizer change)"""
+        projection = {field: 1 for field, _ in SEARCH_FIELDS}
+        operations, updated = [], 0
+        now = datetime.utcnow()
+        async for batch in self.collection.find({}, projection):
+            operations.append(UpdateOne(
+                {"_id": batch["_id"]}, {"$set": {"search_tokens": search_tokens(batch), "updated_at": now}}
+            ))
+            if len(operations) >= chunk_size:
+                await self.collection.bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+            updated += len(operations)
+        if updated:
+            await self.bump_version()
+        return updated
 
 
 # Create instance
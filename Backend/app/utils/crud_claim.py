@@ -1,11 +1,91 @@
-from typing import Any, Dict, List, Optional
+import asyncio
+import csv
+import io
+import re
+from typing import Any, Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo import ReplaceOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+from pydantic import ValidationError
 from fastapi import HTTPException, status
-from ..utils.crud_base import CRUDBase
-from ..models.claim import Claim, ClaimCreate, ClaimUpdate, ClaimVerify, ClaimStatus, ClaimApprove
-from ..utils.crud_batch import batch_crud
-from ..utils.accounting import send_sale_return_email
+from ..core.config import settings
+from ..core.database import get_database
+from ..utils.crud_base import CRUDBase, fetch_by_ids
+from ..utils.crud_batch import batch_warranty
+from ..utils.crud_merchant import normalize_merchant_name
+from ..utils.sequence import SequenceAllocator
+from ..utils.pagination import encode_cursor
+from ..utils.cache import TTLCache
+from ..utils.rollups import claim_rollups
+from ..utils.events import claim_events
+from ..models.claim import (
+    Claim, ClaimCreate, ClaimUpdate, ClaimVerify, ClaimStatus, ClaimApprove,
+    ClaimImport, ItemVerificationResult, ClaimBulkBilty, ClaimBulkApprove,
+    ClaimBulkVerify, CLAIM_TRANSITION_SOURCES, CLAIM_TERMINAL_STATUSES
+)
+from ..utils.accounting import queue_sale_return_email, queue_sale_return_batch_email
+
+
+def format_claim_id(claim_seq: int) -> str:
+    """Render a claim sequence number as a zero-padded claim ID"""
+    return f"{claim_seq:04d}"
+
+
+def parse_claim_number(claim_id: Optional[str]) -> Optional[int]:
+    """Extract the serial number from a CLM-DATE-XXXX or XXXX claim ID"""
+    if not claim_id:
+        return None
+    try:
+        return int(str(claim_id).split("-")[-1])
+    except ValueError:
+        return None
+
+
+# CSV import layout: one row per item; rows sharing a client_ref form one claim and
+# the claim-level columns are read from its first row
+CLAIM_IMPORT_CSV_COLUMNS = (
+    "client_ref", "rep_id", "merchant_id", "date", "notes",
+    "batch_id", "quantity", "item_notes", "force_add", "force_add_reason"
+)
+CLAIM_IMPORT_ITEM_COLUMNS = {
+    "batch_id": "batch_id", "quantity": "quantity", "item_notes": "notes",
+    "force_add": "force_add", "force_add_reason": "force_add_reason"
+}
+
+
+def claims_from_csv(text: str) -> Tuple[List[Dict[str, Any]], List[List[int]]]:
+    """
+    Group claim import CSV rows into claim dicts for CRUDClaim.import_claims.
+    Returns the claims and, for each claim, the CSV line numbers it came from.
+    """
+    claims: List[Dict[str, Any]] = []
+    lines: List[List[int]] = []
+    by_ref: Dict[str, int] = {}
+    reader = csv.DictReader(io.StringIO(text))
+    for row in reader:
+        # Leave blank cells out so model defaults apply
+        row = {k.strip(): v.strip() for k, v in row.items() if k and v is not None and v.strip()}
+        if not row:
+            continue
+        item = {field: row[column] for column, field in CLAIM_IMPORT_ITEM_COLUMNS.items() if column in row}
+        client_ref = row.get("client_ref")
+        if client_ref and client_ref in by_ref:
+            claims[by_ref[client_ref]]["items"].append(item)
+            lines[by_ref[client_ref]].append(reader.line_num)
+            continue
+        claim = {
+            column: row[column]
+            for column in ("client_ref", "rep_id", "merchant_id", "date", "notes")
+            if column in row
+        }
+        claim["items"] = [item]
+        if client_ref:
+            by_ref[client_ref] = len(claims)
+        claims.append(claim)
+        lines.append([reader.line_num])
+    return claims, lines
 
 
 class CRUDClaim(CRUDBase):
@@ -13,83 +93,192 @@ class CRUDClaim(CRUDBase):
     
     def __init__(self):
         super().__init__("claims")
+        self.claim_sequence = SequenceAllocator(
+            "claim_id",
+            block_size=settings.claim_id_block_size,
+            seed=self._highest_claim_number
+        )
+        self.stats_cache = TTLCache(settings.claim_stats_cache_seconds)
+        self.archive_collection_name = "claims_archive"
+    
+    @property
+    def archive_collection(self) -> AsyncIOMotorCollection:
+        """Collection holding archived (cold) claims"""
+        return get_database()[self.archive_collection_name]
     
-    async def _generate_claim_id(self) -> str:
-        """Generate unique claim ID as a sequential serial number (e.g., 0001, 0002, ...)"""
-        # Find the latest claim ID by sorting numerically
-        latest_claim = await self.collection.find_one(
-            {"claim_id": {"$exists": True, "$ne": None}},
-            sort=[("claim_id", -1)]
+    def _collections(self, include_archived: bool) -> List[AsyncIOMotorCollection]:
+        """Collections to read claims from: hot first, then the archive if asked"""
+        return [self.collection, self.archive_collection] if include_archived else [self.collection]
+    
+    async def _highest_claim_number(self) -> int:
+        """Highest claim number already issued, used to seed the claim_id counter.
+
+        Claims created by the counter carry an integer `claim_seq`; older claims only
+        have a string claim_id in either CLM-DATE-XXXX or XXXX format.
+        """
+        highest = 0
+        latest = await self.collection.find_one(
+            {"claim_seq": {"$exists": True}},
+            sort=[("claim_seq", -1)],
+            projection={"claim_seq": 1}
         )
+        if latest:
+            highest = latest["claim_seq"]
         
-        if latest_claim and "claim_id" in latest_claim:
-            try:
-                # Handle old format (CLM-DATE-XXXX) and new format (XXXX)
-                claim_id_str = latest_claim["claim_id"]
-                if "-" in claim_id_str:
-                    last_num = int(claim_id_str.split("-")[-1])
-                else:
-                    last_num = int(claim_id_str)
-                next_num = last_num + 1
-            except (ValueError, IndexError):
-                next_num = 1
-        else:
-            next_num = 1
-        
-        return f"{next_num:04d}"
-    
-    async def _validate_batch_warranty(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """
-        Validate batch warranty based on production_date + warranty_period.
-        Returns list of warnings for batches past warranty that aren't force_add.
-        """
-        warnings = []
-        
-        for idx, claim_item in enumerate(items):
-            batch_id = claim_item.get("batch_id")
-            force_add = claim_item.get("force_add", False)
-            
-            if not force_add:
-                batch = await batch_crud.get_batch(str(batch_id))
-                if batch:
-                    production_date = batch.get("production_date")
-                    warranty_period = batch.get("warranty_period", 12)
-                    
-                    if isinstance(production_date, str):
-                        try:
-                            production_date = datetime.fromisoformat(production_date.replace('Z', '+00:00'))
-                        except (ValueError, AttributeError):
-                            continue
-                    
-                    if production_date and isinstance(production_date, datetime):
-                        age_months = int((datetime.utcnow() - production_date).days / 30)
-                        if age_months > warranty_period:
-                            warnings.append({
-                                "item_index": idx,
-                                "batch_id": str(batch_id),
-                                "batch_code": batch.get("batch_code"),
-                                "production_date": production_date.isoformat() if hasattr(production_date, 'isoformat') else str(production_date),
-                                "warranty_period": warranty_period,
-                                "age_months": age_months,
-                                "message": f"Batch '{batch.get('batch_code')}' warranty has expired ({age_months} months old, warranty: {warranty_period} months)"
-                            })
-        
-        return warnings
+        cursor = self.collection.find(
+            {"claim_seq": {"$exists": False}, "claim_id": {"$exists": True, "$ne": None}},
+            projection={"claim_id": 1}
+        )
+        async for doc in cursor:
+            number = parse_claim_number(doc["claim_id"])
+            if number is not None and number > highest:
+                highest = number
+        return highest
+    
+    async def _generate_claim_id(self) -> Tuple[int, str]:
+        """Allocate the next claim sequence number and its serial claim ID (e.g., 0001, 0002, ...)"""
+        claim_seq = await self.claim_sequence.next()
+        return claim_seq, format_claim_id(claim_seq)
+    
+    async def backfill_claim_seq(self) -> Dict[str, int]:
+        """
+        Migrate legacy claims (CLM-DATE-XXXX and XXXX IDs) to integer claim_seq values.
+        Numbers that are unparseable or already taken are left without a claim_seq and
+        reported as skipped. The claim_id counter is then advanced past every number seen.
+        """
+        taken = set(await self.collection.distinct("claim_seq", {"claim_seq": {"$exists": True}}))
+        migrated = skipped = 0
+        now = datetime.utcnow()
+        
+        cursor = self.collection.find(
+            {"claim_seq": {"$exists": False}},
+            projection={"claim_id": 1}
+        ).sort("_id", 1)
+        async for doc in cursor:
+            number = parse_claim_number(doc.get("claim_id"))
+            if number is None or number in taken:
+                skipped += 1
+                continue
+            await self.collection.update_one(
+                {"_id": doc["_id"], "claim_seq": {"$exists": False}},
+                {"$set": {"claim_seq": number, "updated_at": now}}
+            )
+            taken.add(number)
+            migrated += 1
+        if migrated:
+            await self.bump_version()
+        
+        highest = await self._highest_claim_number()
+        await self.claim_sequence.collection.update_one(
+            {"_id": self.claim_sequence.name},
+            {"$max": {"seq": highest}},
+            upsert=True
+        )
+        return {"migrated": migrated, "skipped": skipped, "counter": highest}
+    
+    async def _load_references(self, claims: List[Dict[str, Any]]) -> Dict[str, Dict[ObjectId, Dict[str, Any]]]:
+        """
+        Fetch every rep, merchant and batch referenced by the given claims using
+        one $in query per collection. Returns maps keyed by ObjectId.
+        """
+        rep_ids, merchant_ids, batch_ids = set(), set(), set()
+        for claim in claims:
+            if claim.get("rep_id"):
+                rep_ids.add(ObjectId(claim["rep_id"]))
+            if claim.get("merchant_id"):
+                merchant_ids.add(ObjectId(claim["merchant_id"]))
+            for item in claim.get("items", []):
+                if item.get("batch_id"):
+                    batch_ids.add(ObjectId(item["batch_id"]))
+        
+        reps, merchants, batches = await asyncio.gather(
+            fetch_by_ids("users", rep_ids, {"_id": 1}),
+            fetch_by_ids("merchants", merchant_ids, {"_id": 1}),
+            fetch_by_ids("batches", batch_ids, {
+                "batch_code": 1, "production_date": 1, "warranty_period": 1, "warranty_expires_at": 1
+            })
+        )
+        return {"reps": reps, "merchants": merchants, "batches": batches}
+    
+    @staticmethod
+    def _warranty_warning(idx: int, batch: Dict[str, Any], now: datetime) -> Optional[Dict[str, Any]]:
+        """Return a warning if the batch is past its warranty_expires_at"""
+        warranty = batch_warranty(batch, now)
+        if warranty is None or not warranty["is_expired"]:
+            return None
+        return {
+            "item_index": idx,
+            "batch_id": str(batch["_id"]),
+            "batch_code": batch.get("batch_code"),
+            "production_date": batch["production_date"].isoformat()
+            if isinstance(batch["production_date"], datetime) else batch["production_date"],
+            "warranty_period": warranty["warranty_period"],
+            "age_months": warranty["age_months"],
+            "warranty_expires_at": warranty["warranty_expires_at"],
+            "message": f"Batch '{batch.get('batch_code')}' warranty has expired ({warranty['age_months']} months old, warranty: {warranty['warranty_period']} months)"
+        }
+    
+    def _check_references(
+        self,
+        claim_data: Dict[str, Any],
+        refs: Dict[str, Dict[ObjectId, Dict[str, Any]]],
+        now: Optional[datetime] = None
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Validate a claim against preloaded references in memory.
+        Returns (errors, warnings): errors for missing rep/merchant/batches and
+        warranty warnings for expired batches that aren't force_add.
+        """
+        now = now or datetime.utcnow()
+        errors, warnings = [], []
+        
+        if ObjectId(claim_data["rep_id"]) not in refs["reps"]:
+            errors.append({"field": "rep_id", "id": str(claim_data["rep_id"]), "message": "Rep not found"})
+        if ObjectId(claim_data["merchant_id"]) not in refs["merchants"]:
+            errors.append({"field": "merchant_id", "id": str(claim_data["merchant_id"]), "message": "Merchant not found"})
+        
+        for idx, item in enumerate(claim_data.get("items", [])):
+            batch = refs["batches"].get(ObjectId(item["batch_id"]))
+            if batch is None:
+                errors.append({
+                    "field": "batch_id",
+                    "item_index": idx,
+                    "id": str(item["batch_id"]),
+                    "message": f"Item {idx + 1}: batch not found"
+                })
+                continue
+            if not item.get("force_add", False):
+                warning = self._warranty_warning(idx, batch, now)
+                if warning:
+                    warnings.append(warning)
+        
+        return errors, warnings
     
     async def create_claim(self, claim_in: ClaimCreate) -> Dict[str, Any]:
         """Create a new claim with unique claim_id and warranty validation"""
         claim_data = claim_in.dict()
         
         # Validate force_add_reason when force_add=True
-        for idx, item in enumerate(claim_data.get("items", [])):
-            if item.get("force_add") and not item.get("force_add_reason", "").strip():
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"Item {idx + 1}: force_add_reason is required when force_add is True"
-                )
+        force_add_errors = self._force_add_errors(claim_data)
+        if force_add_errors:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=force_add_errors[0]["message"]
+            )
         
-        # Validate batch warranty before creating claim
-        warnings = await self._validate_batch_warranty(claim_data.get("items", []))
+        # Validate rep, merchant, batches and warranty in a single pass
+        refs = await self._load_references([claim_data])
+        errors, warnings = self._check_references(claim_data, refs)
+        if errors:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail={
+                    "error": "invalid_references",
+                    "message": "Some referenced records do not exist",
+                    "errors": errors,
+                    "warnings": warnings
+                }
+            )
         if warnings:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -100,6 +289,17 @@ class CRUDClaim(CRUDBase):
                 }
             )
         
+        # Generate unique claim ID
+        claim_seq, _ = await self._generate_claim_id()
+        self._new_claim_document(claim_data, claim_seq, datetime.utcnow())
+        
+        created = await self.create(claim_data)
+        await self._claims_changed(None, claim_data)
+        return created
+    
+    @staticmethod
+    def _new_claim_document(claim_data: Dict[str, Any], claim_seq: int, now: datetime) -> Dict[str, Any]:
+        """Turn validated claim input into the stored claim document (in place)"""
         # Convert ObjectId fields to proper format
         if "rep_id" in claim_data:
             claim_data["rep_id"] = ObjectId(claim_data["rep_id"])
@@ -111,12 +311,11 @@ class CRUDClaim(CRUDBase):
             if "batch_id" in item:
                 item["batch_id"] = ObjectId(item["batch_id"])
         
-        # Generate unique claim ID
-        claim_data["claim_id"] = await self._generate_claim_id()
+        claim_data["claim_seq"] = claim_seq
+        claim_data["claim_id"] = format_claim_id(claim_seq)
         
         # Add timestamp fields if not present
-        now = datetime.utcnow()
-        if "date" not in claim_data:
+        if not claim_data.get("date"):
             claim_data["date"] = now
         if "created_at" not in claim_data:
             claim_data["created_at"] = now
@@ -128,17 +327,200 @@ class CRUDClaim(CRUDBase):
         # Set default status to Bilty Pending for new claims
         if "status" not in claim_data:
             claim_data["status"] = ClaimStatus.BILTY_PENDING.value
+        claim_data["status_history"] = [
+            {"from": None, "status": claim_data["status"], "at": now, "by": claim_data.get("rep_id")}
+        ]
+        return claim_data
+    
+    @staticmethod
+    def _force_add_errors(claim_data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Items forced past warranty must say why"""
+        return [
+            {
+                "field": "force_add_reason",
+                "item_index": idx,
+                "message": f"Item {idx + 1}: force_add_reason is required when force_add is True"
+            }
+            for idx, item in enumerate(claim_data.get("items", []))
+            if item.get("force_add") and not (item.get("force_add_reason") or "").strip()
+        ]
+    
+    async def import_claims(self, rows: List[Any]) -> Dict[str, Any]:
+        """
+        Validate and insert many claims at once. References are checked with one $in
+        query per collection, claim IDs come from one reserved block and valid claims
+        are written with insert_many(ordered=False). Returns a result per row; rows
+        whose client_ref was already imported are reported as duplicates.
+        """
+        if len(rows) > settings.claim_import_max_claims:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {settings.claim_import_max_claims} claims can be imported at once"
+            )
+        
+        results: List[Dict[str, Any]] = [{"index": idx, "status": "invalid"} for idx in range(len(rows))]
+        parsed: Dict[int, Dict[str, Any]] = {}
+        for idx, row in enumerate(rows):
+            if not isinstance(row, dict):
+                results[idx]["errors"] = [{"field": "", "message": "Each claim must be an object"}]
+                continue
+            if row.get("client_ref"):
+                results[idx]["client_ref"] = row["client_ref"]
+            try:
+                claim_data = ClaimImport(**row).dict()
+            except ValidationError as e:
+                results[idx]["errors"] = [
+                    {"field": ".".join(str(part) for part in error["loc"]), "message": error["msg"]}
+                    for error in e.errors()
+                ]
+                continue
+            errors = self._force_add_errors(claim_data)
+            if errors:
+                results[idx]["errors"] = errors
+                continue
+            if claim_data.get("client_ref") is None:
+                claim_data.pop("client_ref", None)
+            parsed[idx] = claim_data
+        
+        # Replays: skip client_refs imported before or repeated in this request
+        client_refs = [data["client_ref"] for data in parsed.values() if "client_ref" in data]
+        imported = {}
+        if client_refs:
+            cursor = self.collection.find({"client_ref": {"$in": client_refs}}, {"client_ref": 1, "claim_id": 1})
+            imported = {doc["client_ref"]: doc async for doc in cursor}
+        seen = set()
+        for idx, claim_data in list(parsed.items()):
+            client_ref = claim_data.get("client_ref")
+            if client_ref is None:
+                continue
+            if client_ref in imported or client_ref in seen:
+                existing = imported.get(client_ref)
+                results[idx]["status"] = "duplicate"
+                if existing:
+                    results[idx].update(_id=str(existing["_id"]), claim_id=existing.get("claim_id"))
+                del parsed[idx]
+            seen.add(client_ref)
+        
+        refs = await self._load_references(list(parsed.values()))
+        now = datetime.utcnow()
+        ready = []
+        for idx, claim_data in parsed.items():
+            errors, warnings = self._check_references(claim_data, refs, now)
+            if errors or warnings:
+                results[idx].update(
+                    status="invalid" if errors else "needs_confirmation",
+                    errors=errors,
+                    warnings=warnings
+                )
+                continue
+            ready.append(idx)
+        
+        docs = []
+        if ready:
+            first_seq = await self.claim_sequence.reserve(len(ready))
+            for offset, idx in enumerate(ready):
+                claim_data = self._new_claim_document(parsed[idx], first_seq + offset, now)
+                claim_data["_id"] = ObjectId()
+                docs.append(claim_data)
+        
+        write_errors = {}
+        if docs:
+            try:
+                await self.collection.insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                write_errors = {error["index"]: error for error in e.details.get("writeErrors", [])}
+        
+        changes = []
+        for position, (idx, doc) in enumerate(zip(ready, docs)):
+            error = write_errors.get(position)
+            if error is None:
+                results[idx].update(status="created", _id=str(doc["_id"]), claim_id=doc["claim_id"])
+                changes.append((None, doc))
+            else:
+                results[idx].update(
+                    status="duplicate" if error.get("code") == 11000 else "failed",
+                    errors=[{"field": "", "message": error.get("errmsg", "Write failed")}]
+                )
+        if changes:
+            await self._many_claims_changed(changes)
         
-        return await self.create(claim_data)
+        return self._bulk_summary(results)
     
-    async def get_claim(self, claim_id: str) -> Optional[Dict[str, Any]]:
-        """Get claim by ID"""
-        return await self.get(claim_id)
+    async def get_claim(self, claim_id: str, include_archived: bool = False) -> Optional[Dict[str, Any]]:
+        """Get claim by ID, falling back to the archive if `include_archived`"""
+        claim = await self.get(claim_id)
+        if claim is None and include_archived and ObjectId.is_valid(claim_id):
+            archived = await self.archive_collection.find_one({"_id": ObjectId(claim_id)})
+            return self.serialize_doc(archived) if archived else None
+        return claim
     
-    async def get_claim_by_claim_id(self, claim_id: str) -> Optional[Dict[str, Any]]:
+    async def get_claim_by_claim_id(self, claim_id: str, include_archived: bool = False) -> Optional[Dict[str, Any]]:
         """Get claim by unique claim_id (e.g., CLM-20241210-0001)"""
-        claim = await self.collection.find_one({"claim_id": claim_id})
-        return self.serialize_doc(claim) if claim else None
+        for collection in self._collections(include_archived):
+            claim = await collection.find_one({"claim_id": claim_id})
+            if claim:
+                return self.serialize_doc(claim)
+        return None
+    
+    # Match kinds returned by search_claims, best first
+    SEARCH_MATCHES = ("claim_id", "claim_id_prefix", "bilty_number", "merchant")
+    
+    async def search_claims(self, q: str, limit: int = 20, include_archived: bool = False) -> List[Dict[str, Any]]:
+        """
+        Find claims by claim_id prefix, exact bilty number or merchant name prefix.
+        Each lookup is an index range scan (claim_id, bilty_number, and
+        merchant_id + _id for the merchant's newest claims), so cost depends on
+        `limit`, not on the number of claims. Results are ranked by SEARCH_MATCHES,
+        newest first within a kind, and carry the kind in "match". With
+        `include_archived` the same lookups also run against the archive.
+        """
+        q = q.strip()
+        if not q:
+            return []
+        db = get_database()
+        
+        # Anchored, case-sensitive regexes are turned into index bounds, so merchant
+        # names are matched on the lower-cased name_norm
+        claim_id_prefix = {"claim_id": {"$regex": f"^{re.escape(q.upper())}"}}
+        merchants = await db["merchants"].find(
+            {"name_norm": {"$regex": f"^{re.escape(normalize_merchant_name(q))}"}}, {"_id": 1}
+        ).limit(limit).to_list(length=limit)
+        
+        async def _find(filter_dict: Dict[str, Any], sort_key: str = "_id") -> List[Dict[str, Any]]:
+            found = []
+            for collection in self._collections(include_archived):
+                found += await collection.find(filter_dict).sort(sort_key, -1).limit(limit).to_list(length=limit)
+            return found
+        
+        # Newest prefix matches by claim_seq, not the claim_id string ("9999" sorts
+        # after "10000"); the (claim_id, claim_seq) index bounds the scan and the sort
+        # only keeps the top `limit`
+        lookups = [_find(claim_id_prefix, "claim_seq"), _find({"bilty_number": q})]
+        if merchants:
+            lookups.append(_find({"merchant_id": {"$in": [m["_id"] for m in merchants]}}))
+        found = await asyncio.gather(*lookups)
+        
+        ranked: Dict[ObjectId, Tuple[int, Dict[str, Any]]] = {}
+        
+        def _add(claims: List[Dict[str, Any]], kind: str) -> None:
+            rank = self.SEARCH_MATCHES.index(kind)
+            for claim in claims:
+                if claim["_id"] not in ranked or rank < ranked[claim["_id"]][0]:
+                    ranked[claim["_id"]] = (rank, claim)
+        
+        for claim in found[0]:
+            _add([claim], "claim_id" if claim.get("claim_id") == q.upper() else "claim_id_prefix")
+        _add(found[1], "bilty_number")
+        if merchants:
+            _add(found[2], "merchant")
+        
+        # Newest first (ObjectIds grow with insertion time), then stably by match kind
+        ordered = sorted(ranked.values(), key=lambda entry: entry[1]["_id"], reverse=True)
+        ordered.sort(key=lambda entry: entry[0])
+        return [
+            {**self.serialize_doc(claim), "match": self.SEARCH_MATCHES[rank]}
+            for rank, claim in ordered[:limit]
+        ]
     
     async def get_claims(
         self,
@@ -146,9 +528,26 @@ class CRUDClaim(CRUDBase):
         limit: int = 100,
         rep_id: Optional[str] = None,
         merchant_id: Optional[str] = None,
-        verified: Optional[bool] = None
-    ) -> List[Dict[str, Any]]:
-        """Get claims with optional filters"""
+        verified: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        total: Optional[str] = None,
+        updated_since: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get a page of claims with optional filters"""
+        filter_dict = self._claim_filter(rep_id, merchant_id, verified)
+        return await self.get_page(
+            limit=limit, filter_dict=filter_dict, cursor=cursor, skip=skip, total=total,
+            updated_since=updated_since
+        )
+    
+    @staticmethod
+    def _claim_filter(
+        rep_id: Optional[str] = None,
+        merchant_id: Optional[str] = None,
+        verified: Optional[bool] = None,
+        claim_status: Optional[ClaimStatus] = None
+    ) -> Dict[str, Any]:
+        """Build the Mongo filter shared by the claim list endpoints"""
         filter_dict = {}
         
         if rep_id:
@@ -157,20 +556,275 @@ class CRUDClaim(CRUDBase):
             filter_dict["merchant_id"] = ObjectId(merchant_id)
         if verified is not None:
             filter_dict["verified"] = verified
+        if claim_status:
+            filter_dict["status"] = claim_status.value
+        
+        return filter_dict
+    
+    # Names resolved by get_claim_view and the stored reference each one needs
+    VIEW_JOINS = {"merchant_name": "merchant_id", "rep_name": "rep_id"}
+    
+    async def get_claim_view(
+        self,
+        limit: int = 100,
+        rep_id: Optional[str] = None,
+        merchant_id: Optional[str] = None,
+        verified: Optional[bool] = None,
+        claim_status: Optional[ClaimStatus] = None,
+        fields: Optional[List[str]] = None,
+        cursor: Optional[str] = None,
+        total: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Get a page of claims with merchant and rep names, and each item's batch code,
+        model name and product type name, resolved by one $lookup aggregation.
+        `fields` limits the returned claim keys; joins for omitted names are skipped.
+        """
+        filter_dict = self._claim_filter(rep_id, merchant_id, verified, claim_status)
+        wanted = set(fields) if fields else None
+        
+        def want(name: str) -> bool:
+            return wanted is None or name in wanted
+        
+        # Page on claims before joining so the lookups only touch one page
+        pipeline: List[Dict[str, Any]] = [
+            {"$match": self._keyset_filter(filter_dict, cursor)},
+            {"$sort": {"_id": 1}},
+            {"$limit": limit + 1}
+        ]
+        if wanted is not None:
+            stored = {self.VIEW_JOINS.get(name, name) for name in wanted}
+            pipeline.append({"$project": {name: 1 for name in stored}})
+        if want("merchant_name"):
+            pipeline.append({"$lookup": {
+                "from": "merchants", "localField": "merchant_id", "foreignField": "_id", "as": "_merchant"
+            }})
+        if want("rep_name"):
+            pipeline.append({"$lookup": {
+                "from": "users", "localField": "rep_id", "foreignField": "_id", "as": "_rep"
+            }})
+        if want("items"):
+            # Join per item, then regroup the items under their claim
+            pipeline.append({"$unwind": {"path": "$items", "preserveNullAndEmptyArrays": True}})
+            for source, local, alias in (
+                ("batches", "items.batch_id", "_batch"),
+                ("models", "_batch.model_id", "_model"),
+                ("product_types", "_model.product_type_id", "_type")
+            ):
+                pipeline += [
+                    {"$lookup": {"from": source, "localField": local, "foreignField": "_id", "as": alias}},
+                    {"$unwind": {"path": f"${alias}", "preserveNullAndEmptyArrays": True}}
+                ]
+            pipeline += [
+                {"$group": {
+                    "_id": "$_id",
+                    "claim": {"$first": "$$ROOT"},
+                    "items": {"$push": {
+                        "item": "$items",
+                        "batch_code": "$_batch.batch_code",
+                        "model_name": "$_model.name",
+                        "product_type_name": "$_type.name"
+                    }}
+                }},
+                {"$sort": {"_id": 1}}
+            ]
         
-        return await self.get_multi(skip=skip, limit=limit, filter_dict=filter_dict)
+        docs = await self.collection.aggregate(pipeline).to_list(length=limit + 1)
+        has_more = len(docs) > limit
+        
+        claims = []
+        for doc in docs[:limit]:
+            claim = doc
+            if "claim" in doc:
+                claim = doc["claim"]
+                claim["items"] = [
+                    {
+                        **entry["item"],
+                        "batch_code": entry.get("batch_code"),
+                        "model_name": entry.get("model_name"),
+                        "product_type_name": entry.get("product_type_name")
+                    }
+                    for entry in doc["items"] if entry.get("item")
+                ]
+            for alias in ("_batch", "_model", "_type"):
+                claim.pop(alias, None)
+            for name, alias in (("merchant_name", "_merchant"), ("rep_name", "_rep")):
+                if want(name):
+                    joined = claim.pop(alias, None) or [{}]
+                    claim[name] = joined[0].get("name")
+            if wanted is not None:
+                claim = {k: v for k, v in claim.items() if k == "_id" or k in wanted}
+            claims.append(claim)
+        
+        return {
+            "items": self.serialize_docs(claims),
+            "next_cursor": encode_cursor(docs[limit - 1]["_id"]) if has_more else None,
+            "total": await self.count_total(filter_dict, total)
+        }
+    
+    async def _claims_changed(self, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> None:
+        """Bring data derived from claims up to date after a write (None = claim absent)"""
+        await self._many_claims_changed([(before, after)])
+    
+    async def _many_claims_changed(
+        self, changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]
+    ) -> None:
+        """Bring data derived from claims up to date after several writes at once"""
+        self.stats_cache.clear()
+        await self.bump_version()
+        await claim_rollups.apply_many(changes)
+        for before, after in changes:
+            claim_events.publish_write(before, after)
+    
+    async def _update_tracked(self, claim_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """$set fields on a claim and report the change; returns the updated claim or None"""
+        update_data = {k: v for k, v in update_data.items() if v is not None}
+        if not update_data:
+            return await self.get(claim_id)
+        update_data["updated_at"] = datetime.utcnow()
+        before = await self.collection.find_one_and_update(
+            {"_id": ObjectId(claim_id)},
+            {"$set": update_data},
+            return_document=ReturnDocument.BEFORE
+        )
+        if before is None:
+            return None
+        after = {**before, **update_data}
+        await self._claims_changed(before, after)
+        return self.serialize_doc(after)
+    
+    async def _names(self, collection: str, ids: List[Any]) -> Dict[Any, Optional[str]]:
+        """Map document IDs to their `name` with one $in query"""
+        ids = [i for i in ids if i is not None]
+        if not ids:
+            return {}
+        db = get_database()
+        docs = await db[collection].find({"_id": {"$in": ids}}, {"name": 1}).to_list(length=None)
+        return {doc["_id"]: doc.get("name") for doc in docs}
+    
+    async def get_claim_stats(self, include_archived: bool = False) -> Dict[str, Any]:
+        """Claim counts and quantities by status, rep, merchant, model, product type, supplier and month"""
+        if include_archived:
+            return await self.stats_cache.get_or_set(
+                "claims+archive", lambda: self._compute_claim_stats(include_archived=True)
+            )
+        return await self.stats_cache.get_or_set("claims", self._compute_claim_stats)
+    
+    @staticmethod
+    def _merge_facets(facets: List[Dict[str, List[Dict[str, Any]]]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Sum the groups of several $facet results that share a group _id"""
+        merged: Dict[str, Dict[Any, Dict[str, Any]]] = {}
+        for result in facets:
+            for facet, groups in result.items():
+                target = merged.setdefault(facet, {})
+                for group in groups:
+                    if group["_id"] not in target:
+                        target[group["_id"]] = dict(group)
+                        continue
+                    for field, value in group.items():
+                        if field != "_id":
+                            target[group["_id"]][field] += value
+        return {facet: list(groups.values()) for facet, groups in merged.items()}
+    
+    async def _compute_claim_stats(self, include_archived: bool = False) -> Dict[str, Any]:
+        """Run the statistics $facet aggregation and resolve names for each group"""
+        quantity = {"$sum": "$items.quantity"}
+        
+        def by_claim(key: Any) -> List[Dict[str, Any]]:
+            return [{"$group": {"_id": key, "claims": {"$sum": 1}, "quantity": {"$sum": quantity}}}]
+        
+        batch_join = [
+            {"$lookup": {"from": "batches", "localField": "items.batch_id", "foreignField": "_id", "as": "_batch"}},
+            {"$unwind": {"path": "$_batch", "preserveNullAndEmptyArrays": True}}
+        ]
+        model_join = [
+            {"$lookup": {"from": "models", "localField": "_batch.model_id", "foreignField": "_id", "as": "_model"}},
+            {"$unwind": {"path": "$_model", "preserveNullAndEmptyArrays": True}}
+        ]
+        
+        def by_item(key: str, joins: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+            # Group per (key, claim) first so a claim with several matching items counts once
+            return [{"$unwind": "$items"}] + joins + [
+                {"$group": {"_id": {"key": key, "claim": "$_id"}, "quantity": {"$sum": "$items.quantity"}}},
+                {"$group": {"_id": "$_id.key", "claims": {"$sum": 1}, "quantity": {"$sum": "$quantity"}}}
+            ]
+        
+        pipeline = [{"$facet": {
+            "total": [{"$group": {
+                "_id": None,
+                "claims": {"$sum": 1},
+                "verified": {"$sum": {"$cond": [{"$eq": ["$verified", True]}, 1, 0]}},
+                "quantity": {"$sum": quantity}
+            }}],
+            "by_status": by_claim("$status"),
+            "by_rep": by_claim("$rep_id"),
+            "by_merchant": by_claim("$merchant_id"),
+            "by_month": by_claim({"$dateToString": {"format": "%Y-%m", "date": "$date"}}),
+            "by_model": by_item("$_batch.model_id", batch_join),
+            "by_product_type": by_item("$_model.product_type_id", batch_join + model_join),
+            "by_supplier": by_item("$_batch.supplier_id", batch_join)
+        }}]
+        # Each claim lives in exactly one collection, so per-collection groups add up
+        facets = self._merge_facets([
+            (await collection.aggregate(pipeline).to_list(length=1))[0]
+            for collection in self._collections(include_archived)
+        ])
+        
+        total = facets["total"][0] if facets["total"] else {"claims": 0, "verified": 0, "quantity": 0}
+        stats: Dict[str, Any] = {
+            "total": {
+                "claims": total["claims"],
+                "verified": total["verified"],
+                "unverified": total["claims"] - total["verified"],
+                "quantity": total["quantity"]
+            },
+            "by_status": [
+                {"status": g["_id"], "claims": g["claims"], "quantity": g["quantity"]}
+                for g in facets["by_status"]
+            ],
+            "by_month": sorted(
+                ({"month": g["_id"], "claims": g["claims"], "quantity": g["quantity"]} for g in facets["by_month"]),
+                key=lambda g: g["month"] or ""
+            )
+        }
+        
+        named = {
+            "by_rep": "users",
+            "by_merchant": "merchants",
+            "by_model": "models",
+            "by_product_type": "product_types",
+            "by_supplier": "suppliers"
+        }
+        names = await asyncio.gather(*(
+            self._names(collection, [g["_id"] for g in facets[facet]])
+            for facet, collection in named.items()
+        ))
+        for facet, lookup in zip(named, names):
+            groups = [
+                {"id": g["_id"], "name": lookup.get(g["_id"]), "claims": g["claims"], "quantity": g["quantity"]}
+                for g in facets[facet]
+            ]
+            stats[facet] = self.serialize_docs(sorted(groups, key=lambda g: g["quantity"], reverse=True))
+        
+        stats["generated_at"] = datetime.utcnow().isoformat()
+        return stats
     
     async def update_claim(
         self, 
         claim_id: str, 
-        claim_in: ClaimUpdate
+        claim_in: ClaimUpdate,
+        by: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
-        """Update claim"""
+        """
+        Update claim. Verification fields are only set by verify/approve, so a
+        status change to Approved is refused here (409).
+        """
         claim_data = claim_in.dict(exclude_unset=True)
-        
-        # Convert ObjectId fields if present
-        if "verified_by" in claim_data and claim_data["verified_by"]:
-            claim_data["verified_by"] = ObjectId(claim_data["verified_by"])
+        if claim_data.get("status") == ClaimStatus.APPROVED:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Claims are approved through /verify or /approve"
+            )
         
         # Convert batch_ids in items if present
         if "items" in claim_data:
@@ -178,49 +832,356 @@ class CRUDClaim(CRUDBase):
                 if "batch_id" in item:
                     item["batch_id"] = ObjectId(item["batch_id"])
         
-        return await self.update(claim_id, claim_data)
+        # Status changes go through the transition engine; resubmitting the current
+        # status is an ordinary edit
+        target = claim_data.pop("status", None)
+        if target is not None:
+            current = await self.collection.find_one({"_id": ObjectId(claim_id)}, {"status": 1})
+            if current is None:
+                return None
+            if current.get("status") != ClaimStatus(target).value:
+                fields = {k: v for k, v in claim_data.items() if v is not None}
+                claim = await self.transition(claim_id, ClaimStatus(target), fields=fields, by=by)
+                return self.serialize_doc(claim) if claim else None
+        
+        return await self._update_tracked(claim_id, claim_data)
+    
+    @staticmethod
+    def _item_results_expression(results: Dict[ObjectId, ItemVerificationResult]) -> Dict[str, Any]:
+        """
+        Aggregation expression rewriting `items` with per-item verification results.
+        Items are matched against a dict keyed by batch_id, so the work is one $switch
+        branch per result instead of a nested scan on the client. Results are merged
+        into the stored item, so keys ClaimItem does not declare are kept.
+        """
+        branches = [
+            {
+                "case": {"$eq": ["$$item.batch_id", batch_id]},
+                "then": {"$mergeObjects": ["$$item", {
+                    "verification_status": {"$literal": result.status},
+                    "scanned_quantity": {"$literal": result.scanned_quantity}
+                }]}
+            }
+            for batch_id, result in results.items()
+        ]
+        return {
+            "$map": {
+                "input": "$items",
+                "as": "item",
+                "in": {"$switch": {"branches": branches, "default": "$$item"}}
+            }
+        }
+    
+    @staticmethod
+    def _conflict_detail(claim: Dict[str, Any], target: ClaimStatus) -> str:
+        """Explain why a claim in its current state cannot move to `target`"""
+        current = claim.get("status")
+        if current == CLAIM_TRANSITION_SOURCES.get(target) and claim.get("verified"):
+            return f"Claim is already verified and cannot move to '{target.value}'"
+        if current == CLAIM_TRANSITION_SOURCES.get(target) and CRUDClaim._leased(claim, None, datetime.utcnow()):
+            return f"Claim is checked out by another operator until {claim['lease_expires_at'].isoformat()}"
+        return f"Claim is '{current}' and cannot move to '{target.value}'"
+    
+    async def _transition_conflict(self, claim_id: str, target: ClaimStatus) -> None:
+        """
+        Called after a conditional transition matched nothing: return quietly if the claim
+        does not exist (callers report 404), otherwise raise 409 with its current status.
+        """
+        claim = await self.collection.find_one(
+            {"_id": ObjectId(claim_id)},
+            projection={"status": 1, "verified": 1, "leased_by": 1, "lease_expires_at": 1}
+        )
+        if claim is None:
+            return
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=self._conflict_detail(claim, target))
+    
+    @staticmethod
+    def _transition_write(
+        claim_id: ObjectId,
+        source: ClaimStatus,
+        target: ClaimStatus,
+        fields: Optional[Dict[str, Any]],
+        expressions: Optional[Dict[str, Any]],
+        by: Optional[Any],
+        now: datetime,
+        bulk_id: Optional[ObjectId] = None
+    ) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Filter and update pipeline moving one claim from `source` to `target`"""
+        fields = {"updated_at": now, **(fields or {})}
+        filter_dict = {"_id": claim_id, "status": source.value}
+        if fields.get("verified"):
+            filter_dict["verified"] = False
+        if source == ClaimStatus.APPROVAL_PENDING:
+            # Only the operator holding the work-queue lease (if any) may decide the claim; it ends the lease
+            filter_dict.update(CRUDClaim._lease_free(ObjectId(by) if isinstance(by, str) else by, now))
+            fields.update(leased_by=None, lease_expires_at=None)
+        
+        entry = {
+            "from": source.value,
+            "status": target.value,
+            "at": now,
+            "by": ObjectId(by) if isinstance(by, str) else by
+        }
+        if bulk_id is not None:
+            entry["bulk_id"] = bulk_id
+        update_fields = {field: {"$literal": value} for field, value in fields.items()}
+        update_fields.update(expressions or {})
+        update_fields["status"] = {"$literal": target.value}
+        update_fields["status_history"] = {"$concatArrays": [{"$ifNull": ["$status_history", []]}, [entry]]}
+        return filter_dict, [{"$set": update_fields}]
+    
+    @staticmethod
+    def _before_transition(claim: Dict[str, Any], source: ClaimStatus, verifies: bool) -> Dict[str, Any]:
+        """
+        Reconstruct what derived counters need from the claim before a transition:
+        the write filter pinned its status (and verified=False when verifying)
+        """
+        before = {**claim, "status": source.value}
+        if verifies:
+            before["verified"] = False
+        return before
+    
+    async def transition(
+        self,
+        claim_id: str,
+        target: ClaimStatus,
+        fields: Optional[Dict[str, Any]] = None,
+        expressions: Optional[Dict[str, Any]] = None,
+        by: Optional[Any] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Move a claim to `target` along CLAIM_TRANSITIONS with one conditional
+        find_one_and_update filtered on the source status, appending a status_history
+        entry. `fields` are stored as literal values; `expressions` are aggregation
+        expressions evaluated against the claim. Raises 409 if the claim is in another
+        status (or already verified when `fields` verify it); returns None if missing.
+        """
+        source = CLAIM_TRANSITION_SOURCES.get(target)
+        if source is None:
+            await self._transition_conflict(claim_id, target)
+            return None
+        
+        filter_dict, pipeline = self._transition_write(
+            ObjectId(claim_id), source, target, fields, expressions, by, datetime.utcnow()
+        )
+        claim = await self.collection.find_one_and_update(
+            filter_dict,
+            pipeline,
+            return_document=ReturnDocument.AFTER
+        )
+        if claim is None:
+            await self._transition_conflict(claim_id, target)
+            return None
+        
+        verifies = bool((fields or {}).get("verified"))
+        await self._claims_changed(self._before_transition(claim, source, verifies), claim)
+        return claim
+    
+    async def bulk_transition(
+        self,
+        target: ClaimStatus,
+        updates: List[Dict[str, Any]],
+        by: Optional[Any] = None
+    ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """
+        Apply the same transition to many claims with one bulk_write of conditional
+        updates. `updates` are {"id", "fields", "expressions"} dicts. Returns a result per
+        update ({"id", "status": updated | conflict | not_found | invalid, ...}) and the
+        updated claim documents. Derived counters are refreshed once for the batch.
+        Raises 413 past settings.claim_bulk_max_transitions.
+        """
+        if len(updates) > settings.claim_bulk_max_transitions:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"At most {settings.claim_bulk_max_transitions} claims can be updated at once"
+            )
+        
+        source = CLAIM_TRANSITION_SOURCES.get(target)
+        now = datetime.utcnow()
+        bulk_id = ObjectId()
+        results: List[Dict[str, Any]] = []
+        operations, ids, seen = [], [], set()
+        verifies = False
+        for update in updates:
+            result = {"id": update["id"]}
+            results.append(result)
+            if not ObjectId.is_valid(update["id"]):
+                result.update(status="invalid", detail="Invalid claim ID")
+                continue
+            oid = ObjectId(update["id"])
+            if oid in seen:
+                result.update(status="invalid", detail="Claim is listed more than once")
+                continue
+            seen.add(oid)
+            ids.append(oid)
+            if source is None:
+                continue
+            verifies = verifies or bool((update.get("fields") or {}).get("verified"))
+            filter_dict, pipeline = self._transition_write(
+                oid, source, target, update.get("fields"), update.get("expressions"), by, now, bulk_id
+            )
+            operations.append(UpdateOne(filter_dict, pipeline))
+        
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+        
+        # The bulk_id stamped into status_history identifies the claims this batch moved
+        updated: Dict[ObjectId, Dict[str, Any]] = {}
+        if operations:
+            cursor = self.collection.find({"_id": {"$in": ids}, "status_history.bulk_id": bulk_id})
+            updated = {doc["_id"]: doc async for doc in cursor}
+        unchanged = [oid for oid in ids if oid not in updated]
+        current: Dict[ObjectId, Dict[str, Any]] = {}
+        if unchanged:
+            cursor = self.collection.find(
+                {"_id": {"$in": unchanged}},
+                {"status": 1, "verified": 1, "claim_id": 1, "leased_by": 1, "lease_expires_at": 1}
+            )
+            current = {doc["_id"]: doc async for doc in cursor}
+        
+        for result in results:
+            if "status" in result:
+                continue
+            oid = ObjectId(result["id"])
+            if oid in updated:
+                result.update(status="updated", claim_id=updated[oid].get("claim_id"))
+            elif oid in current:
+                result.update(
+                    status="conflict",
+                    claim_id=current[oid].get("claim_id"),
+                    detail=self._conflict_detail(current[oid], target)
+                )
+            else:
+                result.update(status="not_found", detail="Claim not found")
+        
+        claims = [updated[oid] for oid in ids if oid in updated]
+        if claims:
+            await self._many_claims_changed([
+                (self._before_transition(claim, source, verifies), claim) for claim in claims
+            ])
+        return results, claims
     
     async def verify_claim(
         self, 
         claim_id: str, 
         verify_data: ClaimVerify
     ) -> Optional[Dict[str, Any]]:
-        """Verify a claim with per-item approval/rejection results"""
-        update_data = {
+        """
+        Verify an Approval Pending claim with per-item approval/rejection results.
+        Status precondition, item results and the verification fields are applied by a
+        single transition, so concurrent approvals cannot both succeed.
+        """
+        verified_by = ObjectId(verify_data.verified_by)
+        fields = {
             "verified": True,
-            "verified_by": ObjectId(verify_data.verified_by),
+            "verified_by": verified_by,
             "verified_at": datetime.utcnow(),
-            "notes": verify_data.notes,
-            "status": ClaimStatus.APPROVED.value,
-            "updated_at": datetime.utcnow()
+            "notes": verify_data.notes
         }
         
         # Store per-item verification status if provided
+        expressions = {}
         if verify_data.item_results:
-            claim = await self.get(claim_id)
-            if claim:
-                items = claim.get("items", [])
-                for result in verify_data.item_results:
-                    for item in items:
-                        if str(item.get("batch_id")) == str(result.batch_id):
-                            item["verification_status"] = result.status
-                            item["scanned_quantity"] = result.scanned_quantity
-                            break
-                update_data["items"] = items
-        
-        result = await self.update(claim_id, update_data)
-        
-        # Trigger sale return email after successful verification
-        if result:
-            verified_claim = await self.get(claim_id)
-            if verified_claim:
-                await send_sale_return_email(verified_claim)
+            results = {ObjectId(result.batch_id): result for result in verify_data.item_results}
+            expressions["items"] = self._item_results_expression(results)
         
+        claim = await self.transition(
+            claim_id, ClaimStatus.APPROVED, fields=fields, expressions=expressions, by=verified_by
+        )
+        if claim is None:
+            return None
+        
+        # Queue sale return email after successful verification
+        result = self.serialize_doc(claim)
+        await queue_sale_return_email(result)
         return result
     
     async def delete_claim(self, claim_id: str) -> bool:
         """Delete claim"""
-        return await self.delete(claim_id)
+        claim = await self.collection.find_one_and_delete({"_id": ObjectId(claim_id)})
+        if claim is None:
+            return False
+        await self.record_deletion(claim["_id"])
+        await self._claims_changed(claim, None)
+        return True
+    
+    async def archive_claims(
+        self,
+        older_than_days: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        pause_seconds: Optional[float] = None,
+        dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Move Approved/Rejected claims not updated for `older_than_days` from claims to
+        claims_archive, keeping their _id. Each batch is copied to the archive first and
+        then deleted from claims only where it is still eligible, so a claim edited in
+        between stays hot (its archive copy is dropped). Batches are `pause_seconds`
+        apart to leave the server room for live traffic. Rollups already count every
+        claim, archived or not, so they are left alone.
+        """
+        older_than_days = settings.claim_archive_after_days if older_than_days is None else older_than_days
+        batch_size = batch_size or settings.claim_archive_batch_size
+        pause_seconds = settings.claim_archive_pause_seconds if pause_seconds is None else pause_seconds
+        cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+        eligible = {
+            "status": {"$in": [s.value for s in CLAIM_TERMINAL_STATUSES]},
+            "updated_at": {"$lt": cutoff}
+        }
+        if dry_run:
+            return {"eligible": await self.collection.count_documents(eligible), "archived": 0, "batches": 0}
+        
+        archived = batches = 0
+        last_id = None
+        while True:
+            filter_dict = self._keyset_filter(eligible, encode_cursor(last_id) if last_id else None)
+            claims = await self.collection.find(filter_dict).sort("_id", 1).limit(batch_size).to_list(length=batch_size)
+            if not claims:
+                break
+            ids = [claim["_id"] for claim in claims]
+            last_id = ids[-1]
+            now = datetime.utcnow()
+            await self.archive_collection.bulk_write(
+                [ReplaceOne({"_id": claim["_id"]}, {**claim, "archived_at": now}, upsert=True) for claim in claims],
+                ordered=False
+            )
+            result = await self.collection.delete_many({"_id": {"$in": ids}, **eligible})
+            moved = ids
+            if result.deleted_count < len(ids):
+                kept = {doc["_id"] for doc in await self.collection.find({"_id": {"$in": ids}}, {"_id": 1}).to_list(length=None)}
+                await self.archive_collection.delete_many({"_id": {"$in": list(kept)}})
+                moved = [i for i in ids if i not in kept]
+            # Archived claims leave the hot list, so delta sync clients drop them
+            await self.record_deletions(moved)
+            archived += len(moved)
+            batches += 1
+            if len(claims) < batch_size:
+                break
+            await asyncio.sleep(pause_seconds)
+        
+        if archived:
+            self.stats_cache.clear()
+            await self.bump_version()
+        return {"archived": archived, "batches": batches}
+    
+    async def restore_claim(self, claim_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Move one claim (by _id or claim_id) from the archive back to claims; returns it,
+        or None if it is not archived. It gets a fresh updated_at, so delta sync picks
+        it up and the next archive run leaves it alone until it ages again.
+        """
+        key = {"_id": ObjectId(claim_id)} if ObjectId.is_valid(claim_id) else {"claim_id": claim_id}
+        claim = await self.archive_collection.find_one(key)
+        if claim is None:
+            return None
+        claim.pop("archived_at", None)
+        claim["updated_at"] = datetime.utcnow()
+        await self.collection.replace_one({"_id": claim["_id"]}, claim, upsert=True)
+        await self.archive_collection.delete_one({"_id": claim["_id"]})
+        await self.clear_deletions(claim["_id"])
+        self.stats_cache.clear()
+        await self.bump_version()
+        return self.serialize_doc(claim)
     
     async def get_claims_by_rep(self, rep_id: str) -> List[Dict[str, Any]]:
         """Get all claims for a representative"""
@@ -232,36 +1193,179 @@ class CRUDClaim(CRUDBase):
         filter_dict = {"verified": False, "status": {"$ne": ClaimStatus.BILTY_PENDING.value}}
         return await self.get_multi(filter_dict=filter_dict)
     
+    # Claims waiting for factory verification, oldest first; served by the
+    # (verified, status, created_at) index
+    QUEUE_FILTER = {"verified": False, "status": ClaimStatus.APPROVAL_PENDING.value}
+    QUEUE_SORT = [("created_at", 1), ("_id", 1)]
+    
+    @staticmethod
+    def _lease_free(user_id: Optional[ObjectId], now: datetime) -> Dict[str, Any]:
+        """Filter for claims with no live lease, or one held by `user_id`"""
+        conditions: List[Dict[str, Any]] = [{"lease_expires_at": None}, {"lease_expires_at": {"$lte": now}}]
+        if user_id is not None:
+            conditions.append({"leased_by": user_id})
+        return {"$or": conditions}
+    
+    @staticmethod
+    def _leased(claim: Dict[str, Any], user_id: Optional[ObjectId], now: datetime) -> bool:
+        """Whether someone other than `user_id` holds a live lease on the claim"""
+        expires_at = claim.get("lease_expires_at")
+        return bool(expires_at and expires_at > now and claim.get("leased_by") != user_id)
+    
+    async def get_work_queue(
+        self,
+        user_id: str,
+        limit: int = 50,
+        available: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Claims waiting for verification, oldest first. With `available`, claims checked
+        out by other operators are left out. Each claim carries "leased" (someone else
+        holds a live lease) so operators can see what is already being worked on.
+        """
+        now = datetime.utcnow()
+        uid = ObjectId(user_id)
+        filter_dict = dict(self.QUEUE_FILTER)
+        if available:
+            filter_dict.update(self._lease_free(uid, now))
+        claims = await self.collection.find(filter_dict).sort(self.QUEUE_SORT).limit(limit).to_list(length=limit)
+        return [{**self.serialize_doc(claim), "leased": self._leased(claim, uid, now)} for claim in claims]
+    
+    async def checkout_claim(
+        self,
+        user_id: str,
+        claim_id: Optional[str] = None,
+        lease_seconds: Optional[int] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Lease a claim to an operator for `lease_seconds` with one find_one_and_update:
+        the given claim, or the oldest one in the queue nobody else holds. Checking out
+        a claim you already hold renews the lease. Returns None if the claim does not
+        exist or the queue has nothing available; raises 409 if the given claim is not
+        waiting for verification or is checked out by someone else.
+        """
+        now = datetime.utcnow()
+        uid = ObjectId(user_id)
+        lease_seconds = lease_seconds or settings.claim_lease_seconds
+        filter_dict = {**self.QUEUE_FILTER, **self._lease_free(uid, now)}
+        if claim_id is not None:
+            filter_dict["_id"] = ObjectId(claim_id)
+        claim = await self.collection.find_one_and_update(
+            filter_dict,
+            {"$set": {
+                "leased_by": uid,
+                "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                "updated_at": now
+            }},
+            sort=self.QUEUE_SORT,
+            return_document=ReturnDocument.AFTER
+        )
+        if claim is not None:
+            # Lease fields are part of the claim's representation, so its ETags must change
+            await self.bump_version()
+            return self.serialize_doc(claim)
+        if claim_id is None:
+            return None
+        
+        current = await self.collection.find_one({"_id": ObjectId(claim_id)})
+        if current is None:
+            return None
+        if current.get("verified") or current.get("status") != ClaimStatus.APPROVAL_PENDING.value:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Claim is not waiting for verification")
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Claim is checked out by another operator until {current['lease_expires_at'].isoformat()}"
+        )
+    
+    async def release_claim(self, claim_id: str, user_id: str) -> bool:
+        """End the operator's lease on a claim; False if they do not hold one"""
+        result = await self.collection.update_one(
+            {"_id": ObjectId(claim_id), "leased_by": ObjectId(user_id)},
+            {"$set": {"leased_by": None, "lease_expires_at": None, "updated_at": datetime.utcnow()}}
+        )
+        if result.modified_count:
+            await self.bump_version()
+        return result.modified_count > 0
+    
     async def update_bilty_number(
         self, 
         claim_id: str, 
-        bilty_number: str
+        bilty_number: str,
+        by: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
-        """Update bilty number and change status to Approval Pending"""
-        update_data = {
-            "bilty_number": bilty_number,
-            "status": ClaimStatus.APPROVAL_PENDING.value,
-            "updated_at": datetime.utcnow()
-        }
-        
-        return await self.update(claim_id, update_data)
+        """Add the bilty number to a Bilty Pending claim and move it to Approval Pending"""
+        claim = await self.transition(
+            claim_id, ClaimStatus.APPROVAL_PENDING, fields={"bilty_number": bilty_number}, by=by
+        )
+        return self.serialize_doc(claim) if claim else None
     
     async def approve_claim(
         self, 
         claim_id: str, 
         approve_data: ClaimApprove
     ) -> Optional[Dict[str, Any]]:
-        """Approve a claim and change status to Approved"""
-        update_data = {
-            "status": ClaimStatus.APPROVED.value,
+        """Approve an Approval Pending claim and change status to Approved"""
+        verified_by = ObjectId(approve_data.verified_by)
+        fields = {
+            "verified": True,
+            "verified_by": verified_by,
+            "verified_at": datetime.utcnow(),
+            "notes": approve_data.notes
+        }
+        claim = await self.transition(claim_id, ClaimStatus.APPROVED, fields=fields, by=verified_by)
+        return self.serialize_doc(claim) if claim else None
+
+    
+    @staticmethod
+    def _bulk_summary(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for result in results:
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+        return {"total": len(results), "counts": counts, "results": results}
+    
+    async def bulk_update_bilty(self, bulk_in: ClaimBulkBilty, by: Optional[str] = None) -> Dict[str, Any]:
+        """Add bilty numbers to many Bilty Pending claims and move them to Approval Pending"""
+        updates = [{"id": entry.id, "fields": {"bilty_number": entry.bilty_number}} for entry in bulk_in.claims]
+        results, _ = await self.bulk_transition(ClaimStatus.APPROVAL_PENDING, updates, by=by)
+        return self._bulk_summary(results)
+    
+    async def bulk_approve(self, bulk_in: ClaimBulkApprove) -> Dict[str, Any]:
+        """Approve many Approval Pending claims"""
+        verified_by = ObjectId(bulk_in.verified_by)
+        fields = {
+            "verified": True,
+            "verified_by": verified_by,
+            "verified_at": datetime.utcnow(),
+            "notes": bulk_in.notes
+        }
+        updates = [{"id": claim_id, "fields": fields} for claim_id in bulk_in.claim_ids]
+        results, _ = await self.bulk_transition(ClaimStatus.APPROVED, updates, by=verified_by)
+        return self._bulk_summary(results)
+    
+    async def bulk_verify(self, bulk_in: ClaimBulkVerify) -> Dict[str, Any]:
+        """
+        Verify many Approval Pending claims with their per-item results. One sale
+        return email covering every verified claim is queued for the batch.
+        """
+        verified_by = ObjectId(bulk_in.verified_by)
+        fields = {
             "verified": True,
-            "verified_by": ObjectId(approve_data.verified_by),
+            "verified_by": verified_by,
             "verified_at": datetime.utcnow(),
-            "notes": approve_data.notes,
-            "updated_at": datetime.utcnow()
+            "notes": bulk_in.notes
         }
+        updates = []
+        for entry in bulk_in.claims:
+            expressions = {}
+            if entry.item_results:
+                results = {ObjectId(result.batch_id): result for result in entry.item_results}
+                expressions["items"] = self._item_results_expression(results)
+            updates.append({"id": entry.id, "fields": fields, "expressions": expressions})
         
-        return await self.update(claim_id, update_data)
+        results, claims = await self.bulk_transition(ClaimStatus.APPROVED, updates, by=verified_by)
+        if claims:
+            await queue_sale_return_batch_email(claims)
+        return self._bulk_summary(results)
 
 
 # Create instance
@@ -23,15 +23,21 @@ class CRUDLocation(CRUDBase):
         skip: int = 0,
         limit: int = 1000,
         province: Optional[str] = None,
-        is_active: Optional[bool] = None
-    ) -> List[Dict[str, Any]]:
-        """Get locations with optional filters"""
+        is_active: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        total: Optional[str] = None,
+        updated_since: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get a page of locations with optional filters"""
         filter_dict = {}
         if province:
             filter_dict["province"] = province
         if is_active is not None:
             filter_dict["is_active"] = is_active
-        return await self.get_multi(skip=skip, limit=limit, filter_dict=filter_dict)
+        return await self.get_page(
+            limit=limit, filter_dict=filter_dict, cursor=cursor, skip=skip, total=total,
+            updated_since=updated_since
+        )
     
     async def search_locations(self, search_term: str) -> List[Dict[str, Any]]:
         """Search locations by name (type-ahead)"""
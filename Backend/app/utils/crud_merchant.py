@@ -1,9 +1,16 @@
 from typing import Any, Dict, List, Optional
+from datetime import datetime
 from bson import ObjectId
+from pymongo import UpdateOne
 from ..utils.crud_base import CRUDBase
 from ..models.merchant import Merchant, MerchantCreate, MerchantUpdate
 
 
+def normalize_merchant_name(name: str) -> str:
+    """Form of a merchant name that prefix searches match on (trimmed, lower case)"""
+    return name.strip().lower()
+
+
 class CRUDMerchant(CRUDBase):
     """CRUD operations for Merchant"""
     
@@ -13,6 +20,7 @@ class CRUDMerchant(CRUDBase):
     async def create_merchant(self, merchant_in: MerchantCreate) -> Dict[str, Any]:
         """Create a new merchant"""
         merchant_data = merchant_in.dict()
+        merchant_data["name_norm"] = normalize_merchant_name(merchant_data["name"])
         return await self.create(merchant_data)
     
     async def get_merchant(self, merchant_id: str) -> Optional[Dict[str, Any]]:
@@ -23,15 +31,21 @@ class CRUDMerchant(CRUDBase):
         self,
         skip: int = 0,
         limit: int = 100,
-        is_active: Optional[bool] = None
-    ) -> List[Dict[str, Any]]:
-        """Get merchants with optional filters"""
+        is_active: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        total: Optional[str] = None,
+        updated_since: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get a page of merchants with optional filters"""
         filter_dict = {}
         
         if is_active is not None:
             filter_dict["is_active"] = is_active
         
-        return await self.get_multi(skip=skip, limit=limit, filter_dict=filter_dict)
+        return await self.get_page(
+            limit=limit, filter_dict=filter_dict, cursor=cursor, skip=skip, total=total,
+            updated_since=updated_since
+        )
     
     async def update_merchant(
         self, 
@@ -40,6 +54,8 @@ class CRUDMerchant(CRUDBase):
     ) -> Optional[Dict[str, Any]]:
         """Update merchant"""
         merchant_data = merchant_in.dict(exclude_unset=True)
+        if merchant_data.get("name"):
+            merchant_data["name_norm"] = normalize_merchant_name(merchant_data["name"])
         return await self.update(merchant_id, merchant_data)
     
     async def delete_merchant(self, merchant_id: str) -> bool:
@@ -55,6 +71,25 @@ class CRUDMerchant(CRUDBase):
             ]
         }
         return await self.get_multi(filter_dict=filter_dict)
+    
+    async def backfill_name_norm(self, chunk_size: int = 500) -> int:
+        """Set name_norm (used by claim search) on every merchant; returns how many were updated"""
+        operations, updated = [], 0
+        now = datetime.utcnow()
+        async for merchant in self.collection.find({"name": {"$type": "string"}}, {"name": 1}):
+            operations.append(UpdateOne(
+                {"_id": merchant["_id"]}, {"$set": {"name_norm": normalize_merchant_name(merchant["name"]), "updated_at": now}}
+            ))
+            if len(operations) >= chunk_size:
+                await self.collection.bulk_write(operations, ordered=False)
+                updated += len(operations)
+                operations = []
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+            updated += len(operations)
+        if updated:
+            await self.bump_version()
+        return updated
 
 
 # Create instance
@@ -26,15 +26,21 @@ class CRUDProductModel(CRUDBase):
         skip: int = 0,
         limit: int = 100,
         product_type_id: Optional[str] = None,
-        is_active: Optional[bool] = None
-    ) -> List[Dict[str, Any]]:
-        """Get product models with optional filters"""
+        is_active: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        total: Optional[str] = None,
+        updated_since: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get a page of product models with optional filters"""
         filter_dict = {}
         if product_type_id:
             filter_dict["product_type_id"] = ObjectId(product_type_id)
         if is_active is not None:
             filter_dict["is_active"] = is_active
-        return await self.get_multi(skip=skip, limit=limit, filter_dict=filter_dict)
+        return await self.get_page(
+            limit=limit, filter_dict=filter_dict, cursor=cursor, skip=skip, total=total,
+            updated_since=updated_since
+        )
     
     async def update_product_model(
         self, 
@@ -22,13 +22,19 @@ class CRUDProductType(CRUDBase):
         self,
         skip: int = 0,
         limit: int = 100,
-        is_active: Optional[bool] = None
-    ) -> List[Dict[str, Any]]:
-        """Get product types with optional filters"""
+        is_active: Optional[bool] = None,
+        cursor: Optional[str] = None,
+        total: Optional[str] = None,
+        updated_since: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Get a page of product types with optional filters"""
         filter_dict = {}
         if is_active is not None:
             filter_dict["is_active"] = is_active
-        return await self.get_multi(skip=skip, limit=limit, filter_dict=filter_dict)
+        return await self.get_page(
+            limit=limit, filter_dict=filter_dict, cursor=cursor, skip=skip, total=total,
+            updated_since=updated_since
+        )
     
     async def update_product_type(
         self, 
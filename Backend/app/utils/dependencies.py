@@ -1,5 +1,5 @@
 from typing import Optional
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from ..utils.auth import auth_utils
 from ..utils.crud_user import user_crud
@@ -7,13 +7,11 @@ from ..models.user import UserType
 
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
-async def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security)
-) -> dict:
-    """Get current authenticated user"""
-    token = credentials.credentials
+async def _user_from_token(token: str) -> dict:
+    """Resolve a bearer token to an active user"""
     payload = auth_utils.verify_token(token)
     
     if payload is None:
@@ -48,6 +46,29 @@ async def get_current_user(
     return user
 
 
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+) -> dict:
+    """Get current authenticated user"""
+    return await _user_from_token(credentials.credentials)
+
+
+async def get_stream_user(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    access_token: Optional[str] = Query(None)
+) -> dict:
+    """Get the user of a streaming request; browsers' EventSource cannot send
+    headers, so the token may also be passed as ?access_token="""
+    token = credentials.credentials if credentials else access_token
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Not authenticated",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return await _user_from_token(token)
+
+
 async def get_current_active_user(
     current_user: dict = Depends(get_current_user)
 ) -> dict:
@@ -0,0 +1,280 @@
+import asyncio
+import smtplib
+from datetime import datetime, timedelta
+from email.message import Message
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from pymongo import ReturnDocument
+from motor.motor_asyncio import AsyncIOMotorCollection
+from ..core.config import settings
+from ..core.database import get_database
+
+
+class OutboxStatus:
+    """Lifecycle of an email_outbox document"""
+    PENDING = "pending"
+    SENDING = "sending"
+    SENT = "sent"
+    DEAD = "dead"
+
+
+class PermanentEmailError(Exception):
+    """Raised by a renderer when a message can never be sent (no retries)"""
+
+
+Renderer = Callable[[Dict[str, Any]], Awaitable[Message]]
+Transport = Callable[[List[Message]], List[Optional[Exception]]]
+
+
+def smtp_send_messages(messages: List[Message]) -> List[Optional[Exception]]:
+    """
+    Send messages over a single SMTP connection (blocking; run in a thread).
+    Connection and login failures raise; per-message failures are returned
+    in the same order as `messages` (None for delivered). If the connection
+    drops mid-batch, that message and the rest get the error, so the ones
+    already delivered are still marked sent.
+    """
+    results: List[Optional[Exception]] = []
+    with smtplib.SMTP(settings.smtp_host, settings.smtp_port, timeout=settings.smtp_timeout) as server:
+        if settings.smtp_starttls:
+            server.starttls()
+        if settings.smtp_user and settings.smtp_password:
+            server.login(settings.smtp_user, settings.smtp_password)
+        for msg in messages:
+            try:
+                server.send_message(msg)
+                results.append(None)
+            except (smtplib.SMTPServerDisconnected, OSError) as e:
+                results.extend([e] * (len(messages) - len(results)))
+                break
+            except smtplib.SMTPException as e:
+                results.append(e)
+    return results
+
+
+class EmailOutbox:
+    """Durable queue of outgoing emails stored in the `email_outbox` collection.
+
+    Callers enqueue a `kind` plus a small payload; the message itself is rendered
+    by the renderer registered for that kind when the worker picks it up, so
+    enqueueing costs one insert.
+    """
+
+    def __init__(self, collection_name: str = "email_outbox"):
+        self.collection_name = collection_name
+        self.renderers: Dict[str, Renderer] = {}
+        self.wakeup = asyncio.Event()
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        """Get collection instance"""
+        return get_database()[self.collection_name]
+
+    def renderer(self, kind: str):
+        """Decorator registering the coroutine that builds messages of `kind`"""
+        def register(func: Renderer) -> Renderer:
+            self.renderers[kind] = func
+            return func
+        return register
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], job_id: Optional[Any] = None) -> Any:
+        """
+        Queue an email for background delivery and return the outbox document ID.
+        Passing a deterministic `job_id` makes the enqueue idempotent (DuplicateKeyError).
+        """
+        now = datetime.utcnow()
+        job = {
+            "kind": kind,
+            "payload": payload,
+            "status": OutboxStatus.PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "lease_expires_at": None,
+            "last_error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+        if job_id is not None:
+            job["_id"] = job_id
+        result = await self.collection.insert_one(job)
+        self.wakeup.set()
+        return result.inserted_id
+
+    async def claim(self, lease_seconds: int) -> Optional[Dict[str, Any]]:
+        """Atomically lease the oldest due message (or one whose lease expired)"""
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": OutboxStatus.PENDING, "next_attempt_at": {"$lte": now}},
+                    {"status": OutboxStatus.SENDING, "lease_expires_at": {"$lte": now}}
+                ]
+            },
+            {
+                "$set": {
+                    "status": OutboxStatus.SENDING,
+                    "lease_expires_at": now + timedelta(seconds=lease_seconds),
+                    "updated_at": now
+                },
+                "$inc": {"attempts": 1}
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def mark_sent(self, job_id: Any) -> None:
+        now = datetime.utcnow()
+        await self.collection.update_one(
+            {"_id": job_id},
+            {"$set": {"status": OutboxStatus.SENT, "sent_at": now, "lease_expires_at": None, "updated_at": now}}
+        )
+
+    async def mark_failed(self, job: Dict[str, Any], error: str, retry_at: Optional[datetime]) -> None:
+        """Schedule a retry at `retry_at`, or dead-letter the message when it is None"""
+        now = datetime.utcnow()
+        update = {"last_error": error, "lease_expires_at": None, "updated_at": now}
+        if retry_at is None:
+            update.update(status=OutboxStatus.DEAD, dead_at=now)
+        else:
+            update.update(status=OutboxStatus.PENDING, next_attempt_at=retry_at)
+        await self.collection.update_one({"_id": job["_id"]}, {"$set": update})
+
+    async def render(self, job: Dict[str, Any]) -> Message:
+        renderer = self.renderers.get(job["kind"])
+        if renderer is None:
+            raise PermanentEmailError(f"No renderer registered for '{job['kind']}'")
+        return await renderer(job.get("payload") or {})
+
+
+class EmailOutboxWorker:
+    """Background sender draining the outbox with bounded concurrency.
+
+    Runs `concurrency` loops; each leases up to `batch_size` due messages, renders
+    them and hands them to the blocking transport in a thread, which delivers the
+    whole batch over one SMTP connection. Failures are retried with exponential
+    backoff and dead-lettered after `max_attempts`.
+    """
+
+    def __init__(
+        self,
+        outbox: EmailOutbox,
+        transport: Transport = smtp_send_messages,
+        concurrency: int = 2,
+        batch_size: int = 20,
+        max_attempts: int = 6,
+        backoff_seconds: float = 30,
+        max_backoff_seconds: float = 3600,
+        poll_seconds: float = 5,
+        lease_seconds: int = 120
+    ):
+        self.outbox = outbox
+        self.transport = transport
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+
+    def retry_delay(self, attempts: int) -> timedelta:
+        """Exponential backoff: base * 2^(attempts - 1), capped"""
+        delay = self.backoff_seconds * (2 ** max(0, attempts - 1))
+        return timedelta(seconds=min(delay, self.max_backoff_seconds))
+
+    async def _fail(self, job: Dict[str, Any], error: Exception) -> None:
+        retry_at = None
+        if job["attempts"] < self.max_attempts:
+            retry_at = datetime.utcnow() + self.retry_delay(job["attempts"])
+        await self.outbox.mark_failed(job, f"{type(error).__name__}: {error}", retry_at)
+
+    async def process_next(self) -> int:
+        """Send a batch of due messages. Returns how many jobs were handled (0 if none were due)."""
+        jobs = []
+        while len(jobs) < self.batch_size:
+            job = await self.outbox.claim(self.lease_seconds)
+            if job is None:
+                break
+            jobs.append(job)
+        if not jobs:
+            return 0
+
+        ready, messages = [], []
+        for job in jobs:
+            try:
+                messages.append(await self.outbox.render(job))
+                ready.append(job)
+            except PermanentEmailError as e:
+                await self.outbox.mark_failed(job, str(e), None)
+            except Exception as e:
+                await self._fail(job, e)
+
+        if messages:
+            try:
+                results = await asyncio.to_thread(self.transport, messages)
+            except Exception as e:
+                results = [e] * len(messages)
+            for job, error in zip(ready, results):
+                if error is None:
+                    await self.outbox.mark_sent(job["_id"])
+                else:
+                    await self._fail(job, error)
+        return len(jobs)
+
+    async def drain(self) -> int:
+        """Send every message that is currently due; returns how many were processed"""
+        processed = 0
+        while True:
+            handled = await self.process_next()
+            if not handled:
+                return processed
+            processed += handled
+
+    async def _run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                if await self.process_next():
+                    continue
+            except Exception as e:
+                print(f"Email outbox worker error: {e}")
+            self.outbox.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.outbox.wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        """Start the worker loops on the running event loop"""
+        if self._tasks:
+            return
+        self._stopping.clear()
+        self._tasks = [asyncio.create_task(self._run()) for _ in range(self.concurrency)]
+
+    async def stop(self, timeout: float = 30) -> None:
+        """Stop claiming new work, let in-flight sends finish, then flush what is due"""
+        if not self._tasks:
+            return
+        self._stopping.set()
+        self.outbox.wakeup.set()
+        done, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        self._tasks = []
+        if not pending:
+            try:
+                await asyncio.wait_for(self.drain(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+# Create instances
+email_outbox = EmailOutbox()
+email_worker = EmailOutboxWorker(
+    email_outbox,
+    concurrency=settings.email_outbox_concurrency,
+    batch_size=settings.email_outbox_batch_size,
+    max_attempts=settings.email_outbox_max_attempts,
+    backoff_seconds=settings.email_outbox_backoff_seconds,
+    poll_seconds=settings.email_outbox_poll_seconds
+)
@@ -0,0 +1,52 @@
+import hashlib
+from typing import Any, Dict, Optional
+from fastapi import Request, Response, status
+from .crud_base import CRUDBase
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag from the values a representation is derived from"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+async def list_etag(request: Request, crud: CRUDBase) -> str:
+    """
+    ETag of a list response: the collection's write counter plus the query string.
+    Read the counter before querying, so a write racing the query can only make
+    the tag older than the body, never newer.
+    """
+    return make_etag(crud.collection_name, await crud.get_version(), request.url.query)
+
+
+def document_etag(crud: CRUDBase, doc: Dict[str, Any]) -> Optional[str]:
+    """ETag of a detail response, from the document's updated_at (None if it has none)"""
+    if not doc.get("updated_at"):
+        return None
+    return make_etag(crud.collection_name, doc["_id"], doc["updated_at"])
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 specifies for GET)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag in candidates
+
+
+def check_etag(request: Request, response: Response, etag: Optional[str]) -> Optional[Response]:
+    """
+    Set the ETag header; returns a 304 response to send instead if the client's copy
+    is current. `no-cache` makes browsers revalidate every time, so the desktop app
+    gets 304s from its HTTP cache without sending If-None-Match itself.
+    """
+    if etag is None:
+        return None
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
@@ -0,0 +1,240 @@
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Set
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import OperationFailure, PyMongoError
+from ..core.database import get_database
+from ..models.user import UserType
+from .crud_base import CRUDBase
+
+
+# Event types sent on /api/claims/events
+CLAIM_CREATED = "created"
+CLAIM_UPDATED = "updated"
+CLAIM_TRANSITION = "transition"
+CLAIM_DELETED = "deleted"
+# Sent instead of the missed events when a slow subscriber's queue overflows
+CLAIM_RESYNC = "resync"
+
+# How long EventSource clients wait before reconnecting
+SSE_RETRY_MS = 3000
+
+# OperationFailure codes meaning the server cannot open change streams
+# (40573: "The $changeStream stage is only supported on replica sets")
+CHANGE_STREAMS_UNSUPPORTED_CODES = (40573,)
+
+
+def claim_event(
+    kind: str,
+    claim: Optional[Dict[str, Any]],
+    claim_id: Any,
+    rep_id: Any = None,
+    previous_status: Optional[str] = None
+) -> Dict[str, Any]:
+    """Build an event; `claim` is the document after the change (None for deletes)"""
+    event: Dict[str, Any] = {
+        "type": kind,
+        "claim_id": str(claim_id),
+        "rep_id": str(rep_id) if rep_id is not None else None,
+        "claim": CRUDBase.serialize_doc(claim)
+    }
+    if kind == CLAIM_TRANSITION:
+        event["from"] = previous_status
+        event["status"] = claim.get("status") if claim else None
+    return event
+
+
+def event_from_write(before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Event for a claim write made by this process (None = absent)"""
+    if after is None:
+        if before is None:
+            return None
+        return claim_event(CLAIM_DELETED, None, before["_id"], before.get("rep_id"))
+    if before is None:
+        return claim_event(CLAIM_CREATED, after, after["_id"], after.get("rep_id"))
+    if before.get("status") != after.get("status"):
+        return claim_event(CLAIM_TRANSITION, after, after["_id"], after.get("rep_id"), before.get("status"))
+    return claim_event(CLAIM_UPDATED, after, after["_id"], after.get("rep_id"))
+
+
+def event_from_change(change: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Event for a change stream document. The previous status of a transition comes
+    from the status_history entry it appended. Deletes carry no document, so their
+    rep is unknown and only roles that see every claim receive them.
+    """
+    operation = change.get("operationType")
+    claim_id = (change.get("documentKey") or {}).get("_id")
+    claim = change.get("fullDocument")
+    if operation == "delete":
+        return claim_event(CLAIM_DELETED, None, claim_id)
+    if claim is None:
+        # Updated and then deleted before the lookup; the delete event follows
+        return None
+    if operation == "insert":
+        return claim_event(CLAIM_CREATED, claim, claim_id, claim.get("rep_id"))
+    if operation in ("update", "replace"):
+        updated = (change.get("updateDescription") or {}).get("updatedFields") or {}
+        if "status" in updated:
+            history = claim.get("status_history") or []
+            previous = history[-1].get("from") if history else None
+            return claim_event(CLAIM_TRANSITION, claim, claim_id, claim.get("rep_id"), previous)
+        return claim_event(CLAIM_UPDATED, claim, claim_id, claim.get("rep_id"))
+    return None
+
+
+def event_visible(event: Dict[str, Any], user: Dict[str, Any]) -> bool:
+    """Reps only see events for their own claims; other roles see every claim"""
+    if event["type"] == CLAIM_RESYNC or user["type"] != UserType.REP.value:
+        return True
+    return event.get("rep_id") is not None and event["rep_id"] == str(user["_id"])
+
+
+class ClaimEventBus:
+    """In-process fan-out of claim change events to SSE subscribers.
+
+    Events come either from a MongoDB change stream (see ClaimChangeStream), which
+    sees writes made by every worker, or - when change streams are unavailable,
+    e.g. on a standalone server - from this process's own claim writes. Each
+    subscriber gets a bounded queue; one that falls behind is sent a single
+    `resync` event instead of the events it missed.
+    """
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self.change_stream_active = False
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._next_id = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: Optional[Dict[str, Any]]) -> None:
+        """Send an event to every subscriber without waiting"""
+        if event is None or not self._subscribers:
+            return
+        self._next_id += 1
+        event = {"id": self._next_id, **event}
+        for queue in self._subscribers:
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"id": self._next_id, "type": CLAIM_RESYNC})
+
+    def publish_write(self, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> None:
+        """Report a claim write from this process; skipped while a change stream feeds the bus"""
+        if not self.change_stream_active:
+            self.publish(event_from_write(before, after))
+
+    @asynccontextmanager
+    async def subscribe(self) -> AsyncIterator[asyncio.Queue]:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        try:
+            yield queue
+        finally:
+            self._subscribers.discard(queue)
+
+
+class ClaimChangeStream:
+    """Feed a ClaimEventBus from a change stream on `claims`.
+
+    If the server does not support change streams the bus stays on in-process
+    events. A stream lost to a network error is reopened from its resume token;
+    in-process events cover the gap meanwhile.
+    """
+
+    def __init__(self, bus: ClaimEventBus, collection_name: str = "claims", retry_seconds: float = 5):
+        self.bus = bus
+        self.collection_name = collection_name
+        self.retry_seconds = retry_seconds
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        """Get collection instance"""
+        return get_database()[self.collection_name]
+
+    @staticmethod
+    def unsupported(error: Exception) -> bool:
+        """Whether opening a stream failed because the deployment has no change streams"""
+        if isinstance(error, OperationFailure):
+            return error.code in CHANGE_STREAMS_UNSUPPORTED_CODES
+        return isinstance(error, NotImplementedError)
+
+    async def _run(self) -> None:
+        resume_token = None
+        opened = False
+        while True:
+            try:
+                async with self.collection.watch(
+                    full_document="updateLookup", resume_after=resume_token
+                ) as stream:
+                    opened = self.bus.change_stream_active = True
+                    async for change in stream:
+                        resume_token = stream.resume_token
+                        self.bus.publish(event_from_change(change))
+            except Exception as e:
+                self.bus.change_stream_active = False
+                if not opened and self.unsupported(e):
+                    # Standalone server
+                    print(f"Claim change stream unavailable, using in-process events: {e}")
+                    return
+                if isinstance(e, PyMongoError) and not isinstance(e, OperationFailure):
+                    print(f"Claim change stream interrupted: {e}")
+                else:
+                    # e.g. the resume token fell off the oplog; start a fresh stream
+                    print(f"Claim change stream failed: {e}")
+                    resume_token = None
+                    self.bus.publish({"type": CLAIM_RESYNC})
+                await asyncio.sleep(self.retry_seconds)
+
+    def start(self) -> None:
+        """Start watching on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self.bus.change_stream_active = False
+
+
+def format_sse(event: Dict[str, Any]) -> str:
+    """Serialize an event in text/event-stream framing"""
+    data = {key: value for key, value in event.items() if key not in ("id", "rep_id")}
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {json.dumps(data)}\n\n"
+
+
+async def claim_event_stream(
+    bus: ClaimEventBus,
+    user: Dict[str, Any],
+    is_disconnected: Callable[[], Awaitable[bool]],
+    keepalive_seconds: float = 15
+) -> AsyncIterator[str]:
+    """Yield the SSE frames visible to `user` until the client disconnects"""
+    async with bus.subscribe() as queue:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while not await is_disconnected():
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=keepalive_seconds)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            if event_visible(event, user):
+                yield format_sse(event)
+
+
+# Create instances
+claim_events = ClaimEventBus()
+claim_change_stream = ClaimChangeStream(claim_events)
@@ -0,0 +1,87 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, Optional
+from bson import ObjectId
+from bson.errors import InvalidId
+from fastapi import HTTPException, Request, Response, status
+
+
+# Query value for ?total=: count matching documents exactly, or use the
+# collection's metadata count (cheap, ignores filters)
+TOTAL_PATTERN = "^(exact|estimated)$"
+
+
+def _encode_token(data: Dict[str, Any]) -> str:
+    raw = json.dumps(data, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def _decode_token(token: str) -> Dict[str, Any]:
+    padded = token + "=" * (-len(token) % 4)
+    data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    if not isinstance(data, dict):
+        raise ValueError("cursor is not an object")
+    return data
+
+
+def encode_cursor(last_id: ObjectId, started_at: Optional[datetime] = None) -> str:
+    """Opaque cursor token pointing after `last_id`; `started_at` is when the first page was read"""
+    data = {"after": str(last_id)}
+    if started_at is not None:
+        data["at"] = started_at.isoformat()
+    return _encode_token(data)
+
+
+def decode_cursor(token: str) -> ObjectId:
+    """Decode a cursor token produced by encode_cursor"""
+    try:
+        return ObjectId(_decode_token(token)["after"])
+    except (ValueError, KeyError, TypeError, InvalidId):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid pagination cursor"
+        )
+
+
+def cursor_started_at(token: str) -> Optional[datetime]:
+    """When the first page of a listing was read, if the cursor records it"""
+    try:
+        at = _decode_token(token).get("at")
+        return datetime.fromisoformat(at) if at else None
+    except (ValueError, TypeError):
+        return None
+
+
+def encode_sync_cursor(at: datetime) -> str:
+    """Opaque ?updated_since= token for changes made from `at` on"""
+    return _encode_token({"since": at.isoformat()})
+
+
+def decode_sync_cursor(token: str) -> datetime:
+    """Decode a sync token produced by encode_sync_cursor"""
+    try:
+        return datetime.fromisoformat(_decode_token(token)["since"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync cursor"
+        )
+
+
+def set_page_headers(request: Request, response: Response, page: Dict[str, Any]) -> None:
+    """Expose keyset pagination metadata without changing list response bodies.
+
+    Sets `Link: <...>; rel="next"` and `X-Next-Cursor` when another page exists,
+    `X-Total-Count` when a total was requested, and `X-Sync-Cursor` - the
+    ?updated_since= value that fetches what changes after this request.
+    """
+    next_cursor: Optional[str] = page.get("next_cursor")
+    if next_cursor:
+        next_url = request.url.remove_query_params("skip").include_query_params(cursor=next_cursor)
+        response.headers["Link"] = f'<{next_url}>; rel="next"'
+        response.headers["X-Next-Cursor"] = next_cursor
+    if page.get("total") is not None:
+        response.headers["X-Total-Count"] = str(page["total"])
+    if page.get("sync_cursor"):
+        response.headers["X-Sync-Cursor"] = page["sync_cursor"]
@@ -0,0 +1,200 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from pymongo import UpdateOne
+from motor.motor_asyncio import AsyncIOMotorCollection
+from ..core.database import get_database
+
+
+# Rollup dimensions; each rollup document is keyed "<dimension>:<key>"
+ROLLUP_DIMENSIONS = ("total", "day", "month", "rep", "merchant", "model")
+
+# Claim fields needed to compute a claim's rollup contribution
+CLAIM_ROLLUP_PROJECTION = {
+    "date": 1, "created_at": 1, "rep_id": 1, "merchant_id": 1,
+    "status": 1, "verified": 1, "items.batch_id": 1, "items.quantity": 1
+}
+
+Counters = Dict[str, int]
+
+
+def _claim_day(claim: Dict[str, Any]) -> Optional[datetime]:
+    value = claim.get("date") or claim.get("created_at")
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    return value if isinstance(value, datetime) else None
+
+
+def claim_contribution(claim: Dict[str, Any], batch_models: Dict[Any, Any]) -> Dict[str, Counters]:
+    """
+    Counters one claim adds to each rollup document: claims, quantity, verified
+    and statuses.<status>. A claim counts once per model it has items for.
+    """
+    def counters(quantity: int) -> Counters:
+        values = {"claims": 1, "quantity": quantity}
+        if claim.get("status"):
+            values[f"statuses.{claim['status']}"] = 1
+        if claim.get("verified"):
+            values["verified"] = 1
+        return values
+
+    model_quantities: Dict[Any, int] = defaultdict(int)
+    for item in claim.get("items") or []:
+        model_id = batch_models.get(item.get("batch_id"))
+        model_quantities[model_id] += item.get("quantity") or 0
+
+    keys = ["total:all"]
+    day = _claim_day(claim)
+    if day is not None:
+        keys += [f"day:{day:%Y-%m-%d}", f"month:{day:%Y-%m}"]
+    if claim.get("rep_id"):
+        keys.append(f"rep:{claim['rep_id']}")
+    if claim.get("merchant_id"):
+        keys.append(f"merchant:{claim['merchant_id']}")
+
+    total = counters(sum(model_quantities.values()))
+    contribution = {key: dict(total) for key in keys}
+    for model_id, quantity in model_quantities.items():
+        if model_id is not None:
+            contribution[f"model:{model_id}"] = counters(quantity)
+    return contribution
+
+
+def _add(target: Dict[str, Counters], contribution: Dict[str, Counters], sign: int) -> None:
+    for rollup_id, values in contribution.items():
+        bucket = target.setdefault(rollup_id, defaultdict(int))
+        for field, amount in values.items():
+            bucket[field] += sign * amount
+
+
+class ClaimRollups:
+    """Incrementally maintained claim counters in the `claim_rollups` collection.
+
+    Each document holds claims, quantity, verified and per-status counts for one
+    dimension key (the overall total, a day, a month, a rep, a merchant or a
+    model). Claim writes report the claim before and after the change and only
+    the difference is applied with $inc. `rebuild` recomputes everything from
+    `claims` to detect or repair drift.
+    """
+
+    def __init__(self, collection_name: str = "claim_rollups"):
+        self.collection_name = collection_name
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        """Get collection instance"""
+        return get_database()[self.collection_name]
+
+    @staticmethod
+    async def _batch_models(batch_ids: Iterable[Any]) -> Dict[Any, Any]:
+        """Map batch IDs to their model_id with one $in query"""
+        ids = list({i for i in batch_ids if i is not None})
+        if not ids:
+            return {}
+        db = get_database()
+        batches = await db["batches"].find({"_id": {"$in": ids}}, {"model_id": 1}).to_list(length=None)
+        return {batch["_id"]: batch.get("model_id") for batch in batches}
+
+    async def apply(self, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> None:
+        """$inc the rollups by the difference between two versions of a claim (None = absent)"""
+        await self.apply_many([(before, after)])
+
+    async def apply_many(self, changes: List[Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]]) -> None:
+        """Apply several (before, after) claim changes with one batch lookup and one bulk write"""
+        claims = [claim for change in changes for claim in change if claim]
+        batch_models = await self._batch_models(
+            item.get("batch_id") for claim in claims for item in claim.get("items") or []
+        )
+        delta: Dict[str, Counters] = {}
+        for before, after in changes:
+            if before:
+                _add(delta, claim_contribution(before, batch_models), -1)
+            if after:
+                _add(delta, claim_contribution(after, batch_models), 1)
+
+        now = datetime.utcnow()
+        operations = []
+        for rollup_id, values in delta.items():
+            increments = {field: amount for field, amount in values.items() if amount}
+            if not increments:
+                continue
+            dimension, key = rollup_id.split(":", 1)
+            operations.append(UpdateOne(
+                {"_id": rollup_id},
+                {
+                    "$inc": increments,
+                    "$set": {"updated_at": now},
+                    "$setOnInsert": {"dimension": dimension, "key": key}
+                },
+                upsert=True
+            ))
+        if operations:
+            await self.collection.bulk_write(operations, ordered=False)
+
+    async def get_rollups(self, dimension: str, keys: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Read the rollup documents of one dimension, optionally limited to some keys"""
+        filter_dict: Dict[str, Any] = {"dimension": dimension}
+        if keys:
+            filter_dict["_id"] = {"$in": [f"{dimension}:{key}" for key in keys]}
+        return await self.collection.find(filter_dict, {"updated_at": 0}).sort("key", 1).to_list(length=None)
+
+    async def compute(self) -> Dict[str, Dict[str, Any]]:
+        """Recompute every rollup document from claims and claims_archive (rollups count both)"""
+        db = get_database()
+        batches = await db["batches"].find({}, {"model_id": 1}).to_list(length=None)
+        batch_models = {batch["_id"]: batch.get("model_id") for batch in batches}
+
+        totals: Dict[str, Counters] = {}
+        for collection in ("claims", "claims_archive"):
+            async for claim in db[collection].find({}, CLAIM_ROLLUP_PROJECTION):
+                _add(totals, claim_contribution(claim, batch_models), 1)
+
+        docs = {}
+        for rollup_id, values in totals.items():
+            dimension, key = rollup_id.split(":", 1)
+            doc: Dict[str, Any] = {"_id": rollup_id, "dimension": dimension, "key": key, "statuses": {}}
+            for field, amount in values.items():
+                if field.startswith("statuses."):
+                    doc["statuses"][field.split(".", 1)[1]] = amount
+                else:
+                    doc[field] = amount
+            docs[rollup_id] = doc
+        return docs
+
+    async def rebuild(self, apply: bool = True) -> Dict[str, Any]:
+        """
+        Compare stored rollups with a fresh recomputation. Returns {"documents",
+        "drift"} where drift lists [rollup_id, field, stored, expected]; with
+        `apply` the collection is replaced by the recomputed documents.
+        Run while claims are not being written, or writes made meanwhile are lost.
+        """
+        expected = await self.compute()
+        stored = {doc["_id"]: doc async for doc in self.collection.find({})}
+
+        def flatten(doc: Optional[Dict[str, Any]]) -> Counters:
+            if not doc:
+                return {}
+            values = {f: doc.get(f, 0) for f in ("claims", "quantity", "verified")}
+            values.update({f"statuses.{s}": n for s, n in (doc.get("statuses") or {}).items()})
+            return values
+
+        drift = []
+        for rollup_id in sorted(set(expected) | set(stored)):
+            have, want = flatten(stored.get(rollup_id)), flatten(expected.get(rollup_id))
+            for field in sorted(set(have) | set(want)):
+                if have.get(field, 0) != want.get(field, 0):
+                    drift.append([rollup_id, field, have.get(field, 0), want.get(field, 0)])
+
+        if apply and drift:
+            now = datetime.utcnow()
+            await self.collection.delete_many({})
+            if expected:
+                await self.collection.insert_many([{**doc, "updated_at": now} for doc in expected.values()])
+        return {"documents": len(expected), "drift": drift}
+
+
+# Create instance
+claim_rollups = ClaimRollups()
@@ -0,0 +1,82 @@
+import asyncio
+from typing import Awaitable, Callable, Optional
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from motor.motor_asyncio import AsyncIOMotorCollection
+from ..core.database import get_database
+
+
+class SequenceAllocator:
+    """Atomic integer sequence backed by the `counters` collection.
+
+    Each counter is a single document ``{"_id": <name>, "seq": <last issued>}``
+    advanced with ``$inc``, so concurrent workers never receive the same value.
+    With ``block_size > 1`` a worker leases a block of values per round trip and
+    hands them out locally; unused values in a lease are skipped on restart.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        block_size: int = 1,
+        seed: Optional[Callable[[], Awaitable[int]]] = None
+    ):
+        self.name = name
+        self.block_size = max(1, block_size)
+        self.seed = seed
+        self._lock = asyncio.Lock()
+        self._next: Optional[int] = None
+        self._end: Optional[int] = None
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        """Get counters collection instance"""
+        return get_database()["counters"]
+
+    async def _ensure_seeded(self) -> None:
+        """Create the counter document, starting after the highest existing value"""
+        start = await self.seed() if self.seed else 0
+        try:
+            # $max keeps this idempotent if another worker seeded concurrently
+            await self.collection.update_one(
+                {"_id": self.name},
+                {"$max": {"seq": start}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            pass
+
+    async def reserve(self, count: int = 1) -> int:
+        """Atomically reserve `count` consecutive values and return the first one"""
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        for _ in range(2):
+            doc = await self.collection.find_one_and_update(
+                {"_id": self.name},
+                {"$inc": {"seq": count}},
+                return_document=ReturnDocument.AFTER
+            )
+            if doc is not None:
+                return doc["seq"] - count + 1
+            await self._ensure_seeded()
+        raise RuntimeError(f"Unable to initialise counter '{self.name}'")
+
+    async def next(self) -> int:
+        """Return the next value, leasing a new block from the database when needed"""
+        async with self._lock:
+            if self._next is None or self._next > self._end:
+                first = await self.reserve(self.block_size)
+                self._next, self._end = first, first + self.block_size - 1
+            value = self._next
+            self._next += 1
+            return value
+
+    async def current(self) -> int:
+        """Return the last value handed out by the database (0 if unseeded)"""
+        doc = await self.collection.find_one({"_id": self.name})
+        return doc["seq"] if doc else 0
+
+    def reset_lease(self) -> None:
+        """Drop any locally leased values"""
+        self._next = None
+        self._end = None
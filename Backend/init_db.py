@@ -28,38 +28,98 @@ async def init_database():
         # Users collection
         users_collection = db["users"]
         await users_collection.create_index("email", unique=True)
+        await users_collection.create_index("updated_at")
         print("✅ Created 'users' collection with indexes")
         
         # Product Types collection
         product_types_collection = db["product_types"]
         await product_types_collection.create_index("name", unique=True)
+        await product_types_collection.create_index("updated_at")
         print("✅ Created 'product_types' collection with indexes")
         
         # Models collection
         models_collection = db["models"]
         await models_collection.create_index("product_type_id")
+        await models_collection.create_index("updated_at")
         print("✅ Created 'models' collection with indexes")
         
         # Batches collection
         batches_collection = db["batches"]
         await batches_collection.create_index("batch_code", unique=True)
+        await batches_collection.create_index(
+            "batch_code_norm",
+            unique=True,
+            partialFilterExpression={"batch_code_norm": {"$type": "string"}}
+        )
         await batches_collection.create_index("model_id")
+        await batches_collection.create_index("search_tokens")
+        await batches_collection.create_index("warranty_expires_at")
+        await batches_collection.create_index([("model_id", 1), ("warranty_expires_at", 1)])
+        await batches_collection.create_index("updated_at")
         print("✅ Created 'batches' collection with indexes")
         
         # Merchants collection
         merchants_collection = db["merchants"]
         await merchants_collection.create_index("merchant_code", unique=True)
+        await merchants_collection.create_index("name")
+        await merchants_collection.create_index("name_norm")
+        await merchants_collection.create_index("updated_at")
         print("✅ Created 'merchants' collection with indexes")
         
         # Claims collection
         claims_collection = db["claims"]
-        await claims_collection.create_index("claim_number", unique=True)
-        await claims_collection.create_index("merchant_id")
+        await claims_collection.create_index("claim_id")
+        await claims_collection.create_index([("claim_id", 1), ("claim_seq", -1)])
+        await claims_collection.create_index(
+            "claim_seq",
+            unique=True,
+            partialFilterExpression={"claim_seq": {"$exists": True}}
+        )
+        await claims_collection.create_index([("merchant_id", 1), ("_id", -1)])
         await claims_collection.create_index("rep_id")
         await claims_collection.create_index("status")
         await claims_collection.create_index("bilty_number")
+        await claims_collection.create_index("updated_at")
+        await claims_collection.create_index([("verified", 1), ("verified_at", 1)])
+        await claims_collection.create_index([("status", 1), ("verified_at", 1)])
+        await claims_collection.create_index([("status", 1), ("updated_at", 1)])
+        await claims_collection.create_index([("verified", 1), ("status", 1), ("created_at", 1)])
+        await claims_collection.create_index(
+            "client_ref",
+            unique=True,
+            partialFilterExpression={"client_ref": {"$type": "string"}}
+        )
         print("✅ Created 'claims' collection with indexes")
         
+        # Archived claims (maintenance.py archive-claims); only what include_archived reads need
+        claims_archive_collection = db["claims_archive"]
+        await claims_archive_collection.create_index("claim_id")
+        await claims_archive_collection.create_index([("claim_id", 1), ("claim_seq", -1)])
+        await claims_archive_collection.create_index([("merchant_id", 1), ("_id", -1)])
+        await claims_archive_collection.create_index("bilty_number")
+        await claims_archive_collection.create_index([("status", 1), ("verified_at", 1)])
+        print("✅ Created 'claims_archive' collection with indexes")
+        
+        # Email outbox collection
+        email_outbox_collection = db["email_outbox"]
+        await email_outbox_collection.create_index([("status", 1), ("next_attempt_at", 1)])
+        await email_outbox_collection.create_index([("status", 1), ("lease_expires_at", 1)])
+        print("✅ Created 'email_outbox' collection with indexes")
+        
+        # Claim rollups collection (maintained counters, see app/utils/rollups.py)
+        claim_rollups_collection = db["claim_rollups"]
+        await claim_rollups_collection.create_index([("dimension", 1), ("key", 1)])
+        print("✅ Created 'claim_rollups' collection with indexes")
+        
+        # Deletion tombstones for ?updated_since= delta sync, expired after the retention period
+        deletions_collection = db["deletions"]
+        await deletions_collection.create_index([("collection", 1), ("deleted_at", 1)])
+        await deletions_collection.create_index(
+            "deleted_at",
+            expireAfterSeconds=settings.sync_tombstone_days * 24 * 3600
+        )
+        print("✅ Created 'deletions' collection with indexes")
+        
         # Reps collection
         reps_collection = db["reps"]
         await reps_collection.create_index("rep_code", unique=True)
@@ -69,6 +129,7 @@ async def init_database():
         locations_collection = db["locations"]
         await locations_collection.create_index([("name", 1), ("province", 1)], unique=True)
         await locations_collection.create_index("province")
+        await locations_collection.create_index("updated_at")
         print("✅ Created 'locations' collection with indexes")
         
         # Seed locations from pakistanLocations data
@@ -192,6 +253,7 @@ async def create_sample_data(db):
         sample_merchant = {
             "merchant_code": "MERCH001",
             "name": "Sample Merchant Ltd",
+            "name_norm": "sample merchant ltd",
             "contact_person": "John Doe",
             "email": "contact@samplemerchant.com",
             "phone": "+1234567890",
@@ -2,6 +2,9 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.core.database import connect_to_mongo, close_mongo_connection
+from app.utils.email_outbox import email_worker
+from app.utils.accounting import digest_scheduler
+from app.utils.events import claim_change_stream
 from app.routers import auth, users, merchants, claims, product_types, product_models, batches, locations, accounting, suppliers
 
 app = FastAPI(
@@ -17,6 +20,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Link", "X-Next-Cursor", "X-Total-Count", "X-Sync-Cursor", "ETag"],
 )
 
 # Include routers
@@ -36,11 +40,20 @@ app.include_router(suppliers.router, prefix="/api/suppliers", tags=["suppliers"]
 async def startup_event():
     """Application startup"""
     await connect_to_mongo()
+    if settings.claim_events_change_stream:
+        claim_change_stream.start()
+    if settings.smtp_host:
+        email_worker.start()
+        if settings.sale_return_mode == "digest":
+            await digest_scheduler.start()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Application shutdown"""
+    await digest_scheduler.stop()
+    await email_worker.stop()
+    await claim_change_stream.stop()
     await close_mongo_connection()
 
 
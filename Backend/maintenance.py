@@ -0,0 +1,143 @@
+"""
+Maintenance commands for FactorClaim
+Run `python maintenance.py <command>` against the database configured in .env.
+"""
+import argparse
+import asyncio
+import sys
+from app.core.database import connect_to_mongo, close_mongo_connection
+
+
+async def migrate_claim_ids(args):
+    """Backfill claim_seq on legacy claims and seed the claim_id counter"""
+    from app.utils.crud_claim import claim_crud
+
+    result = await claim_crud.backfill_claim_seq()
+    print(f"✅ Migrated {result['migrated']} claim(s) to claim_seq")
+    if result["skipped"]:
+        print(f"ℹ️  Skipped {result['skipped']} claim(s) with unparseable or duplicate claim IDs")
+    print(f"🔢 claim_id counter is at {result['counter']}")
+
+
+async def rebuild_rollups(args):
+    """Recompute claim_rollups from claims and report drift"""
+    from app.utils.rollups import claim_rollups
+
+    result = await claim_rollups.rebuild(apply=not args.check)
+    for rollup_id, field, stored, expected in result["drift"]:
+        print(f"⚠️  {rollup_id} {field}: stored {stored}, expected {expected}")
+    if not result["drift"]:
+        print(f"✅ {result['documents']} rollup document(s) match the claims collection")
+    elif args.check:
+        print(f"❌ {len(result['drift'])} counter(s) drifted (run without --check to rebuild)")
+    else:
+        print(f"✅ Rebuilt {result['documents']} rollup document(s), fixed {len(result['drift'])} counter(s)")
+    return 1 if args.check and result["drift"] else 0
+
+
+async def backfill_batch_codes(args):
+    """Set batch_code_norm (used by barcode scans) on older batches"""
+    from app.utils.crud_batch import batch_crud
+
+    result = await batch_crud.backfill_batch_code_norm()
+    print(f"✅ Normalized {result['updated']} batch code(s)")
+    for batch_code in result["conflicts"]:
+        print(f"⚠️  '{batch_code}' only differs by case from another batch code; rename it and re-run")
+    return 1 if result["conflicts"] else 0
+
+
+async def reindex_batch_search(args):
+    """Recompute the search_tokens that batch search matches on"""
+    from app.utils.crud_batch import batch_crud
+
+    updated = await batch_crud.reindex_search_tokens()
+    print(f"✅ Reindexed {updated} batch(es) for search")
+
+
+async def backfill_warranty_expiry(args):
+    """Set warranty_expires_at on every batch"""
+    from app.utils.crud_batch import batch_crud
+
+    result = await batch_crud.backfill_warranty_expiry()
+    print(f"✅ Set warranty_expires_at on {result['updated']} batch(es)")
+    if result["skipped"]:
+        print(f"ℹ️  Skipped {result['skipped']} batch(es) without a readable production_date")
+
+
+async def backfill_merchant_names(args):
+    """Set name_norm (used by claim search) on every merchant"""
+    from app.utils.crud_merchant import merchant_crud
+
+    updated = await merchant_crud.backfill_name_norm()
+    print(f"✅ Set name_norm on {updated} merchant(s)")
+
+
+async def archive_claims(args):
+    """Move old Approved/Rejected claims to claims_archive in throttled batches"""
+    from app.utils.crud_claim import claim_crud
+
+    result = await claim_crud.archive_claims(
+        older_than_days=args.older_than_days,
+        batch_size=args.batch_size,
+        pause_seconds=args.pause,
+        dry_run=args.dry_run
+    )
+    if args.dry_run:
+        print(f"ℹ️  {result['eligible']} claim(s) would be archived")
+    else:
+        print(f"✅ Archived {result['archived']} claim(s) in {result['batches']} batch(es)")
+
+
+async def restore_claim(args):
+    """Move one claim from claims_archive back to claims"""
+    from app.utils.crud_claim import claim_crud
+
+    claim = await claim_crud.restore_claim(args.claim_id)
+    if claim is None:
+        print(f"❌ Claim {args.claim_id} is not in the archive")
+        return 1
+    print(f"✅ Restored claim {claim.get('claim_id') or claim['_id']}")
+
+
+COMMANDS = {
+    "migrate-claim-ids": (migrate_claim_ids, "Backfill claim_seq and seed the claim_id counter", []),
+    "rebuild-rollups": (rebuild_rollups, "Recompute claim_rollups from claims and report drift", [
+        (["--check"], {"action": "store_true", "help": "Only report drift, do not rewrite"}),
+    ]),
+    "backfill-batch-codes": (backfill_batch_codes, "Set batch_code_norm on batches created before it existed", []),
+    "reindex-batch-search": (reindex_batch_search, "Recompute batch search_tokens", []),
+    "backfill-warranty-expiry": (backfill_warranty_expiry, "Set warranty_expires_at on every batch", []),
+    "backfill-merchant-names": (backfill_merchant_names, "Set name_norm on every merchant", []),
+    "archive-claims": (archive_claims, "Move old Approved/Rejected claims to claims_archive", [
+        (["--older-than-days"], {"type": int, "help": "Days since last update (default CLAIM_ARCHIVE_AFTER_DAYS)"}),
+        (["--batch-size"], {"type": int, "help": "Claims moved per batch (default CLAIM_ARCHIVE_BATCH_SIZE)"}),
+        (["--pause"], {"type": float, "help": "Seconds between batches (default CLAIM_ARCHIVE_PAUSE_SECONDS)"}),
+        (["--dry-run"], {"action": "store_true", "help": "Only count eligible claims"}),
+    ]),
+    "restore-claim": (restore_claim, "Move one claim from claims_archive back to claims", [
+        (["claim_id"], {"help": "Claim _id or claim_id (e.g. CLM-20241210-0001)"}),
+    ]),
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="FactorClaim maintenance commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    for name, (_, help_text, arguments) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=help_text)
+        for flags, options in arguments:
+            subparser.add_argument(*flags, **options)
+    return parser
+
+
+async def main(args):
+    await connect_to_mongo()
+    try:
+        handler, _, _ = COMMANDS[args.command]
+        return await handler(args) or 0
+    finally:
+        await close_mongo_connection()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(build_parser().parse_args())))
@@ -22,9 +22,17 @@ import app.core.database as _db_module
 from app.core.config import settings
 from app.utils.auth import auth_utils
 
+# The in-memory database has no change streams; claim events stay in-process
+settings.claim_events_change_stream = False
+
 
 # ---- helpers ----------------------------------------------------------------
 
+# mongomock cannot evaluate some aggregation expressions (e.g. $mergeObjects
+# outside $group); tests of writes that use them need a real MongoDB server
+requires_mongodb = pytest.mark.skip(reason="needs a MongoDB server for $mergeObjects expressions")
+
+
 def _make_oid() -> str:
     return str(ObjectId())
 
@@ -62,6 +70,12 @@ async def setup_test_db(mongo_client):
     for name in await db.list_collection_names():
         await db[name].drop()
 
+    # Drop in-process caches that would outlive the wiped collections
+    from app.utils.crud_claim import claim_crud
+    from app.utils.crud_batch import batch_crud
+    claim_crud.stats_cache.clear()
+    batch_crud.barcode_cache.clear()
+
     yield db
 
 
@@ -243,6 +257,7 @@ async def sample_merchant(setup_test_db):
     doc = {
         "_id": ObjectId(),
         "name": "Test Store",
+        "name_norm": "test store",
         "address": "456 Market Rd",
         "province": "Punjab",
         "city": "Lahore",
@@ -0,0 +1,384 @@
+"""Integration tests for sale return accounting and the email outbox."""
+import socket
+from datetime import datetime, timedelta
+
+import pytest
+from tests.conftest import auth_header
+
+from app.core.config import settings
+from app.utils.accounting import queue_sale_return_email
+from app.utils.email_outbox import EmailOutboxWorker, OutboxStatus, email_outbox
+
+
+@pytest.fixture
+def smtp_settings(monkeypatch):
+    """Configure SMTP so sale return emails are queued."""
+    monkeypatch.setattr(settings, "accounts_email", "accounts@test.com")
+    monkeypatch.setattr(settings, "smtp_host", "127.0.0.1")
+    monkeypatch.setattr(settings, "smtp_user", "factorclaim@test.com")
+    monkeypatch.setattr(settings, "smtp_password", "")
+    monkeypatch.setattr(settings, "smtp_starttls", False)
+
+
+class RecordingTransport:
+    """Transport stand-in that records messages or fails a set number of times."""
+
+    def __init__(self, failures: int = 0):
+        self.failures = failures
+        self.calls = 0
+        self.sent = []
+
+    def __call__(self, messages):
+        self.calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("mail server unavailable")
+        self.sent.extend(messages)
+        return [None] * len(messages)
+
+
+async def _verify(client, token, user_doc, claim):
+    from app.core.database import get_database
+
+    await get_database()["claims"].update_one(
+        {"_id": claim["_id"]}, {"$set": {"status": "Approval Pending"}}
+    )
+    return await client.put(f"/api/claims/{claim['_id']}/verify", json={
+        "verified_by": str(user_doc["_id"]),
+        "notes": "ok",
+    }, headers=auth_header(token))
+
+
+class TestEmailOutbox:
+    """Sale return emails go through the durable outbox."""
+
+    @pytest.mark.asyncio
+    async def test_verify_queues_sale_return(
+        self, client, admin_user, sample_claim, setup_test_db, smtp_settings
+    ):
+        user_doc, token = admin_user
+        resp = await _verify(client, token, user_doc, sample_claim)
+        assert resp.status_code == 200
+
+        jobs = await setup_test_db["email_outbox"].find().to_list(None)
+        assert len(jobs) == 1
+        assert jobs[0]["kind"] == "sale_return"
+        assert jobs[0]["status"] == OutboxStatus.PENDING
+        assert jobs[0]["payload"] == {"claim_id": str(sample_claim["_id"])}
+
+    @pytest.mark.asyncio
+    async def test_verify_without_smtp_queues_nothing(
+        self, client, admin_user, sample_claim, setup_test_db
+    ):
+        user_doc, token = admin_user
+        resp = await _verify(client, token, user_doc, sample_claim)
+        assert resp.status_code == 200
+        assert await setup_test_db["email_outbox"].count_documents({}) == 0
+
+    @pytest.mark.asyncio
+    async def test_worker_sends_queued_email(
+        self, client, admin_user, sample_claim, setup_test_db, smtp_settings
+    ):
+        user_doc, token = admin_user
+        await _verify(client, token, user_doc, sample_claim)
+
+        transport = RecordingTransport()
+        worker = EmailOutboxWorker(email_outbox, transport=transport)
+        assert await worker.drain() == 1
+
+        assert len(transport.sent) == 1
+        assert "CLM-TEST-0001" in transport.sent[0]["Subject"]
+        job = await setup_test_db["email_outbox"].find_one()
+        assert job["status"] == OutboxStatus.SENT
+
+    @pytest.mark.asyncio
+    async def test_bulk_verify_queues_one_email(
+        self, client, admin_user, rep_user, sample_claim, sample_merchant, sample_batch,
+        setup_test_db, smtp_settings
+    ):
+        user_doc, token = admin_user
+        rep_doc, rep_token = rep_user
+        resp = await client.post("/api/claims/", json={
+            "rep_id": str(rep_doc["_id"]),
+            "merchant_id": str(sample_merchant["_id"]),
+            "items": [{"batch_id": str(sample_batch["_id"]), "quantity": 1}],
+        }, headers=auth_header(rep_token))
+        ids = [str(sample_claim["_id"]), resp.json()["_id"]]
+        await setup_test_db["claims"].update_many({}, {"$set": {"status": "Approval Pending"}})
+
+        resp = await client.put("/api/claims/bulk/verify", json={
+            "verified_by": str(user_doc["_id"]),
+            "claims": [{"id": cid} for cid in ids],
+        }, headers=auth_header(token))
+        assert resp.json()["counts"] == {"updated": 2}
+
+        job, = await setup_test_db["email_outbox"].find().to_list(None)
+        assert job["kind"] == "sale_return_batch"
+        assert sorted(job["payload"]["claim_ids"]) == sorted(ids)
+
+        transport = RecordingTransport()
+        assert await EmailOutboxWorker(email_outbox, transport=transport).drain() == 1
+        assert "2 claim(s)" in transport.sent[0]["Subject"]
+
+    @pytest.mark.asyncio
+    async def test_worker_retries_with_backoff_then_dead_letters(
+        self, sample_claim, setup_test_db, smtp_settings
+    ):
+        assert await queue_sale_return_email(sample_claim) is True
+        worker = EmailOutboxWorker(
+            email_outbox, transport=RecordingTransport(failures=10),
+            max_attempts=2, backoff_seconds=60,
+        )
+
+        assert await worker.process_next() == 1
+        job = await setup_test_db["email_outbox"].find_one()
+        assert job["status"] == OutboxStatus.PENDING
+        assert job["attempts"] == 1
+        assert job["next_attempt_at"] > datetime.utcnow() + timedelta(seconds=30)
+        assert "mail server unavailable" in job["last_error"]
+
+        # Not due yet, so nothing is picked up
+        assert await worker.process_next() == 0
+
+        await setup_test_db["email_outbox"].update_one(
+            {"_id": job["_id"]}, {"$set": {"next_attempt_at": datetime.utcnow()}}
+        )
+        assert await worker.process_next() == 1
+        job = await setup_test_db["email_outbox"].find_one()
+        assert job["status"] == OutboxStatus.DEAD
+        assert job["attempts"] == 2
+
+    @pytest.mark.asyncio
+    async def test_missing_claim_is_dead_lettered(self, setup_test_db, smtp_settings):
+        from bson import ObjectId
+
+        await queue_sale_return_email({"_id": ObjectId()})
+        worker = EmailOutboxWorker(email_outbox, transport=RecordingTransport())
+        await worker.drain()
+        job = await setup_test_db["email_outbox"].find_one()
+        assert job["status"] == OutboxStatus.DEAD
+        assert job["attempts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_connection_drop_keeps_delivered_messages(
+        self, sample_claim, setup_test_db, smtp_settings, monkeypatch
+    ):
+        """A disconnect after message 1 of 3 only retries messages 2 and 3."""
+        import smtplib
+
+        sent = []
+
+        class DroppingSMTP:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def send_message(self, msg):
+                if sent:
+                    raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+                sent.append(msg)
+
+        monkeypatch.setattr(smtplib, "SMTP", DroppingSMTP)
+        for _ in range(3):
+            await queue_sale_return_email(sample_claim)
+        assert await EmailOutboxWorker(email_outbox, batch_size=10).drain() == 3
+
+        assert len(sent) == 1
+        jobs = await setup_test_db["email_outbox"].find().to_list(None)
+        assert sorted(job["status"] for job in jobs) == [OutboxStatus.PENDING, OutboxStatus.PENDING, OutboxStatus.SENT]
+        assert all("SMTPServerDisconnected" in job["last_error"] for job in jobs if job["status"] == OutboxStatus.PENDING)
+
+    @pytest.mark.asyncio
+    async def test_delivery_to_local_smtp_server(
+        self, sample_claim, setup_test_db, smtp_settings, monkeypatch
+    ):
+        """End-to-end delivery against an aiosmtpd stand-in."""
+        aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+        from aiosmtpd.handlers import Sink
+
+        class Collector(Sink):
+            def __init__(self):
+                self.envelopes = []
+
+            async def handle_DATA(self, server, session, envelope):
+                self.envelopes.append(envelope)
+                return "250 OK"
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            port = sock.getsockname()[1]
+        monkeypatch.setattr(settings, "smtp_port", port)
+
+        handler = Collector()
+        controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+        controller.start()
+        try:
+            assert await queue_sale_return_email(sample_claim) is True
+            worker = EmailOutboxWorker(email_outbox)
+            assert await worker.drain() == 1
+        finally:
+            controller.stop()
+
+        assert len(handler.envelopes) == 1
+        assert handler.envelopes[0].rcpt_tos == ["accounts@test.com"]
+        job = await setup_test_db["email_outbox"].find_one()
+        assert job["status"] == OutboxStatus.SENT
+
+
+class TestSaleReturnDigest:
+    """Digest mode batches verified claims into one email per window."""
+
+    @pytest.fixture
+    def digest_settings(self, smtp_settings, monkeypatch):
+        monkeypatch.setattr(settings, "sale_return_mode", "digest")
+
+    async def _verified_claims(self, db, claim, count, verified_at):
+        docs = []
+        for n in range(count):
+            doc = {**claim, "claim_id": f"D-{n}"}
+            doc.pop("_id")
+            doc.update(verified=True, status="Approved", verified_at=verified_at)
+            docs.append(doc)
+        await db["claims"].insert_many(docs)
+
+    @pytest.mark.asyncio
+    async def test_verify_in_digest_mode_queues_nothing(
+        self, client, admin_user, sample_claim, setup_test_db, digest_settings
+    ):
+        user_doc, token = admin_user
+        resp = await _verify(client, token, user_doc, sample_claim)
+        assert resp.status_code == 200
+        assert await setup_test_db["email_outbox"].count_documents({}) == 0
+
+    @pytest.mark.asyncio
+    async def test_digest_sends_each_window_once(
+        self, setup_test_db, sample_claim, digest_settings
+    ):
+        from app.utils.accounting import DIGEST_CHECKPOINT_ID, queue_sale_return_digest
+
+        now = datetime.utcnow()
+        start = now - timedelta(hours=1)
+        await setup_test_db["checkpoints"].insert_one({"_id": DIGEST_CHECKPOINT_ID, "until": start})
+        await self._verified_claims(setup_test_db, sample_claim, 3, now - timedelta(minutes=30))
+
+        job_id = await queue_sale_return_digest(now)
+        assert job_id is not None
+        checkpoint = await setup_test_db["checkpoints"].find_one({"_id": DIGEST_CHECKPOINT_ID})
+        assert checkpoint["until"] > start
+
+        # Replaying the same window (e.g. crash before the checkpoint moved) is a no-op
+        await setup_test_db["checkpoints"].update_one(
+            {"_id": DIGEST_CHECKPOINT_ID}, {"$set": {"until": start}}
+        )
+        assert await queue_sale_return_digest(now) is None
+        assert await setup_test_db["email_outbox"].count_documents({}) == 1
+        assert (await setup_test_db["checkpoints"].find_one())["until"] == checkpoint["until"]
+
+        # Nothing verified since the checkpoint -> nothing queued
+        assert await queue_sale_return_digest(now + timedelta(minutes=15)) is None
+        assert await setup_test_db["email_outbox"].count_documents({}) == 1
+
+        transport = RecordingTransport()
+        await EmailOutboxWorker(email_outbox, transport=transport).drain()
+        assert len(transport.sent) == 1
+        csv_part = transport.sent[0].get_payload()[1].get_payload(decode=True).decode()
+        assert sorted(line.split(",")[4] for line in csv_part.strip().splitlines()[1:]) == ["D-0", "D-1", "D-2"]
+
+    @pytest.mark.asyncio
+    async def test_worker_reuses_one_connection_per_batch(
+        self, setup_test_db, sample_claim, smtp_settings
+    ):
+        for _ in range(3):
+            await queue_sale_return_email(sample_claim)
+        transport = RecordingTransport()
+        assert await EmailOutboxWorker(email_outbox, transport=transport, batch_size=10).drain() == 3
+        assert transport.calls == 1
+        assert len(transport.sent) == 3
+
+
+class TestSaleReturnCSV:
+    """Sale return CSV generation."""
+
+    @pytest.mark.asyncio
+    async def test_download_sale_return_csv(
+        self, client, admin_user, sample_claim, setup_test_db
+    ):
+        _, token = admin_user
+        await setup_test_db["claims"].update_one(
+            {"_id": sample_claim["_id"]},
+            {"$set": {"verified": True, "verified_at": datetime(2025, 3, 1), "bilty_number": "BLT-9"}},
+        )
+        resp = await client.get(
+            f"/api/accounting/sale-return/{sample_claim['_id']}/csv", headers=auth_header(token)
+        )
+        assert resp.status_code == 200
+        lines = resp.text.strip().splitlines()
+        assert lines[0] == "MerchantName,ModelName,VerifiedQty,BiltyNumber,ClaimID,VerifiedDate"
+        assert lines[1] == "Test Store,LED-100W 100.0W,5,BLT-9,CLM-TEST-0001,2025-03-01"
+
+    @pytest.mark.asyncio
+    async def test_csv_for_many_claims(self, setup_test_db, sample_claim):
+        from bson import ObjectId
+        from app.utils.accounting import generate_sale_return_csv
+
+        other = {**sample_claim, "_id": ObjectId(), "claim_id": "CLM-TEST-0002"}
+        other["items"] = sample_claim["items"] + [{"batch_id": ObjectId(), "quantity": 2}]
+        content = await generate_sale_return_csv([sample_claim, other])
+        rows = [line.split(",") for line in content.strip().splitlines()[1:]]
+        assert [(r[4], r[1]) for r in rows] == [
+            ("CLM-TEST-0001", "LED-100W 100.0W"),
+            ("CLM-TEST-0002", "LED-100W 100.0W"),
+            ("CLM-TEST-0002", "Unknown"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_export_sale_returns_date_range(
+        self, client, warehouse_user, sample_claim, setup_test_db, monkeypatch
+    ):
+        import app.routers.accounting as accounting_router
+        from app.utils.accounting import stream_sale_return_csv
+
+        # Small chunks so the export spans several reference lookups
+        monkeypatch.setattr(
+            accounting_router, "stream_sale_return_csv",
+            lambda filter_dict, **kwargs: stream_sale_return_csv(filter_dict, chunk_size=2, **kwargs),
+        )
+        docs = []
+        for n, day in enumerate([1, 5, 10, 15, 20]):
+            doc = {**sample_claim, "claim_id": f"E-{n}", "status": "Approved",
+                   "verified": True, "verified_at": datetime(2025, 6, day, 12)}
+            doc.pop("_id")
+            docs.append(doc)
+        docs[2]["status"] = "Approval Pending"
+        await setup_test_db["claims"].insert_many(docs)
+
+        _, token = warehouse_user
+        resp = await client.get(
+            "/api/accounting/sale-returns.csv?from=2025-06-05&to=2025-06-20",
+            headers=auth_header(token),
+        )
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/csv")
+        lines = resp.text.strip().splitlines()
+        assert lines[0].startswith("MerchantName,")
+        assert [line.split(",")[4] for line in lines[1:]] == ["E-1", "E-3", "E-4"]
+
+    @pytest.mark.asyncio
+    async def test_export_sale_returns_rejects_inverted_range(self, client, admin_user):
+        _, token = admin_user
+        resp = await client.get(
+            "/api/accounting/sale-returns.csv?from=2025-06-20&to=2025-06-05",
+            headers=auth_header(token),
+        )
+        assert resp.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_export_sale_returns_forbidden_for_rep(self, client, rep_user):
+        _, token = rep_user
+        resp = await client.get("/api/accounting/sale-returns.csv", headers=auth_header(token))
+        assert resp.status_code == 403
@@ -84,12 +84,246 @@ class TestBatches:
         )
         assert resp.status_code == 200
 
+    @pytest.mark.asyncio
+    async def test_barcode_lookup_is_normalized_and_cached(
+        self, client, admin_user, sample_product_model, sample_supplier, setup_test_db
+    ):
+        user_doc, token = admin_user
+        created = (await client.post("/api/batches/", json={
+            "batch_code": "b-scan-001",
+            "model_id": str(sample_product_model["_id"]),
+            "colour": "Cool White",
+            "quantity": 20,
+            "production_date": datetime.utcnow().isoformat(),
+            "warranty_period": 12,
+            "supplier_id": str(sample_supplier["_id"]),
+            "contractor": "Scan Contractor",
+            "supervisor_id": str(user_doc["_id"]),
+        }, headers=auth_header(token))).json()
+        assert created["batch_code_norm"] == "B-SCAN-001"
+
+        resp = await client.get("/api/batches/barcode/%20B-Scan-001%20", headers=auth_header(token))
+        assert resp.status_code == 200 and resp.json()["_id"] == created["_id"]
+
+        # A repeat scan is served from the cache without touching the database
+        await setup_test_db["batches"].update_one(
+            {"_id": ObjectId(created["_id"])}, {"$set": {"colour": "changed behind the cache"}}
+        )
+        resp = await client.get("/api/batches/barcode/B-SCAN-001", headers=auth_header(token))
+        assert resp.json()["colour"] == "Cool White"
+
+        # Updates through the API invalidate it, including the old code after a rename
+        await client.put(f"/api/batches/{created['_id']}", json={"batch_code": "B-SCAN-002"},
+                         headers=auth_header(token))
+        resp = await client.get("/api/batches/barcode/b-scan-001", headers=auth_header(token))
+        assert resp.status_code == 404
+        resp = await client.get("/api/batches/barcode/b-scan-002", headers=auth_header(token))
+        assert resp.json()["colour"] == "changed behind the cache"
+
+        resp = await client.delete(f"/api/batches/{created['_id']}", headers=auth_header(token))
+        assert resp.status_code == 200
+        resp = await client.get("/api/batches/barcode/B-SCAN-002", headers=auth_header(token))
+        assert resp.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_backfill_batch_code_norm(self, client, admin_user, sample_batch, setup_test_db):
+        from app.utils.crud_batch import batch_crud
+        _, token = admin_user
+        await setup_test_db["batches"].insert_one({**sample_batch, "_id": ObjectId(), "batch_code": "b-test-001"})
+
+        started = datetime.utcnow().replace(microsecond=0)
+        version = await batch_crud.get_version()
+        result = await batch_crud.backfill_batch_code_norm()
+        assert result == {"updated": 1, "conflicts": ["b-test-001"]}
+        stored = await setup_test_db["batches"].find_one({"_id": sample_batch["_id"]})
+        assert stored["batch_code_norm"] == "B-TEST-001"
+        # Delta sync picks up the backfilled batch
+        assert stored["updated_at"] >= started
+        assert await batch_crud.get_version() > version
+        resp = await client.get("/api/batches/barcode/b-test-001", headers=auth_header(token))
+        assert resp.json()["_id"] == str(sample_batch["_id"])
+
+    @pytest.mark.asyncio
+    async def test_resolve_barcodes(self, client, factory_user, sample_batch, setup_test_db):
+        from datetime import timedelta
+        _, token = factory_user
+        expired = {**sample_batch, "_id": ObjectId(), "batch_code": "B-OLD-001", "batch_code_norm": "B-OLD-001",
+                   "production_date": datetime.utcnow() - timedelta(days=400)}
+        await setup_test_db["batches"].insert_one(expired)
+
+        resp = await client.post("/api/batches/resolve", json={
+            "codes": ["B-TEST-001", "b-old-001", "NOPE", "b-old-001"]
+        }, headers=auth_header(token))
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["unknown"] == ["NOPE"]
+        assert set(data["batches"]) == {"B-TEST-001", "b-old-001"}
+        assert data["batches"]["B-TEST-001"]["_id"] == str(sample_batch["_id"])
+        assert data["batches"]["B-TEST-001"]["warranty"]["is_expired"] is False
+        warranty = data["batches"]["b-old-001"]["warranty"]
+        assert (warranty["age_months"], warranty["is_expired"], warranty["requires_confirmation"]) == (13, True, True)
+
+        resp = await client.post("/api/batches/resolve", json={"codes": []}, headers=auth_header(token))
+        assert resp.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_search_batches_ranked_and_paged(
+        self, client, admin_user, sample_batch, sample_supplier, setup_test_db
+    ):
+        from app.utils.crud_batch import batch_crud, search_tokens
+        _, token = admin_user
+        base = {k: v for k, v in sample_batch.items() if k != "_id"}
+        other_supplier = ObjectId()
+        await setup_test_db["batches"].insert_many([
+            {**base, "_id": ObjectId(), "batch_code": "RED-100", "colour": "Warm White", "contractor": "Acme"},
+            {**base, "_id": ObjectId(), "batch_code": "W-200", "colour": "Red", "contractor": "Acme"},
+            {**base, "_id": ObjectId(), "batch_code": "W-300", "colour": "Reddish", "contractor": "Redline Works",
+             "supplier_id": other_supplier},
+            {**base, "_id": ObjectId(), "batch_code": "W-400", "colour": "Blue", "contractor": "Acme"},
+        ])
+        assert await batch_crud.reindex_search_tokens() == 5
+        assert search_tokens({"batch_code": "AB-12", "colour": "", "contractor": None}) == ["1", "12", "a", "ab"]
+
+        resp = await client.get("/api/batches/search/red", headers=auth_header(token))
+        assert resp.status_code == 200
+        # code word > whole colour word > contractor prefix
+        assert [b["batch_code"] for b in resp.json()] == ["RED-100", "W-200", "W-300"]
+        assert resp.headers["x-total-count"] == "3"
+        assert "search_tokens" not in resp.json()[0]
+
+        resp = await client.get("/api/batches/search/red?skip=1&limit=1", headers=auth_header(token))
+        assert [b["batch_code"] for b in resp.json()] == ["W-200"]
+        resp = await client.get(f"/api/batches/search/red?supplier_id={other_supplier}", headers=auth_header(token))
+        assert [b["batch_code"] for b in resp.json()] == ["W-300"]
+
+        # Every word must match; an exact batch code ranks first; regex syntax is just text
+        resp = await client.get("/api/batches/search/warm%20acme", headers=auth_header(token))
+        assert [b["batch_code"] for b in resp.json()] == ["RED-100"]
+        resp = await client.get("/api/batches/search/w-200", headers=auth_header(token))
+        assert resp.json()[0]["batch_code"] == "W-200"
+        resp = await client.get("/api/batches/search/.*", headers=auth_header(token))
+        assert resp.json() == []
+
+    @pytest.mark.asyncio
+    async def test_search_batches_capped_keeps_exact_code(
+        self, client, admin_user, sample_batch, setup_test_db, monkeypatch
+    ):
+        from app.core.config import settings
+        from app.utils.crud_batch import batch_crud
+        _, token = admin_user
+        monkeypatch.setattr(settings, "batch_search_max_candidates", 2)
+        base = {k: v for k, v in sample_batch.items() if k != "_id"}
+        await setup_test_db["batches"].insert_many([
+            {**base, "_id": ObjectId(), "batch_code": code, "batch_code_norm": code}
+            for code in ("B1 0001", "B1 0002", "B1 0003", "B1")
+        ])
+        await batch_crud.reindex_search_tokens()
+
+        resp = await client.get("/api/batches/search/b1", headers=auth_header(token))
+        assert resp.json()[0]["batch_code"] == "B1"
+        # Only ranked candidates are counted, so every counted result can be paged to
+        assert resp.headers["x-total-count"] == "3"
+        resp = await client.get("/api/batches/search/b1?skip=2", headers=auth_header(token))
+        assert len(resp.json()) == 1
+
+    @pytest.mark.asyncio
+    async def test_search_tokens_follow_updates(self, client, admin_user, sample_batch):
+        _, token = admin_user
+        bid = str(sample_batch["_id"])
+        await client.put(f"/api/batches/{bid}", json={"colour": "Amber"}, headers=auth_header(token))
+        resp = await client.get("/api/batches/search/amb", headers=auth_header(token))
+        assert [b["_id"] for b in resp.json()] == [bid]
+        # Unchanged fields stay searchable
+        resp = await client.get("/api/batches/search/contractor", headers=auth_header(token))
+        assert [b["_id"] for b in resp.json()] == [bid]
+
+    @pytest.mark.asyncio
+    async def test_search_tokens_not_returned(self, client, admin_user, sample_product_model, sample_supplier):
+        user_doc, token = admin_user
+        resp = await client.post("/api/batches/", json={
+            "batch_code": "B-TOK-001",
+            "model_id": str(sample_product_model["_id"]),
+            "colour": "Red",
+            "quantity": 10,
+            "production_date": datetime.utcnow().isoformat(),
+            "warranty_period": 6,
+            "supplier_id": str(sample_supplier["_id"]),
+            "contractor": "Tok Co",
+            "supervisor_id": str(user_doc["_id"]),
+        }, headers=auth_header(token))
+        created = resp.json()
+        assert "search_tokens" not in created
+        bid = created["_id"]
+        resp = await client.get("/api/batches/", headers=auth_header(token))
+        assert all("search_tokens" not in b for b in resp.json())
+        resp = await client.get(f"/api/batches/{bid}", headers=auth_header(token))
+        assert "search_tokens" not in resp.json()
+        for _ in range(2):  # uncached, then cached
+            resp = await client.get("/api/batches/barcode/b-tok-001", headers=auth_header(token))
+            assert resp.status_code == 200 and "search_tokens" not in resp.json()
+        resp = await client.post("/api/batches/resolve", json={"codes": ["B-TOK-001"]}, headers=auth_header(token))
+        assert "search_tokens" not in resp.json()["batches"]["B-TOK-001"]
+
     @pytest.mark.asyncio
     async def test_get_batch_not_found(self, client, admin_user):
         _, token = admin_user
         resp = await client.get(f"/api/batches/{ObjectId()}", headers=auth_header(token))
         assert resp.status_code == 404
 
+    # ---- WARRANTY EXPIRY ----
+    @pytest.mark.asyncio
+    async def test_warranty_expiry_filter_and_bulk_check(
+        self, client, admin_user, sample_product_model, sample_supplier, setup_test_db
+    ):
+        from datetime import timedelta
+        from app.utils.crud_batch import batch_crud
+        user_doc, token = admin_user
+        body = {
+            "model_id": str(sample_product_model["_id"]),
+            "colour": "Warm White",
+            "quantity": 10,
+            "warranty_period": 6,
+            "supplier_id": str(sample_supplier["_id"]),
+            "contractor": "Contractor",
+            "supervisor_id": str(user_doc["_id"]),
+        }
+        fresh = (await client.post("/api/batches/", json={
+            **body, "batch_code": "B-FRESH", "production_date": (datetime.utcnow() - timedelta(days=30)).isoformat()
+        }, headers=auth_header(token))).json()
+        old = (await client.post("/api/batches/", json={
+            **body, "batch_code": "B-OLD", "production_date": (datetime.utcnow() - timedelta(days=300)).isoformat()
+        }, headers=auth_header(token))).json()
+        # Expired once whole 30-day months exceed the period: after 7 * 30 days
+        expires = datetime.fromisoformat(fresh["warranty_expires_at"]) - datetime.fromisoformat(fresh["production_date"])
+        assert expires == timedelta(days=210)
+
+        resp = await client.get("/api/batches/?in_warranty=true", headers=auth_header(token))
+        assert [b["batch_code"] for b in resp.json()] == ["B-FRESH"]
+        resp = await client.get("/api/batches/?in_warranty=false", headers=auth_header(token))
+        assert [b["batch_code"] for b in resp.json()] == ["B-OLD"]
+
+        # Changing the production date moves the expiry
+        await client.put(f"/api/batches/{old['_id']}", json={
+            "production_date": datetime.utcnow().isoformat()
+        }, headers=auth_header(token))
+        resp = await client.get("/api/batches/?in_warranty=true", headers=auth_header(token))
+        assert {b["batch_code"] for b in resp.json()} == {"B-FRESH", "B-OLD"}
+
+        missing = str(ObjectId())
+        resp = await client.post("/api/batches/check-warranty", json={
+            "batch_ids": [fresh["_id"], missing, "not-an-id"]
+        }, headers=auth_header(token))
+        data = resp.json()
+        assert [r["batch_code"] for r in data["results"]] == ["B-FRESH"]
+        assert data["results"][0]["is_expired"] is False
+        assert data["not_found"] == [missing, "not-an-id"]
+
+        # Batches created before the field existed are backfilled
+        await setup_test_db["batches"].update_many({}, {"$unset": {"warranty_expires_at": ""}})
+        assert await batch_crud.backfill_warranty_expiry() == {"updated": 2, "skipped": 0}
+        resp = await client.get("/api/batches/?in_warranty=true", headers=auth_header(token))
+        assert len(resp.json()) == 2
+
     # ---- UPDATE ----
     @pytest.mark.asyncio
     async def test_update_batch(self, client, admin_user, sample_batch):
@@ -112,6 +346,106 @@ class TestBatches:
         assert "is_expired" in data
         assert "age_months" in data
 
+    # ---- IMPORT ----
+    @pytest.mark.asyncio
+    async def test_import_batches_csv(
+        self, client, admin_user, sample_product_model, sample_supplier, setup_test_db, monkeypatch
+    ):
+        from app.core.config import settings
+        user_doc, token = admin_user
+        monkeypatch.setattr(settings, "batch_import_chunk_size", 2)
+        await setup_test_db["batches"].create_index("batch_code_norm", unique=True)
+        csv_text = (
+            "Batch_Code,Model,Colour,Quantity,Production_Date,Warranty_Period,Supplier,Contractor,Supervisor\n"
+            "B-IMP-001,led-100w,Red,50,2024-01-15,12,Test Supplier Co,Imp Co,admin@test.com\n"
+            "B-IMP-002,LED-100W,Blue,20,2024-02-15,6,Test Supplier Co,Imp Co,Test Admin\n"
+            "b-imp-001,LED-100W,Blue,20,2024-02-15,6,Test Supplier Co,Imp Co,Test Admin\n"
+            "B-IMP-003,No Such Model,Blue,20,2024-02-15,6,Test Supplier Co,Imp Co,Test Admin\n"
+            "B-IMP-004,LED-100W,Blue,-5,2024-02-15,6,Test Supplier Co,Imp Co,Test Admin\n"
+            ",,,,,,,,\n"
+        )
+        resp = await client.post(
+            "/api/batches/import",
+            files={"file": ("batches.csv", csv_text.encode(), "text/csv")},
+            headers=auth_header(token)
+        )
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["total"] == 5
+        assert data["counts"] == {"created": 2, "duplicate": 1, "invalid": 2}
+        problems = {row["line"]: row for row in data["results"]}
+        assert problems[4]["status"] == "duplicate"
+        assert problems[5]["errors"][0]["field"] == "model"
+        assert problems[6]["errors"][0]["field"] == "quantity"
+
+        stored = await setup_test_db["batches"].find_one({"batch_code": "B-IMP-001"})
+        assert stored["model_id"] == sample_product_model["_id"]
+        assert stored["supplier_id"] == sample_supplier["_id"]
+        assert stored["supervisor_id"] == user_doc["_id"]
+        assert stored["batch_code_norm"] == "B-IMP-001"
+        assert stored["warranty_expires_at"] is not None
+        resp = await client.get("/api/batches/barcode/b-imp-002", headers=auth_header(token))
+        assert resp.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_import_batches_unreadable_part_way(
+        self, client, admin_user, sample_product_model, sample_supplier, setup_test_db, monkeypatch
+    ):
+        from app.core.config import settings
+        _, token = admin_user
+        monkeypatch.setattr(settings, "batch_import_chunk_size", 50)
+        header = "batch_code,model,colour,quantity,production_date,warranty_period,supplier,contractor,supervisor\n"
+        rows = "".join(
+            f"B-PART-{n:04d},LED-100W,Red,5,2024-01-15,12,Test Supplier Co,Part Co,Test Admin\n" for n in range(200)
+        )
+        body = header.encode() + rows.encode() + b"B-BAD,\xff\xfe,Red\n"
+        resp = await client.post(
+            "/api/batches/import",
+            files={"file": ("batches.csv", body, "text/csv")},
+            headers=auth_header(token)
+        )
+        assert resp.status_code == 400
+        detail = resp.json()["detail"]
+        assert detail["message"].startswith("Could not read the import after line")
+        created = detail["counts"]["created"]
+        assert created == detail["total"] > 0
+        assert await setup_test_db["batches"].count_documents({}) == created
+
+    @pytest.mark.asyncio
+    async def test_import_batches_xlsx(
+        self, client, admin_user, sample_product_model, sample_supplier, setup_test_db
+    ):
+        openpyxl = pytest.importorskip("openpyxl")
+        import io
+        user_doc, token = admin_user
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet.append(["batch_code", "model_id", "colour", "quantity", "production_date",
+                      "warranty_period", "supplier_id", "contractor", "supervisor_id"])
+        sheet.append(["B-XLS-001", str(sample_product_model["_id"]), "Red", 10, datetime(2024, 1, 15),
+                      12, str(sample_supplier["_id"]), "Xls Co", str(user_doc["_id"])])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        resp = await client.post(
+            "/api/batches/import",
+            files={"file": ("batches.xlsx", buffer.getvalue(), "application/octet-stream")},
+            headers=auth_header(token)
+        )
+        assert resp.status_code == 200
+        assert resp.json()["counts"] == {"created": 1}
+        stored = await setup_test_db["batches"].find_one({"batch_code": "B-XLS-001"})
+        assert stored["quantity"] == 10
+
+    @pytest.mark.asyncio
+    async def test_import_batches_forbidden_for_rep(self, client, rep_user):
+        _, token = rep_user
+        resp = await client.post(
+            "/api/batches/import",
+            files={"file": ("batches.csv", b"batch_code\n", "text/csv")},
+            headers=auth_header(token)
+        )
+        assert resp.status_code == 403
+
     # ---- DELETE with referential integrity ----
     @pytest.mark.asyncio
     async def test_delete_batch_blocked_by_claim(
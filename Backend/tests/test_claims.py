@@ -1,7 +1,9 @@
 """Integration tests for claim endpoints."""
+import json
+from datetime import datetime, timedelta
 import pytest
 from bson import ObjectId
-from tests.conftest import auth_header
+from tests.conftest import auth_header, requires_mongodb
 
 
 class TestClaims:
@@ -41,6 +43,56 @@ class TestClaims:
         }, headers=auth_header(token))
         assert resp.status_code == 422
 
+    @pytest.mark.asyncio
+    async def test_create_claim_unknown_references(
+        self, client, rep_user, sample_batch
+    ):
+        """Missing merchant and batches are all reported in one response."""
+        user_doc, token = rep_user
+        resp = await client.post("/api/claims/", json={
+            "rep_id": str(user_doc["_id"]),
+            "merchant_id": str(ObjectId()),
+            "items": [
+                {"batch_id": str(sample_batch["_id"]), "quantity": 1},
+                {"batch_id": str(ObjectId()), "quantity": 1},
+            ],
+        }, headers=auth_header(token))
+        assert resp.status_code == 400
+        detail = resp.json()["detail"]
+        assert detail["error"] == "invalid_references"
+        assert [e["field"] for e in detail["errors"]] == ["merchant_id", "batch_id"]
+        assert detail["errors"][1]["item_index"] == 1
+
+    @pytest.mark.asyncio
+    async def test_create_claim_expired_warranty_warnings(
+        self, client, rep_user, sample_merchant, sample_batch, setup_test_db
+    ):
+        from datetime import datetime, timedelta
+
+        user_doc, token = rep_user
+        await setup_test_db["batches"].update_one(
+            {"_id": sample_batch["_id"]},
+            {"$set": {"production_date": datetime.utcnow() - timedelta(days=800)}},
+        )
+        payload = {
+            "rep_id": str(user_doc["_id"]),
+            "merchant_id": str(sample_merchant["_id"]),
+            "items": [
+                {"batch_id": str(sample_batch["_id"]), "quantity": 1},
+                {"batch_id": str(sample_batch["_id"]), "quantity": 2},
+            ],
+        }
+        resp = await client.post("/api/claims/", json=payload, headers=auth_header(token))
+        assert resp.status_code == 400
+        detail = resp.json()["detail"]
+        assert detail["error"] == "items_require_confirmation"
+        assert [w["item_index"] for w in detail["warnings"]] == [0, 1]
+
+        for item in payload["items"]:
+            item.update(force_add=True, force_add_reason="customer goodwill")
+        resp = await client.post("/api/claims/", json=payload, headers=auth_header(token))
+        assert resp.status_code == 200
+
     @pytest.mark.asyncio
     async def test_create_claim_forbidden_for_factory(
         self, client, factory_user, sample_merchant, sample_batch
@@ -61,6 +113,274 @@ class TestClaims:
         assert resp.status_code == 200
         assert len(resp.json()) >= 1
 
+    @pytest.mark.asyncio
+    async def test_list_claims_cursor_keeps_filters(self, client, admin_user, setup_test_db):
+        _, token = admin_user
+        await setup_test_db["claims"].insert_many([
+            {"claim_id": f"{i:04d}", "verified": i % 2 == 0, "items": []} for i in range(6)
+        ])
+        resp = await client.get("/api/claims/?verified=true&limit=2", headers=auth_header(token))
+        first = [c["claim_id"] for c in resp.json()]
+        cursor = resp.headers["x-next-cursor"]
+        resp = await client.get(
+            f"/api/claims/?verified=true&limit=2&cursor={cursor}", headers=auth_header(token)
+        )
+        assert first == ["0000", "0002"]
+        assert [c["claim_id"] for c in resp.json()] == ["0004"]
+        assert "link" not in resp.headers
+
+    @pytest.mark.asyncio
+    async def test_list_claims_delta_sync_pages(self, client, admin_user, rep_user, sample_claim, setup_test_db):
+        _, token = admin_user
+        _, rep_token = rep_user
+        resp = await client.get("/api/claims/", headers=auth_header(token))
+        sync_cursor = resp.headers["x-sync-cursor"]
+        extra = [{**sample_claim, "_id": ObjectId(), "claim_id": None} for _ in range(2)]
+        await setup_test_db["claims"].insert_many(extra)
+        await client.delete(f"/api/claims/{sample_claim['_id']}", headers=auth_header(rep_token))
+
+        first = await client.get(
+            "/api/claims/", params={"updated_since": sync_cursor, "limit": 1}, headers=auth_header(token)
+        )
+        second = await client.get(first.headers["link"][1:first.headers["link"].index(">")], headers=auth_header(token))
+        assert first.headers["x-sync-cursor"] == second.headers["x-sync-cursor"]
+        items = first.json() + second.json()
+        assert [c["_id"] for c in items if not c.get("deleted")] == [str(c["_id"]) for c in extra]
+        assert [c["_id"] for c in items if c.get("deleted")] == [str(sample_claim["_id"])]
+
+    @pytest.mark.asyncio
+    async def test_claim_view_resolves_names(
+        self, client, admin_user, rep_user, sample_claim, sample_merchant,
+        sample_batch, sample_product_model, sample_product_type, setup_test_db
+    ):
+        _, token = admin_user
+        rep_doc, _ = rep_user
+        await setup_test_db["claims"].insert_one({"claim_id": "0002", "items": [], "status": "Bilty Pending"})
+
+        resp = await client.get("/api/claims/view", headers=auth_header(token))
+        assert resp.status_code == 200
+        claim, empty = resp.json()
+        assert claim["_id"] == str(sample_claim["_id"])
+        assert claim["merchant_name"] == sample_merchant["name"]
+        assert claim["rep_name"] == rep_doc["name"]
+        item = claim["items"][0]
+        assert item["quantity"] == 5
+        assert item["batch_id"] == str(sample_batch["_id"])
+        assert item["batch_code"] == sample_batch["batch_code"]
+        assert item["model_name"] == sample_product_model["name"]
+        assert item["product_type_name"] == sample_product_type["name"]
+        assert empty["items"] == [] and empty["merchant_name"] is None
+
+    @pytest.mark.asyncio
+    async def test_claim_view_fields_and_pages(self, client, admin_user, sample_claim, setup_test_db):
+        _, token = admin_user
+        await setup_test_db["claims"].insert_many([
+            {"claim_id": f"{i:04d}", "items": [], "status": "Approved"} for i in range(2, 5)
+        ])
+        resp = await client.get(
+            "/api/claims/view?fields=claim_id,merchant_name&limit=2&total=exact",
+            headers=auth_header(token)
+        )
+        assert resp.status_code == 200
+        assert resp.headers["x-total-count"] == "4"
+        first = resp.json()
+        assert first[0] == {
+            "_id": str(sample_claim["_id"]), "claim_id": "CLM-TEST-0001", "merchant_name": "Test Store"
+        }
+        resp = await client.get(
+            f"/api/claims/view?fields=claim_id&limit=2&cursor={resp.headers['x-next-cursor']}",
+            headers=auth_header(token)
+        )
+        assert [c["claim_id"] for c in resp.json()] == ["0003", "0004"]
+        assert "x-next-cursor" not in resp.headers
+
+        resp = await client.get("/api/claims/view?status=Approved&fields=claim_id", headers=auth_header(token))
+        assert [c["claim_id"] for c in resp.json()] == ["0002", "0003", "0004"]
+
+    @pytest.mark.asyncio
+    async def test_claim_stats(
+        self, client, warehouse_user, rep_user, sample_claim, sample_batch,
+        sample_product_model, sample_product_type, sample_supplier, setup_test_db
+    ):
+        _, token = warehouse_user
+        rep_doc, _ = rep_user
+        await setup_test_db["claims"].insert_one({
+            "rep_id": rep_doc["_id"],
+            "status": "Approved",
+            "verified": True,
+            "date": datetime(2025, 1, 15),
+            "items": [
+                {"batch_id": sample_batch["_id"], "quantity": 2},
+                {"batch_id": sample_batch["_id"], "quantity": 3},
+            ],
+        })
+
+        resp = await client.get("/api/claims/stats", headers=auth_header(token))
+        assert resp.status_code == 200
+        stats = resp.json()
+        assert stats["total"] == {"claims": 2, "verified": 1, "unverified": 1, "quantity": 10}
+        assert sorted((s["status"], s["claims"], s["quantity"]) for s in stats["by_status"]) == [
+            ("Approved", 1, 5), ("Bilty Pending", 1, 5)
+        ]
+        assert stats["by_rep"] == [
+            {"id": str(rep_doc["_id"]), "name": rep_doc["name"], "claims": 2, "quantity": 10}
+        ]
+        assert {m["name"]: m["claims"] for m in stats["by_merchant"]} == {"Test Store": 1, None: 1}
+        assert stats["by_model"] == [{
+            "id": str(sample_product_model["_id"]), "name": sample_product_model["name"],
+            "claims": 2, "quantity": 10
+        }]
+        assert stats["by_product_type"][0]["name"] == sample_product_type["name"]
+        assert stats["by_supplier"][0]["name"] == sample_supplier["name"]
+        months = {m["month"]: m["claims"] for m in stats["by_month"]}
+        assert months["2025-01"] == 1
+        assert months[datetime.utcnow().strftime("%Y-%m")] == 1
+
+    @pytest.mark.asyncio
+    async def test_claim_stats_cached_until_claim_write(self, client, admin_user, sample_claim, setup_test_db):
+        _, token = admin_user
+        resp = await client.get("/api/claims/stats", headers=auth_header(token))
+        assert resp.json()["total"]["claims"] == 1
+
+        # Writes that bypass the API are only picked up after the TTL
+        await setup_test_db["claims"].insert_one({"status": "Approved", "items": []})
+        resp = await client.get("/api/claims/stats", headers=auth_header(token))
+        assert resp.json()["total"]["claims"] == 1
+
+        resp = await client.delete(f"/api/claims/{sample_claim['_id']}", headers=auth_header(token))
+        assert resp.status_code == 200
+        resp = await client.get("/api/claims/stats", headers=auth_header(token))
+        assert resp.json()["total"]["claims"] == 1
+        assert resp.json()["by_status"] == [{"status": "Approved", "claims": 1, "quantity": 0}]
+
+    @pytest.mark.asyncio
+    async def test_claim_stats_forbidden_for_rep(self, client, rep_user):
+        _, token = rep_user
+        resp = await client.get("/api/claims/stats", headers=auth_header(token))
+        assert resp.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_claim_events_require_auth(self, client):
+        resp = await client.get("/api/claims/events")
+        assert resp.status_code == 401
+        resp = await client.get("/api/claims/events", params={"access_token": "bogus"})
+        assert resp.status_code == 401
+
+    @pytest.mark.asyncio
+    async def test_claim_writes_publish_events(
+        self, client, rep_user, sample_merchant, sample_batch, setup_test_db
+    ):
+        from app.utils.events import claim_events
+        rep_doc, token = rep_user
+        async with claim_events.subscribe() as queue:
+            resp = await client.post("/api/claims/", json={
+                "rep_id": str(rep_doc["_id"]),
+                "merchant_id": str(sample_merchant["_id"]),
+                "items": [{"batch_id": str(sample_batch["_id"]), "quantity": 1}],
+            }, headers=auth_header(token))
+            cid = resp.json()["_id"]
+            await client.put(f"/api/claims/{cid}/bilty", json={"bilty_number": "B-1"}, headers=auth_header(token))
+            await client.delete(f"/api/claims/{cid}", headers=auth_header(token))
+
+            events = [queue.get_nowait() for _ in range(queue.qsize())]
+        assert [e["type"] for e in events] == ["created", "transition", "deleted"]
+        assert all(e["claim_id"] == cid and e["rep_id"] == str(rep_doc["_id"]) for e in events)
+        assert (events[1]["from"], events[1]["status"]) == ("Bilty Pending", "Approval Pending")
+        assert events[1]["claim"]["bilty_number"] == "B-1"
+        assert events[2]["claim"] is None
+
+    @pytest.mark.asyncio
+    async def test_claim_event_stream_filters_by_role(self, rep_user, admin_user):
+        from app.utils.events import ClaimEventBus, claim_event, claim_event_stream
+        rep_doc, _ = rep_user
+        admin_doc, _ = admin_user
+        bus = ClaimEventBus()
+
+        async def connected():
+            return False
+
+        rep_stream = claim_event_stream(bus, rep_doc, connected)
+        admin_stream = claim_event_stream(bus, admin_doc, connected)
+        assert (await rep_stream.__anext__()).startswith("retry:")
+        assert (await admin_stream.__anext__()).startswith("retry:")
+
+        other = claim_event("created", {"_id": ObjectId(), "rep_id": ObjectId()}, ObjectId(), ObjectId())
+        own_id = ObjectId()
+        own = claim_event("created", {"_id": own_id, "rep_id": rep_doc["_id"]}, own_id, rep_doc["_id"])
+        bus.publish(other)
+        bus.publish(own)
+
+        frame = await rep_stream.__anext__()
+        assert frame.startswith("id: 2\nevent: created\n")
+        data = json.loads(frame.split("data: ", 1)[1])
+        assert data["claim_id"] == str(own_id)
+        assert "rep_id" not in data
+        assert (await admin_stream.__anext__()).startswith("id: 1\n")
+        assert (await admin_stream.__anext__()).startswith("id: 2\n")
+        await rep_stream.aclose()
+        await admin_stream.aclose()
+        assert bus.subscriber_count == 0
+
+    @pytest.mark.asyncio
+    async def test_change_stream_documents_become_events(self):
+        from app.utils.events import event_from_change
+        oid, rep_id = ObjectId(), ObjectId()
+        claim = {
+            "_id": oid, "rep_id": rep_id, "status": "Approved",
+            "status_history": [{"from": "Approval Pending", "status": "Approved"}],
+        }
+        event = event_from_change({
+            "operationType": "update", "documentKey": {"_id": oid}, "fullDocument": claim,
+            "updateDescription": {"updatedFields": {"status": "Approved", "verified": True}},
+        })
+        assert (event["type"], event["from"], event["status"]) == ("transition", "Approval Pending", "Approved")
+        assert event["rep_id"] == str(rep_id)
+
+        deleted = event_from_change({"operationType": "delete", "documentKey": {"_id": oid}})
+        assert (deleted["type"], deleted["rep_id"]) == ("deleted", None)
+
+    @pytest.mark.asyncio
+    async def test_change_stream_fallback_only_when_unsupported(self):
+        import asyncio
+        from pymongo.errors import OperationFailure
+        from app.utils.events import CLAIM_RESYNC, ClaimChangeStream, ClaimEventBus
+
+        class FailingCollection:
+            def __init__(self, error):
+                self.error = error
+                self.calls = 0
+
+            def watch(self, **kwargs):
+                self.calls += 1
+                raise self.error
+
+        class StreamOn(ClaimChangeStream):
+            def __init__(self, collection, bus):
+                super().__init__(bus, retry_seconds=0.01)
+                self._collection = collection
+
+            @property
+            def collection(self):
+                return self._collection
+
+        # Standalone server: fall back to in-process events for good
+        bus = ClaimEventBus()
+        standalone = FailingCollection(OperationFailure("replica sets only", code=40573))
+        await asyncio.wait_for(StreamOn(standalone, bus)._run(), timeout=1)
+        assert standalone.calls == 1 and not bus.change_stream_active
+
+        # Anything else is a failure: resync subscribers and retry
+        bus = ClaimEventBus()
+        broken = FailingCollection(TypeError("bad pipeline"))
+        stream = StreamOn(broken, bus)
+        async with bus.subscribe() as queue:
+            stream.start()
+            event = await asyncio.wait_for(queue.get(), timeout=1)
+            await asyncio.sleep(0.05)
+            await stream.stop()
+        assert event["type"] == CLAIM_RESYNC
+        assert broken.calls > 1
+
     @pytest.mark.asyncio
     async def test_get_claim_by_id(self, client, admin_user, sample_claim):
         _, token = admin_user
@@ -69,6 +389,70 @@ class TestClaims:
         assert resp.status_code == 200
         assert resp.json()["claim_id"] == "CLM-TEST-0001"
 
+    @pytest.mark.asyncio
+    async def test_claim_etags_follow_transitions(self, client, admin_user, rep_user, sample_claim):
+        _, token = admin_user
+        _, rep_token = rep_user
+        detail_url, list_url = f"/api/claims/{sample_claim['_id']}", "/api/claims/"
+        detail_etag = (await client.get(detail_url, headers=auth_header(token))).headers["etag"]
+        list_etag = (await client.get(list_url, headers=auth_header(token))).headers["etag"]
+        resp = await client.get(list_url, headers={**auth_header(token), "If-None-Match": list_etag})
+        assert resp.status_code == 304
+
+        await client.put(f"{detail_url}/bilty", json={"bilty_number": "B-7"}, headers=auth_header(rep_token))
+        resp = await client.get(detail_url, headers={**auth_header(token), "If-None-Match": detail_etag})
+        assert resp.status_code == 200
+        assert resp.json()["status"] == "Approval Pending"
+        resp = await client.get(list_url, headers={**auth_header(token), "If-None-Match": list_etag})
+        assert resp.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_search_claims_ranks_matches(self, client, admin_user, sample_claim, setup_test_db):
+        _, token = admin_user
+        claims = setup_test_db["claims"]
+        base = {k: v for k, v in sample_claim.items() if k != "_id"}
+        await claims.insert_many([
+            {**base, "_id": ObjectId(), "claim_id": "CLM-TEST-0002", "bilty_number": "CLM-TEST-0001"},
+            {**base, "_id": ObjectId(), "claim_id": "CLM-OTHER-0001", "bilty_number": "BLT-42"},
+        ])
+
+        resp = await client.get("/api/claims/search", params={"q": "CLM-TEST-0001"}, headers=auth_header(token))
+        assert resp.status_code == 200
+        assert [(c["claim_id"], c["match"]) for c in resp.json()] == [
+            ("CLM-TEST-0001", "claim_id"), ("CLM-TEST-0002", "bilty_number")
+        ]
+        resp = await client.get("/api/claims/search", params={"q": "clm-test-0001"}, headers=auth_header(token))
+        assert [(c["claim_id"], c["match"]) for c in resp.json()] == [("CLM-TEST-0001", "claim_id")]
+
+        resp = await client.get("/api/claims/search", params={"q": "CLM-TEST"}, headers=auth_header(token))
+        assert [(c["claim_id"], c["match"]) for c in resp.json()] == [
+            ("CLM-TEST-0002", "claim_id_prefix"), ("CLM-TEST-0001", "claim_id_prefix")
+        ]
+
+        resp = await client.get("/api/claims/search", params={"q": "BLT-42"}, headers=auth_header(token))
+        assert [c["claim_id"] for c in resp.json()] == ["CLM-OTHER-0001"]
+
+        resp = await client.get(
+            "/api/claims/search", params={"q": "test st", "limit": 2}, headers=auth_header(token)
+        )
+        assert [c["match"] for c in resp.json()] == ["merchant", "merchant"]
+        resp = await client.get("/api/claims/search", params={"q": "TEST STORE"}, headers=auth_header(token))
+        assert {c["match"] for c in resp.json()} == {"merchant"}
+
+        resp = await client.get("/api/claims/search", params={"q": "(.*"}, headers=auth_header(token))
+        assert resp.json() == []
+
+    @pytest.mark.asyncio
+    async def test_search_claim_id_prefix_newest_by_sequence(self, client, admin_user, sample_claim, setup_test_db):
+        _, token = admin_user
+        base = {k: v for k, v in sample_claim.items() if k != "_id"}
+        await setup_test_db["claims"].insert_many([
+            {**base, "_id": ObjectId(), "claim_id": "10000", "claim_seq": 10000},
+            {**base, "_id": ObjectId(), "claim_id": "1999", "claim_seq": 1999},
+        ])
+        resp = await client.get("/api/claims/search", params={"q": "1", "limit": 1}, headers=auth_header(token))
+        assert [c["claim_id"] for c in resp.json()] == ["10000"]
+
     @pytest.mark.asyncio
     async def test_get_claim_by_claim_id(self, client, admin_user, sample_claim):
         _, token = admin_user
@@ -115,6 +499,165 @@ class TestClaims:
         }, headers=auth_header(token))
         assert resp.status_code == 200
 
+    # ---- BULK IMPORT ----
+    @pytest.mark.asyncio
+    async def test_bulk_import_json(self, client, rep_user, sample_merchant, sample_batch, setup_test_db):
+        rep_doc, token = rep_user
+        expired = ObjectId()
+        await setup_test_db["batches"].insert_one({
+            "_id": expired, "batch_code": "B-OLD", "model_id": sample_batch["model_id"],
+            "production_date": datetime(2020, 1, 1), "warranty_period": 12,
+        })
+        claim = {"rep_id": str(rep_doc["_id"]), "merchant_id": str(sample_merchant["_id"])}
+        item = {"batch_id": str(sample_batch["_id"]), "quantity": 2}
+        resp = await client.post("/api/claims/bulk", json=[
+            {**claim, "items": [item]},
+            {**claim, "items": [{"batch_id": str(ObjectId()), "quantity": 1}]},
+            {**claim, "items": [{**item, "quantity": 0}]},
+            {**claim, "items": [item, item], "date": "2026-01-05T10:00:00"},
+            {**claim, "items": [{"batch_id": str(expired), "quantity": 1}]},
+            {**claim, "items": [{"batch_id": str(expired), "quantity": 1, "force_add": True}]},
+        ], headers=auth_header(token))
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["counts"] == {"created": 2, "invalid": 3, "needs_confirmation": 1}
+        statuses = [r["status"] for r in data["results"]]
+        assert statuses == ["created", "invalid", "invalid", "created", "needs_confirmation", "invalid"]
+        assert data["results"][1]["errors"][0]["field"] == "batch_id"
+        assert data["results"][2]["errors"][0]["field"] == "items.0.quantity"
+        assert data["results"][5]["errors"][0]["field"] == "force_add_reason"
+        assert [data["results"][i]["claim_id"] for i in (0, 3)] == ["0001", "0002"]
+
+        stored = await setup_test_db["claims"].find_one({"claim_id": "0002"})
+        assert stored["date"] == datetime(2026, 1, 5, 10)
+        assert stored["status_history"][0]["status"] == "Bilty Pending"
+        total = await setup_test_db["claim_rollups"].find_one({"_id": "total:all"})
+        assert (total["claims"], total["quantity"]) == (2, 6)
+
+    @pytest.mark.asyncio
+    async def test_bulk_import_replay_is_idempotent(self, client, rep_user, sample_merchant, sample_batch):
+        rep_doc, token = rep_user
+        claims = [
+            {
+                "client_ref": ref,
+                "rep_id": str(rep_doc["_id"]),
+                "merchant_id": str(sample_merchant["_id"]),
+                "items": [{"batch_id": str(sample_batch["_id"]), "quantity": 1}],
+            }
+            for ref in ("tab-1", "tab-2", "tab-2")
+        ]
+        first = (await client.post("/api/claims/bulk", json={"claims": claims}, headers=auth_header(token))).json()
+        assert [r["status"] for r in first["results"]] == ["created", "created", "duplicate"]
+
+        replay = (await client.post("/api/claims/bulk", json=claims[:2], headers=auth_header(token))).json()
+        assert replay["counts"] == {"duplicate": 2}
+        assert [r["claim_id"] for r in replay["results"]] == [r["claim_id"] for r in first["results"][:2]]
+
+    @pytest.mark.asyncio
+    async def test_bulk_import_csv(self, client, admin_user, rep_user, sample_merchant, sample_batch):
+        _, token = admin_user
+        rep_doc, _ = rep_user
+        rep, merchant, batch = str(rep_doc["_id"]), str(sample_merchant["_id"]), str(sample_batch["_id"])
+        csv_text = (
+            "client_ref,rep_id,merchant_id,notes,batch_id,quantity,item_notes,force_add,force_add_reason\n"
+            f"r1,{rep},{merchant},first,{batch},2,cracked,,\n"
+            f"r1,,,,{batch},3,,,\n"
+            f",{rep},{merchant},,{batch},x,,,\n"
+        )
+        resp = await client.post(
+            "/api/claims/bulk",
+            files={"file": ("claims.csv", csv_text.encode(), "text/csv")},
+            headers=auth_header(token),
+        )
+        assert resp.status_code == 200
+        first, second = resp.json()["results"]
+        assert (first["status"], first["lines"]) == ("created", [2, 3])
+        assert (second["status"], second["lines"]) == ("invalid", [4])
+
+        resp = await client.get(f"/api/claims/{first['_id']}", headers=auth_header(token))
+        claim = resp.json()
+        assert claim["notes"] == "first"
+        assert [(i["quantity"], i["notes"]) for i in claim["items"]] == [(2, "cracked"), (3, "")]
+
+        resp = await client.post(
+            "/api/claims/bulk", content=csv_text.encode(),
+            headers={**auth_header(token), "content-type": "text/csv"},
+        )
+        assert resp.json()["counts"] == {"duplicate": 1, "invalid": 1}
+
+    @pytest.mark.asyncio
+    async def test_bulk_import_rejects_bad_body(self, client, admin_user, factory_user):
+        _, token = admin_user
+        resp = await client.post("/api/claims/bulk", json={"claims": "nope"}, headers=auth_header(token))
+        assert resp.status_code == 400
+        _, factory_token = factory_user
+        resp = await client.post("/api/claims/bulk", json=[], headers=auth_header(factory_token))
+        assert resp.status_code == 403
+
+    # ---- ROLLUPS ----
+    @pytest.mark.asyncio
+    async def test_rollups_follow_claim_lifecycle(
+        self, client, admin_user, rep_user, sample_merchant, sample_batch, sample_product_model
+    ):
+        admin_doc, admin_token = admin_user
+        rep_doc, rep_token = rep_user
+        resp = await client.post("/api/claims/", json={
+            "rep_id": str(rep_doc["_id"]),
+            "merchant_id": str(sample_merchant["_id"]),
+            "items": [{"batch_id": str(sample_batch["_id"]), "quantity": 4}],
+        }, headers=auth_header(rep_token))
+        cid = resp.json()["_id"]
+
+        async def rollup(dimension, key=None):
+            params = {"dimension": dimension} if key is None else {"dimension": dimension, "key": key}
+            resp = await client.get("/api/claims/rollups", params=params, headers=auth_header(admin_token))
+            assert resp.status_code == 200
+            return resp.json()
+
+        total, = await rollup("total")
+        assert (total["claims"], total["quantity"]) == (1, 4)
+        assert total["statuses"] == {"Bilty Pending": 1}
+        model, = await rollup("model", str(sample_product_model["_id"]))
+        assert model["claims"] == 1
+        month, = await rollup("month")
+        assert month["key"] == datetime.utcnow().strftime("%Y-%m")
+
+        await client.put(f"/api/claims/{cid}/bilty", json={"bilty_number": "BLT-9"}, headers=auth_header(rep_token))
+        await client.put(f"/api/claims/{cid}/verify", json={
+            "verified_by": str(admin_doc["_id"]), "item_results": []
+        }, headers=auth_header(admin_token))
+        rep, = await rollup("rep", str(rep_doc["_id"]))
+        assert rep["statuses"] == {"Bilty Pending": 0, "Approval Pending": 0, "Approved": 1}
+        assert rep["verified"] == 1
+
+        await client.delete(f"/api/claims/{cid}", headers=auth_header(admin_token))
+        merchant, = await rollup("merchant", str(sample_merchant["_id"]))
+        assert (merchant["claims"], merchant["quantity"], merchant["verified"]) == (0, 0, 0)
+
+        from app.utils.rollups import claim_rollups
+        assert (await claim_rollups.rebuild(apply=False))["drift"] == []
+
+    @pytest.mark.asyncio
+    async def test_rollup_rebuild_repairs_drift(self, sample_claim, setup_test_db):
+        from app.utils.rollups import claim_rollups
+        await setup_test_db["claim_rollups"].insert_one(
+            {"_id": "total:all", "dimension": "total", "key": "all", "claims": 7, "quantity": 5}
+        )
+        result = await claim_rollups.rebuild(apply=False)
+        assert ["total:all", "claims", 7, 1] in result["drift"]
+        assert ["total:all", "statuses.Bilty Pending", 0, 1] in result["drift"]
+
+        await claim_rollups.rebuild()
+        assert (await claim_rollups.rebuild(apply=False))["drift"] == []
+        total = await setup_test_db["claim_rollups"].find_one({"_id": "total:all"})
+        assert (total["claims"], total["quantity"]) == (1, 5)
+
+    @pytest.mark.asyncio
+    async def test_rollups_forbidden_for_rep(self, client, rep_user):
+        _, token = rep_user
+        resp = await client.get("/api/claims/rollups", headers=auth_header(token))
+        assert resp.status_code == 403
+
     # ---- BILTY ----
     @pytest.mark.asyncio
     async def test_update_bilty_number(self, client, rep_user, sample_claim):
@@ -124,15 +667,128 @@ class TestClaims:
             "bilty_number": "BLT-001",
         }, headers=auth_header(token))
         assert resp.status_code == 200
+        data = resp.json()
+        assert data["status"] == "Approval Pending"
+        assert data["bilty_number"] == "BLT-001"
+
+    @pytest.mark.asyncio
+    async def test_status_history_records_transitions(
+        self, client, admin_user, rep_user, sample_merchant, sample_batch
+    ):
+        admin_doc, admin_token = admin_user
+        rep_doc, rep_token = rep_user
+        resp = await client.post("/api/claims/", json={
+            "rep_id": str(rep_doc["_id"]),
+            "merchant_id": str(sample_merchant["_id"]),
+            "items": [{"batch_id": str(sample_batch["_id"]), "quantity": 1}],
+        }, headers=auth_header(rep_token))
+        cid = resp.json()["_id"]
+        await client.put(f"/api/claims/{cid}/bilty", json={"bilty_number": "B1"}, headers=auth_header(rep_token))
+        resp = await client.put(f"/api/claims/{cid}/approve", json={
+            "verified_by": str(admin_doc["_id"]),
+        }, headers=auth_header(admin_token))
+
+        history = resp.json()["status_history"]
+        assert [(h["from"], h["status"], h["by"]) for h in history] == [
+            (None, "Bilty Pending", str(rep_doc["_id"])),
+            ("Bilty Pending", "Approval Pending", str(rep_doc["_id"])),
+            ("Approval Pending", "Approved", str(admin_doc["_id"])),
+        ]
+        assert history[0]["at"] <= history[1]["at"] <= history[2]["at"]
+
+    @pytest.mark.asyncio
+    async def test_terminal_status_cannot_go_back(self, client, rep_user, sample_claim, setup_test_db):
+        _, token = rep_user
+        cid = str(sample_claim["_id"])
+        await setup_test_db["claims"].update_one(
+            {"_id": sample_claim["_id"]}, {"$set": {"status": "Approved", "verified": True}}
+        )
+        resp = await client.put(f"/api/claims/{cid}/bilty", json={"bilty_number": "B2"}, headers=auth_header(token))
+        assert resp.status_code == 409
+        resp = await client.put(f"/api/claims/{cid}", json={"status": "Approval Pending"}, headers=auth_header(token))
+        assert resp.status_code == 409
+        assert resp.json()["detail"] == "Claim is 'Approved' and cannot move to 'Approval Pending'"
+
+    @pytest.mark.asyncio
+    async def test_update_claim_status_uses_transitions(self, client, admin_user, sample_claim, setup_test_db):
+        _, token = admin_user
+        cid = str(sample_claim["_id"])
+        # Resubmitting the current status is a plain edit
+        resp = await client.put(f"/api/claims/{cid}", json={"status": "Bilty Pending", "notes": "edited"},
+                                headers=auth_header(token))
+        assert resp.status_code == 200
+        assert resp.json()["notes"] == "edited"
+
+        await setup_test_db["claims"].update_one(
+            {"_id": sample_claim["_id"]}, {"$set": {"status": "Approval Pending"}}
+        )
+        resp = await client.put(f"/api/claims/{cid}", json={"status": "Rejected", "notes": "damaged in transit"},
+                                headers=auth_header(token))
+        assert resp.status_code == 200
+        assert resp.json()["status"] == "Rejected"
+        assert resp.json()["status_history"][-1]["from"] == "Approval Pending"
+
+    @pytest.mark.asyncio
+    async def test_update_claim_cannot_approve_or_verify(self, client, admin_user, sample_claim, setup_test_db):
+        _, token = admin_user
+        cid = str(sample_claim["_id"])
+        await setup_test_db["claims"].update_one(
+            {"_id": sample_claim["_id"]}, {"$set": {"status": "Approval Pending"}}
+        )
+        resp = await client.put(f"/api/claims/{cid}", json={"status": "Approved"}, headers=auth_header(token))
+        assert resp.status_code == 409
+
+        # Verification fields are not part of ClaimUpdate and are ignored
+        resp = await client.put(f"/api/claims/{cid}", json={"verified": True, "notes": "n"},
+                                headers=auth_header(token))
+        assert resp.status_code == 200
+        assert resp.json()["verified"] is False
+        assert resp.json()["status"] == "Approval Pending"
+
+    @pytest.mark.asyncio
+    async def test_update_claim_reject_respects_lease(self, client, admin_user, sample_claim, setup_test_db):
+        _, token = admin_user
+        cid = str(sample_claim["_id"])
+        await setup_test_db["claims"].update_one(
+            {"_id": sample_claim["_id"]},
+            {"$set": {"status": "Approval Pending", "leased_by": ObjectId(),
+                      "lease_expires_at": datetime.utcnow() + timedelta(minutes=10)}}
+        )
+        resp = await client.put(f"/api/claims/{cid}", json={"status": "Rejected"}, headers=auth_header(token))
+        assert resp.status_code == 409
+        assert "checked out" in resp.json()["detail"]
 
     # ---- VERIFY ----
     @pytest.mark.asyncio
-    async def test_verify_claim(self, client, admin_user, sample_claim, sample_batch):
+    async def test_verify_claim(self, client, admin_user, sample_claim, setup_test_db):
+        """Factory verifies claims once bilty is added (Approval Pending)."""
         user_doc, token = admin_user
         cid = str(sample_claim["_id"])
+        await setup_test_db["claims"].update_one(
+            {"_id": sample_claim["_id"]},
+            {"$set": {"status": "Approval Pending", "bilty_number": "BLT-X"}},
+        )
         resp = await client.put(f"/api/claims/{cid}/verify", json={
             "verified_by": str(user_doc["_id"]),
             "notes": "looks good",
+        }, headers=auth_header(token))
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["status"] == "Approved"
+        assert data["verified"] is True
+        assert data["items"][0]["quantity"] == 5
+
+    @requires_mongodb
+    @pytest.mark.asyncio
+    async def test_verify_claim_item_results(self, client, admin_user, sample_claim, sample_batch, setup_test_db):
+        user_doc, token = admin_user
+        cid = str(sample_claim["_id"])
+        await setup_test_db["claims"].update_one(
+            {"_id": sample_claim["_id"]},
+            {"$set": {"status": "Approval Pending", "bilty_number": "BLT-X", "items.0.legacy_ref": "OLD-7"}},
+        )
+        resp = await client.put(f"/api/claims/{cid}/verify", json={
+            "verified_by": str(user_doc["_id"]),
             "item_results": [
                 {
                     "batch_id": str(sample_batch["_id"]),
@@ -143,17 +799,298 @@ class TestClaims:
             ],
         }, headers=auth_header(token))
         assert resp.status_code == 200
+        item = resp.json()["items"][0]
+        assert item["verification_status"] == "approved"
+        assert item["scanned_quantity"] == 5
+        assert item["quantity"] == 5
+        # Stored keys ClaimItem does not declare survive verification
+        assert item["legacy_ref"] == "OLD-7"
+
+    def test_item_results_merge_into_stored_items(self):
+        from app.models.claim import ClaimStatus, ItemVerificationResult
+        from app.utils.crud_claim import CRUDClaim
+        batch_id = ObjectId()
+        results = {batch_id: ItemVerificationResult(batch_id=batch_id, status="rejected", scanned_quantity=1)}
+        expression = CRUDClaim._item_results_expression(results)
+        _, pipeline = CRUDClaim._transition_write(
+            ObjectId(), ClaimStatus.APPROVAL_PENDING, ClaimStatus.APPROVED,
+            {"verified": True}, {"items": expression}, None, datetime.utcnow()
+        )
+        assert pipeline[0]["$set"]["items"] == {"$map": {
+            "input": "$items",
+            "as": "item",
+            "in": {"$switch": {"branches": [{
+                "case": {"$eq": ["$$item.batch_id", batch_id]},
+                "then": {"$mergeObjects": ["$$item", {
+                    "verification_status": {"$literal": "rejected"},
+                    "scanned_quantity": {"$literal": 1}
+                }]}
+            }], "default": "$$item"}}
+        }}
+
+    @pytest.mark.asyncio
+    async def test_verify_claim_requires_approval_pending(self, client, admin_user, sample_claim):
+        user_doc, token = admin_user
+        resp = await client.put(f"/api/claims/{sample_claim['_id']}/verify", json={
+            "verified_by": str(user_doc["_id"]),
+        }, headers=auth_header(token))
+        assert resp.status_code == 409
+        assert "Bilty Pending" in resp.json()["detail"]
+
+    @pytest.mark.asyncio
+    async def test_verify_claim_twice_conflicts(
+        self, client, admin_user, sample_claim, setup_test_db
+    ):
+        user_doc, token = admin_user
+        await setup_test_db["claims"].update_one(
+            {"_id": sample_claim["_id"]}, {"$set": {"status": "Approval Pending"}}
+        )
+        url = f"/api/claims/{sample_claim['_id']}/verify"
+        body = {"verified_by": str(user_doc["_id"]), "notes": "$not a field path"}
+        first = await client.put(url, json=body, headers=auth_header(token))
+        second = await client.put(url, json=body, headers=auth_header(token))
+        assert first.status_code == 200
+        assert first.json()["notes"] == "$not a field path"
+        assert second.status_code == 409
+
+    @pytest.mark.asyncio
+    async def test_verify_claim_not_found(self, client, admin_user):
+        user_doc, token = admin_user
+        resp = await client.put(f"/api/claims/{ObjectId()}/verify", json={
+            "verified_by": str(user_doc["_id"]),
+        }, headers=auth_header(token))
+        assert resp.status_code == 404
+
+    # ---- WORK QUEUE ----
+    @staticmethod
+    async def _queued_claims(db, sample_claim, count):
+        from datetime import timedelta
+        base = {key: value for key, value in sample_claim.items() if key != "_id"}
+        start = datetime.utcnow() - timedelta(hours=1)
+        docs = [
+            {**base, "_id": ObjectId(), "claim_id": f"CLM-Q-{n}", "status": "Approval Pending",
+             "bilty_number": f"B-{n}", "created_at": start + timedelta(minutes=count - n)}
+            for n in range(count)
+        ]
+        await db["claims"].insert_many(docs)
+        # Oldest first
+        return sorted(docs, key=lambda doc: doc["created_at"])
+
+    @pytest.mark.asyncio
+    async def test_work_queue_checkout_is_disjoint(
+        self, client, admin_user, factory_user, sample_claim, setup_test_db
+    ):
+        _, admin_token = admin_user
+        _, factory_token = factory_user
+        queued = await self._queued_claims(setup_test_db, sample_claim, 3)
+
+        resp = await client.get("/api/claims/queue", headers=auth_header(factory_token))
+        assert [c["claim_id"] for c in resp.json()] == [c["claim_id"] for c in queued]
+
+        first = await client.post("/api/claims/queue/checkout", headers=auth_header(factory_token))
+        second = await client.post("/api/claims/queue/checkout", headers=auth_header(admin_token))
+        assert first.json()["claim_id"] == queued[0]["claim_id"]
+        assert second.json()["claim_id"] == queued[1]["claim_id"]
+        # Checking out again hands back (and renews) the claim you hold
+        again = await client.post("/api/claims/queue/checkout", headers=auth_header(factory_token))
+        assert again.json()["claim_id"] == queued[0]["claim_id"]
+
+        resp = await client.get("/api/claims/queue?available=true", headers=auth_header(admin_token))
+        assert [c["claim_id"] for c in resp.json()] == [queued[1]["claim_id"], queued[2]["claim_id"]]
+        resp = await client.get("/api/claims/queue", headers=auth_header(admin_token))
+        assert [c["leased"] for c in resp.json()] == [True, False, False]
+
+        from datetime import timedelta
+        await setup_test_db["claims"].update_many({}, {"$set": {
+            "leased_by": ObjectId(), "lease_expires_at": datetime.utcnow() + timedelta(minutes=5)
+        }})
+        resp = await client.post("/api/claims/queue/checkout", headers=auth_header(admin_token))
+        assert resp.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_lease_guards_verification(
+        self, client, admin_user, factory_user, rep_user, sample_claim, setup_test_db
+    ):
+        admin_doc, admin_token = admin_user
+        factory_doc, factory_token = factory_user
+        _, rep_token = rep_user
+        claim = (await self._queued_claims(setup_test_db, sample_claim, 1))[0]
+        url = f"/api/claims/{claim['_id']}"
+
+        resp = await client.put(f"{url}/lease", headers=auth_header(rep_token))
+        assert resp.status_code == 403
+        resp = await client.put(f"{url}/lease", headers=auth_header(factory_token))
+        assert resp.status_code == 200 and resp.json()["leased_by"] == str(factory_doc["_id"])
+        resp = await client.put(f"{url}/lease", headers=auth_header(admin_token))
+        assert resp.status_code == 409 and "checked out" in resp.json()["detail"]
+
+        resp = await client.put(f"{url}/verify", json={"verified_by": str(admin_doc["_id"])},
+                                headers=auth_header(admin_token))
+        assert resp.status_code == 409 and "checked out" in resp.json()["detail"]
+        resp = await client.put(f"{url}/verify", json={"verified_by": str(factory_doc["_id"])},
+                                headers=auth_header(factory_token))
+        assert resp.status_code == 200
+        assert resp.json()["leased_by"] is None and resp.json()["lease_expires_at"] is None
+
+        resp = await client.put(f"{url}/lease", headers=auth_header(factory_token))
+        assert resp.status_code == 409 and resp.json()["detail"] == "Claim is not waiting for verification"
+
+    @pytest.mark.asyncio
+    async def test_release_and_expired_leases(
+        self, client, admin_user, factory_user, sample_claim, setup_test_db
+    ):
+        from datetime import timedelta
+        _, admin_token = admin_user
+        _, factory_token = factory_user
+        claim = (await self._queued_claims(setup_test_db, sample_claim, 1))[0]
+        url = f"/api/claims/{claim['_id']}/lease"
+
+        await client.put(url, headers=auth_header(factory_token))
+        resp = await client.delete(url, headers=auth_header(admin_token))
+        assert resp.status_code == 404
+        resp = await client.delete(url, headers=auth_header(factory_token))
+        assert resp.status_code == 200
+        resp = await client.put(url, headers=auth_header(admin_token))
+        assert resp.status_code == 200
+
+        # Lease changes show up in the claim, so cached copies must revalidate
+        detail_url = f"/api/claims/{claim['_id']}"
+        detail_etag = (await client.get(detail_url, headers=auth_header(admin_token))).headers["etag"]
+        list_etag = (await client.get("/api/claims/", headers=auth_header(admin_token))).headers["etag"]
+        await client.delete(url, headers=auth_header(admin_token))
+        resp = await client.get(detail_url, headers={**auth_header(admin_token), "If-None-Match": detail_etag})
+        assert resp.status_code == 200 and resp.json()["leased_by"] is None
+        resp = await client.get("/api/claims/", headers={**auth_header(admin_token), "If-None-Match": list_etag})
+        assert resp.status_code == 200
+        list_etag = resp.headers["etag"]
+        await client.put(url, headers=auth_header(admin_token))
+        resp = await client.get("/api/claims/", headers={**auth_header(admin_token), "If-None-Match": list_etag})
+        assert resp.status_code == 200
+
+        # An expired lease is up for grabs
+        await setup_test_db["claims"].update_one(
+            {"_id": claim["_id"]}, {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+        )
+        resp = await client.put(url, headers=auth_header(factory_token))
+        assert resp.status_code == 200
+
+    # ---- BULK TRANSITIONS ----
+    @pytest.mark.asyncio
+    async def test_bulk_bilty_reports_per_claim(
+        self, client, rep_user, sample_claim, sample_merchant, sample_batch, setup_test_db
+    ):
+        rep_doc, token = rep_user
+        resp = await client.post("/api/claims/", json={
+            "rep_id": str(rep_doc["_id"]),
+            "merchant_id": str(sample_merchant["_id"]),
+            "items": [{"batch_id": str(sample_batch["_id"]), "quantity": 1}],
+        }, headers=auth_header(token))
+        second = resp.json()["_id"]
+        await setup_test_db["claims"].update_one({"_id": sample_claim["_id"]}, {"$set": {"status": "Approved"}})
+        missing = str(ObjectId())
+
+        resp = await client.put("/api/claims/bulk/bilty", json={"claims": [
+            {"id": second, "bilty_number": "BLT-1"},
+            {"id": str(sample_claim["_id"]), "bilty_number": "BLT-2"},
+            {"id": missing, "bilty_number": "BLT-3"},
+            {"id": "nope", "bilty_number": "BLT-4"},
+            {"id": second, "bilty_number": "BLT-5"},
+        ]}, headers=auth_header(token))
+        assert resp.status_code == 200
+        data = resp.json()
+        assert data["counts"] == {"updated": 1, "conflict": 1, "not_found": 1, "invalid": 2}
+        assert [r["status"] for r in data["results"]] == ["updated", "conflict", "not_found", "invalid", "invalid"]
+        assert data["results"][1]["detail"] == "Claim is 'Approved' and cannot move to 'Approval Pending'"
+
+        claim = await setup_test_db["claims"].find_one({"_id": ObjectId(second)})
+        assert claim["status"] == "Approval Pending"
+        assert claim["bilty_number"] == "BLT-1"
+        assert claim["status_history"][-1]["by"] == rep_doc["_id"]
+
+    @pytest.mark.asyncio
+    async def test_bulk_verify_and_approve(
+        self, client, admin_user, rep_user, sample_merchant, sample_batch, setup_test_db
+    ):
+        admin_doc, admin_token = admin_user
+        rep_doc, rep_token = rep_user
+        ids = []
+        for _ in range(3):
+            resp = await client.post("/api/claims/", json={
+                "rep_id": str(rep_doc["_id"]),
+                "merchant_id": str(sample_merchant["_id"]),
+                "items": [{"batch_id": str(sample_batch["_id"]), "quantity": 2}],
+            }, headers=auth_header(rep_token))
+            ids.append(resp.json()["_id"])
+        await client.put("/api/claims/bulk/bilty", json={
+            "claims": [{"id": cid, "bilty_number": f"BLT-{n}"} for n, cid in enumerate(ids)]
+        }, headers=auth_header(rep_token))
+
+        resp = await client.put("/api/claims/bulk/verify", json={
+            "verified_by": str(admin_doc["_id"]),
+            "notes": "checked",
+            "claims": [
+                {"id": ids[0]},
+                {"id": ids[1]},
+            ],
+        }, headers=auth_header(admin_token))
+        assert resp.status_code == 200
+        assert resp.json()["counts"] == {"updated": 2}
+        verified = await setup_test_db["claims"].find_one({"_id": ObjectId(ids[0])})
+        assert verified["verified"] is True
+
+        resp = await client.put("/api/claims/bulk/approve", json={
+            "verified_by": str(admin_doc["_id"]), "claim_ids": [ids[1], ids[2]]
+        }, headers=auth_header(admin_token))
+        results = resp.json()["results"]
+        assert [r["status"] for r in results] == ["conflict", "updated"]
+        assert results[0]["detail"] == "Claim is 'Approved' and cannot move to 'Approved'"
+
+        from app.utils.rollups import claim_rollups
+        total, = await claim_rollups.get_rollups("total")
+        assert total["statuses"]["Approved"] == 3
+        assert total["verified"] == 3
+        assert (await claim_rollups.rebuild(apply=False))["drift"] == []
+
+    @pytest.mark.asyncio
+    async def test_bulk_transitions_forbidden_and_bounded(self, client, rep_user, factory_user, monkeypatch):
+        _, rep_token = rep_user
+        _, factory_token = factory_user
+        resp = await client.put("/api/claims/bulk/approve", json={
+            "verified_by": str(ObjectId()), "claim_ids": [str(ObjectId())]
+        }, headers=auth_header(rep_token))
+        assert resp.status_code == 403
+
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "claim_bulk_max_transitions", 1)
+        resp = await client.put("/api/claims/bulk/approve", json={
+            "verified_by": str(ObjectId()), "claim_ids": [str(ObjectId()), str(ObjectId())]
+        }, headers=auth_header(factory_token))
+        assert resp.status_code == 413
 
     # ---- APPROVE ----
     @pytest.mark.asyncio
-    async def test_approve_claim(self, client, admin_user, sample_claim):
+    async def test_approve_claim(self, client, admin_user, sample_claim, setup_test_db):
         user_doc, token = admin_user
         cid = str(sample_claim["_id"])
+        await setup_test_db["claims"].update_one(
+            {"_id": sample_claim["_id"]}, {"$set": {"status": "Approval Pending"}}
+        )
         resp = await client.put(f"/api/claims/{cid}/approve", json={
             "verified_by": str(user_doc["_id"]),
             "notes": "approved",
         }, headers=auth_header(token))
         assert resp.status_code == 200
+        assert resp.json()["status"] == "Approved"
+        assert resp.json()["verified"] is True
+
+    @pytest.mark.asyncio
+    async def test_approve_claim_requires_bilty(self, client, admin_user, sample_claim):
+        user_doc, token = admin_user
+        resp = await client.put(f"/api/claims/{sample_claim['_id']}/approve", json={
+            "verified_by": str(user_doc["_id"]),
+        }, headers=auth_header(token))
+        assert resp.status_code == 409
+        assert resp.json()["detail"] == "Claim is 'Bilty Pending' and cannot move to 'Approved'"
 
     # ---- DELETE ----
     @pytest.mark.asyncio
@@ -167,3 +1104,134 @@ class TestClaims:
         cid = create_resp.json()["_id"]
         resp = await client.delete(f"/api/claims/{cid}", headers=auth_header(token))
         assert resp.status_code == 200
+
+    # ---- CLAIM ID ALLOCATION ----
+    @pytest.mark.asyncio
+    async def test_claim_ids_continue_after_legacy_ids(
+        self, client, rep_user, sample_merchant, sample_batch, sample_claim
+    ):
+        """Counter is seeded from existing CLM-DATE-XXXX / XXXX claim IDs."""
+        user_doc, token = rep_user
+        resp = await client.post("/api/claims/", json={
+            "rep_id": str(user_doc["_id"]),
+            "merchant_id": str(sample_merchant["_id"]),
+            "items": [{"batch_id": str(sample_batch["_id"]), "quantity": 1}],
+        }, headers=auth_header(token))
+        assert resp.status_code == 200
+        assert resp.json()["claim_id"] == "0002"
+        assert resp.json()["claim_seq"] == 2
+
+    @pytest.mark.asyncio
+    async def test_concurrent_claims_get_unique_ids(
+        self, client, rep_user, sample_merchant, sample_batch
+    ):
+        import asyncio
+
+        user_doc, token = rep_user
+        payload = {
+            "rep_id": str(user_doc["_id"]),
+            "merchant_id": str(sample_merchant["_id"]),
+            "items": [{"batch_id": str(sample_batch["_id"]), "quantity": 1}],
+        }
+        responses = await asyncio.gather(*[
+            client.post("/api/claims/", json=payload, headers=auth_header(token))
+            for _ in range(5)
+        ])
+        claim_ids = {r.json()["claim_id"] for r in responses}
+        assert claim_ids == {"0001", "0002", "0003", "0004", "0005"}
+
+    @pytest.mark.asyncio
+    async def test_backfill_claim_seq(self, setup_test_db, sample_claim):
+        from app.utils.crud_claim import claim_crud
+
+        await setup_test_db["claims"].insert_one({"claim_id": "0007", "items": []})
+        started = datetime.utcnow().replace(microsecond=0)
+        version = await claim_crud.get_version()
+        result = await claim_crud.backfill_claim_seq()
+        assert result == {"migrated": 2, "skipped": 0, "counter": 7}
+        migrated = await setup_test_db["claims"].find_one({"claim_id": "0007"})
+        assert migrated["updated_at"] >= started
+        assert await claim_crud.get_version() > version
+        assert await claim_crud.claim_sequence.reserve() == 8
+
+    # ---- ARCHIVE ----
+    @pytest.mark.asyncio
+    async def test_archive_moves_old_terminal_claims(self, client, admin_user, sample_claim, setup_test_db):
+        from datetime import timedelta
+        from app.utils.crud_claim import claim_crud
+        _, token = admin_user
+        old = datetime.utcnow() - timedelta(days=400)
+        base = {key: value for key, value in sample_claim.items() if key != "_id"}
+        old_approved = {**base, "_id": ObjectId(), "claim_id": "CLM-OLD-0001", "status": "Approved",
+                        "bilty_number": "B-OLD", "updated_at": old}
+        old_rejected = {**base, "_id": ObjectId(), "claim_id": "CLM-OLD-0002", "status": "Rejected", "updated_at": old}
+        old_pending = {**base, "_id": ObjectId(), "claim_id": "CLM-OLD-0003", "updated_at": old}
+        await setup_test_db["claims"].insert_many([old_approved, old_rejected, old_pending])
+
+        assert (await claim_crud.archive_claims(older_than_days=180, dry_run=True))["eligible"] == 2
+        result = await claim_crud.archive_claims(older_than_days=180, batch_size=1, pause_seconds=0)
+        assert result == {"archived": 2, "batches": 2}
+        hot = {c["claim_id"] for c in await setup_test_db["claims"].find({}).to_list(length=None)}
+        assert hot == {"CLM-TEST-0001", "CLM-OLD-0003"}
+        archived = await setup_test_db["claims_archive"].find_one({"_id": old_approved["_id"]})
+        assert archived["claim_id"] == "CLM-OLD-0001" and archived["archived_at"]
+
+        # Lookups only reach the archive when asked to
+        claim_id = str(old_approved["_id"])
+        resp = await client.get(f"/api/claims/{claim_id}", headers=auth_header(token))
+        assert resp.status_code == 404
+        resp = await client.get(f"/api/claims/{claim_id}?include_archived=true", headers=auth_header(token))
+        assert resp.status_code == 200 and resp.json()["_id"] == claim_id
+        resp = await client.get("/api/claims/claim-id/CLM-OLD-0001?include_archived=true", headers=auth_header(token))
+        assert resp.json()["_id"] == claim_id
+        resp = await client.get("/api/claims/search?q=B-OLD", headers=auth_header(token))
+        assert resp.json() == []
+        resp = await client.get("/api/claims/search?q=B-OLD&include_archived=true", headers=auth_header(token))
+        assert [c["_id"] for c in resp.json()] == [claim_id]
+
+        resp = await client.get("/api/claims/stats", headers=auth_header(token))
+        assert resp.json()["total"]["claims"] == 2
+        resp = await client.get("/api/claims/stats?include_archived=true", headers=auth_header(token))
+        stats = resp.json()
+        assert stats["total"]["claims"] == 4 and stats["total"]["quantity"] == 20
+        assert {g["status"]: g["claims"] for g in stats["by_status"]} == {
+            "Bilty Pending": 2, "Approved": 1, "Rejected": 1
+        }
+
+        # Archived claims leave delta sync listings as tombstones
+        tombstones = await setup_test_db["deletions"].count_documents({"collection": "claims"})
+        assert tombstones == 2
+
+    @pytest.mark.asyncio
+    async def test_restore_claim_from_archive(self, client, admin_user, sample_claim, setup_test_db):
+        from app.utils.crud_claim import claim_crud
+        _, token = admin_user
+        await setup_test_db["claims"].delete_one({"_id": sample_claim["_id"]})
+        await setup_test_db["claims_archive"].insert_one({**sample_claim, "archived_at": datetime.utcnow()})
+
+        restored = await claim_crud.restore_claim("CLM-TEST-0001")
+        assert restored["_id"] == str(sample_claim["_id"])
+        assert await setup_test_db["claims_archive"].count_documents({}) == 0
+        resp = await client.get(f"/api/claims/{sample_claim['_id']}", headers=auth_header(token))
+        assert resp.status_code == 200 and "archived_at" not in resp.json()
+        assert await claim_crud.restore_claim("CLM-TEST-0001") is None
+
+    @pytest.mark.asyncio
+    async def test_delta_sync_across_archive_and_restore(self, client, admin_user, sample_claim, setup_test_db):
+        from datetime import timedelta
+        from app.utils.crud_claim import claim_crud
+        _, token = admin_user
+        old = datetime.utcnow() - timedelta(days=400)
+        await setup_test_db["claims"].update_one(
+            {"_id": sample_claim["_id"]}, {"$set": {"status": "Approved", "updated_at": old}}
+        )
+        resp = await client.get("/api/claims/", headers=auth_header(token))
+        sync_cursor = resp.headers["x-sync-cursor"]
+
+        assert (await claim_crud.archive_claims(older_than_days=180, pause_seconds=0))["archived"] == 1
+        await claim_crud.restore_claim("CLM-TEST-0001")
+
+        resp = await client.get("/api/claims/", params={"updated_since": sync_cursor}, headers=auth_header(token))
+        items = resp.json()
+        assert [c["_id"] for c in items] == [str(sample_claim["_id"])]
+        assert not items[0].get("deleted")
@@ -1,4 +1,5 @@
 """Integration tests for merchant endpoints."""
+from datetime import datetime, timedelta
 import pytest
 from bson import ObjectId
 from tests.conftest import auth_header
@@ -21,6 +22,7 @@ class TestMerchants:
         }, headers=auth_header(token))
         assert resp.status_code == 200
         assert resp.json()["name"] == "New Store"
+        assert resp.json()["name_norm"] == "new store"
 
     @pytest.mark.asyncio
     async def test_create_merchant_by_warehouse(self, client, warehouse_user):
@@ -54,6 +56,98 @@ class TestMerchants:
         assert resp.status_code == 200
         assert len(resp.json()) >= 1
 
+    @pytest.mark.asyncio
+    async def test_list_merchants_keyset_pages(self, client, admin_user, setup_test_db):
+        _, token = admin_user
+        ids = [ObjectId() for _ in range(5)]
+        await setup_test_db["merchants"].insert_many([
+            {"_id": oid, "name": f"Store {i}", "is_active": True} for i, oid in enumerate(ids)
+        ])
+
+        seen = []
+        url = "/api/merchants/?limit=2"
+        while url:
+            resp = await client.get(url, headers=auth_header(token))
+            assert resp.status_code == 200
+            seen.extend(m["_id"] for m in resp.json())
+            link = resp.headers.get("link")
+            if link is None:
+                assert "x-next-cursor" not in resp.headers
+                url = None
+            else:
+                assert link.endswith('>; rel="next"')
+                assert resp.headers["x-next-cursor"] in link
+                url = link[1:link.index(">")]
+        assert seen == [str(oid) for oid in ids]
+
+    @pytest.mark.asyncio
+    async def test_list_merchants_total(self, client, admin_user, setup_test_db):
+        _, token = admin_user
+        await setup_test_db["merchants"].insert_many([
+            {"name": "A", "is_active": True},
+            {"name": "B", "is_active": False},
+            {"name": "C", "is_active": True},
+        ])
+        resp = await client.get(
+            "/api/merchants/?limit=1&is_active=true&total=exact", headers=auth_header(token)
+        )
+        assert resp.headers["x-total-count"] == "2"
+        resp = await client.get("/api/merchants/?total=estimated", headers=auth_header(token))
+        assert resp.headers["x-total-count"] == "3"
+        resp = await client.get("/api/merchants/", headers=auth_header(token))
+        assert "x-total-count" not in resp.headers
+
+    @pytest.mark.asyncio
+    async def test_list_merchants_invalid_cursor(self, client, admin_user):
+        _, token = admin_user
+        resp = await client.get("/api/merchants/?cursor=not-a-cursor", headers=auth_header(token))
+        assert resp.status_code == 400
+        resp = await client.get("/api/merchants/?total=maybe", headers=auth_header(token))
+        assert resp.status_code == 422
+
+    @pytest.mark.asyncio
+    async def test_list_merchants_delta_sync(self, client, admin_user, setup_test_db, monkeypatch):
+        from app.core.config import settings
+        monkeypatch.setattr(settings, "sync_overlap_seconds", 0)
+        _, token = admin_user
+        old = datetime.utcnow() - timedelta(hours=1)
+        ids = [ObjectId() for _ in range(3)]
+        await setup_test_db["merchants"].insert_many([
+            {"_id": oid, "name": f"Store {i}", "is_active": True, "updated_at": old}
+            for i, oid in enumerate(ids)
+        ])
+
+        resp = await client.get("/api/merchants/", headers=auth_header(token))
+        assert len(resp.json()) == 3
+        sync_cursor = resp.headers["x-sync-cursor"]
+
+        await client.put(f"/api/merchants/{ids[0]}", json={"name": "Renamed"}, headers=auth_header(token))
+        await client.delete(f"/api/merchants/{ids[1]}", headers=auth_header(token))
+
+        resp = await client.get(
+            "/api/merchants/", params={"updated_since": sync_cursor}, headers=auth_header(token)
+        )
+        assert resp.status_code == 200
+        changed = {m["_id"]: m for m in resp.json()}
+        assert set(changed) == {str(ids[0]), str(ids[1])}
+        assert changed[str(ids[0])]["name"] == "Renamed"
+        assert changed[str(ids[1])]["deleted"] is True
+
+        resp = await client.get(
+            "/api/merchants/", params={"updated_since": resp.headers["x-sync-cursor"]}, headers=auth_header(token)
+        )
+        assert resp.json() == []
+
+    @pytest.mark.asyncio
+    async def test_list_merchants_sync_cursor_errors(self, client, admin_user):
+        from app.utils.pagination import encode_sync_cursor
+        _, token = admin_user
+        resp = await client.get("/api/merchants/?updated_since=garbage", headers=auth_header(token))
+        assert resp.status_code == 400
+        expired = encode_sync_cursor(datetime.utcnow() - timedelta(days=365))
+        resp = await client.get("/api/merchants/", params={"updated_since": expired}, headers=auth_header(token))
+        assert resp.status_code == 410
+
     @pytest.mark.asyncio
     async def test_get_merchant_by_id(self, client, admin_user, sample_merchant):
         _, token = admin_user
@@ -72,6 +166,24 @@ class TestMerchants:
         }, headers=auth_header(token))
         assert resp.status_code == 200
         assert resp.json()["name"] == "Renamed Store"
+        assert resp.json()["name_norm"] == "renamed store"
+
+    @pytest.mark.asyncio
+    async def test_backfill_name_norm(self, client, admin_user, setup_test_db):
+        from app.utils.crud_merchant import merchant_crud
+        _, token = admin_user
+        await setup_test_db["merchants"].insert_one({"name": "  Legacy Store ", "city": "Lahore"})
+        listing = await client.get("/api/merchants/", headers=auth_header(token))
+
+        assert await merchant_crud.backfill_name_norm() == 1
+        stored = await setup_test_db["merchants"].find_one({"city": "Lahore"})
+        assert stored["name_norm"] == "legacy store"
+        assert "updated_at" in stored
+        # Cached merchant lists are invalidated
+        resp = await client.get("/api/merchants/", headers={
+            **auth_header(token), "If-None-Match": listing.headers["etag"]
+        })
+        assert resp.status_code == 200
 
     # ---- DELETE with referential integrity ----
     @pytest.mark.asyncio
@@ -39,6 +39,42 @@ class TestProductTypes:
         assert resp.status_code == 200
         assert resp.json()["name"] == "LED Bulb"
 
+    @pytest.mark.asyncio
+    async def test_list_product_types_conditional_get(self, client, admin_user, sample_product_type):
+        _, token = admin_user
+        resp = await client.get("/api/product-types/", headers=auth_header(token))
+        etag = resp.headers["etag"]
+
+        resp = await client.get("/api/product-types/", headers={**auth_header(token), "If-None-Match": etag})
+        assert resp.status_code == 304
+        assert resp.headers["etag"] == etag
+        assert resp.content == b""
+
+        # Another query is another representation
+        resp = await client.get(
+            "/api/product-types/?is_active=true", headers={**auth_header(token), "If-None-Match": etag}
+        )
+        assert resp.status_code == 200
+
+        await client.post("/api/product-types/", json={"name": "Tube Light"}, headers=auth_header(token))
+        resp = await client.get("/api/product-types/", headers={**auth_header(token), "If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.headers["etag"] != etag
+        assert len(resp.json()) == 2
+
+    @pytest.mark.asyncio
+    async def test_get_product_type_conditional_get(self, client, admin_user, sample_product_type):
+        _, token = admin_user
+        url = f"/api/product-types/{sample_product_type['_id']}"
+        etag = (await client.get(url, headers=auth_header(token))).headers["etag"]
+        resp = await client.get(url, headers={**auth_header(token), "If-None-Match": f'"other", W/{etag}'})
+        assert resp.status_code == 304
+
+        await client.put(url, json={"name": "Panel Light"}, headers=auth_header(token))
+        resp = await client.get(url, headers={**auth_header(token), "If-None-Match": etag})
+        assert resp.status_code == 200
+        assert resp.json()["name"] == "Panel Light"
+
     # ---- UPDATE ----
     @pytest.mark.asyncio
     async def test_update_product_type(self, client, admin_user, sample_product_type):
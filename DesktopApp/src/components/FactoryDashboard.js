@@ -24,6 +24,27 @@ const FactoryDashboard = () => {
     loadData();
   }, []);
 
+  // Patch claims in place from the server's event stream instead of reloading everything
+  useEffect(() => {
+    const unsubscribe = claimsAPI.subscribeEvents((event) => {
+      if (event.type === 'resync') {
+        loadData();
+      } else if (event.type === 'deleted') {
+        setClaims((prev) => prev.filter((c) => c._id !== event.claim_id));
+      } else if (event.claim) {
+        upsertClaim(event.claim);
+      }
+    });
+    return unsubscribe;
+  }, []);
+
+  const upsertClaim = (claim) => {
+    setClaims((prev) => {
+      const exists = prev.some((c) => c._id === claim._id);
+      return exists ? prev.map((c) => (c._id === claim._id ? claim : c)) : [claim, ...prev];
+    });
+  };
+
   const loadData = async () => {
     setLoading(true);
     setError('');
@@ -102,9 +123,9 @@ const FactoryDashboard = () => {
       if (itemResults) {
         verifyData.item_results = itemResults;
       }
-      await claimsAPI.verify(claimId, verifyData);
+      const verified = await claimsAPI.verify(claimId, verifyData);
       setSelectedClaim(null);
-      loadData();
+      upsertClaim(verified);
     } catch (err) {
       setError(getErrorMessage(err, 'Failed to verify claim'));
     }
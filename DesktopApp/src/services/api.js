@@ -59,6 +59,32 @@ api.interceptors.response.use(
   }
 );
 
+// Keep a local copy of a list endpoint in sync. Without a syncCursor the whole list is
+// loaded; with one only documents changed or deleted since then are fetched and merged.
+// Returns { items, syncCursor } - keep syncCursor for the next call. A 410 means the
+// cursor expired: call again without one.
+export const syncList = async (path, items = [], syncCursor = null, params = {}) => {
+  const byId = new Map(syncCursor ? items.map((item) => [item._id, item]) : []);
+  let nextSyncCursor = null;
+  let cursor = null;
+  do {
+    const query = { ...params, limit: 1000 };
+    if (syncCursor) query.updated_since = syncCursor;
+    if (cursor) query.cursor = cursor;
+    const response = await api.get(path, { params: query });
+    response.data.forEach((item) => {
+      if (item.deleted) {
+        byId.delete(item._id);
+      } else {
+        byId.set(item._id, item);
+      }
+    });
+    nextSyncCursor = nextSyncCursor || response.headers['x-sync-cursor'];
+    cursor = response.headers['x-next-cursor'];
+  } while (cursor);
+  return { items: Array.from(byId.values()), syncCursor: nextSyncCursor };
+};
+
 // Auth API
 export const authAPI = {
   login: async (email, password) => {
@@ -178,6 +204,41 @@ export const batchesAPI = {
     return response.data;
   },
   
+  // Batches whose code, contractor or colour words start with the query words, best first.
+  // params: { skip, limit, model_id, supplier_id }
+  search: async (term, params = {}) => {
+    const response = await api.get(`/api/batches/search/${encodeURIComponent(term)}`, { params });
+    return { batches: response.data, total: parseInt(response.headers['x-total-count'], 10) || 0 };
+  },
+  
+  // Batches still in warranty (optionally of one model), for the claim picker
+  getInWarranty: async (modelId = null) => {
+    const params = { in_warranty: true };
+    if (modelId) params.model_id = modelId;
+    const response = await api.get('/api/batches/', { params });
+    return response.data;
+  },
+  
+  // Warranty status of many batches: { results, not_found, invalid }
+  checkWarranties: async (batchIds) => {
+    const response = await api.post('/api/batches/check-warranty', { batch_ids: batchIds });
+    return response.data;
+  },
+  
+  // Resolve many scanned codes in one request: { batches: { code: batch }, unknown: [code] }
+  resolveBarcodes: async (codes) => {
+    const response = await api.post('/api/batches/resolve', { codes });
+    return response.data;
+  },
+  
+  // Import batches from a CSV or XLSX file: { total, counts, results } (results lists rows not created)
+  importBatches: async (file) => {
+    const formData = new FormData();
+    formData.append('file', file);
+    const response = await api.post('/api/batches/import', formData);
+    return response.data;
+  },
+  
   create: async (data) => {
     const response = await api.post('/api/batches/', data);
     return response.data;
@@ -229,13 +290,72 @@ export const claimsAPI = {
     return response.data;
   },
   
+  // Claims with merchant, rep, batch, model and product type names resolved.
+  // Resolves to { claims, nextCursor } so callers can page with params.cursor.
+  getView: async (params = {}) => {
+    const response = await api.get('/api/claims/view', { params });
+    return { claims: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+  },
+  
+  // Import many claims: pass an array of claims or a CSV File
+  importBulk: async (claimsOrFile) => {
+    let response;
+    if (Array.isArray(claimsOrFile)) {
+      response = await api.post('/api/claims/bulk', claimsOrFile);
+    } else {
+      const formData = new FormData();
+      formData.append('file', claimsOrFile);
+      response = await api.post('/api/claims/bulk', formData);
+    }
+    return response.data;
+  },
+  
+  // Claims matching a claim ID prefix, bilty number or merchant name, best first.
+  // Pass includeArchived to also search claims moved to the archive.
+  search: async (q, limit = 20, includeArchived = false) => {
+    const params = { q, limit };
+    if (includeArchived) params.include_archived = true;
+    const response = await api.get('/api/claims/search', { params });
+    return response.data;
+  },
+  
+  getStats: async (includeArchived = false) => {
+    const params = includeArchived ? { include_archived: true } : {};
+    const response = await api.get('/api/claims/stats', { params });
+    return response.data;
+  },
+  
   getUnverified: async () => {
     const response = await api.get('/api/claims/unverified');
     return response.data;
   },
   
-  getById: async (id) => {
-    const response = await api.get(`/api/claims/${id}`);
+  // Verification work queue, oldest first; available=true hides claims other operators hold
+  getQueue: async (params = {}) => {
+    const response = await api.get('/api/claims/queue', { params });
+    return response.data;
+  },
+  
+  // Lease the next free claim (404 when the queue is empty)
+  checkoutNext: async () => {
+    const response = await api.post('/api/claims/queue/checkout');
+    return response.data;
+  },
+  
+  // Lease (or renew the lease on) a specific claim; 409 if another operator holds it
+  checkout: async (id) => {
+    const response = await api.put(`/api/claims/${id}/lease`);
+    return response.data;
+  },
+  
+  release: async (id) => {
+    const response = await api.delete(`/api/claims/${id}/lease`);
+    return response.data;
+  },
+  
+  getById: async (id, includeArchived = false) => {
+    const params = includeArchived ? { include_archived: true } : {};
+    const response = await api.get(`/api/claims/${id}`, { params });
     return response.data;
   },
   
@@ -268,6 +388,34 @@ export const claimsAPI = {
     const response = await api.put(`/api/claims/${id}/approve`, approveData);
     return response.data;
   },
+  
+  // Bulk transitions report { total, counts, results } with a status per claim
+  bulkUpdateBilty: async (claims) => {
+    const response = await api.put('/api/claims/bulk/bilty', { claims });
+    return response.data;
+  },
+  
+  bulkApprove: async (approveData) => {
+    const response = await api.put('/api/claims/bulk/approve', approveData);
+    return response.data;
+  },
+  
+  bulkVerify: async (verifyData) => {
+    const response = await api.put('/api/claims/bulk/verify', verifyData);
+    return response.data;
+  },
+  
+  // Listen to claim created/updated/transition/deleted events; returns an unsubscribe function.
+  // EventSource cannot send headers, so the token goes in the query string.
+  subscribeEvents: (onEvent) => {
+    const token = localStorage.getItem('token');
+    const url = `${API_BASE_URL}/api/claims/events?access_token=${encodeURIComponent(token || '')}`;
+    const source = new EventSource(url);
+    ['created', 'updated', 'transition', 'deleted', 'resync'].forEach((type) => {
+      source.addEventListener(type, (e) => onEvent({ type, ...JSON.parse(e.data) }));
+    });
+    return () => source.close();
+  },
 };
 
 export const locationsAPI = {
@@ -323,6 +471,15 @@ export const accountingAPI = {
     });
     return response.data;
   },
+
+  // params: { from: 'YYYY-MM-DD', to: 'YYYY-MM-DD', status: 'Approved' }
+  exportSaleReturnsCSV: async (params = {}) => {
+    const response = await api.get('/api/accounting/sale-returns.csv', {
+      params,
+      responseType: 'blob'
+    });
+    return response.data;
+  },
 };
 
 export default api;